@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time xml_utils.canonicalize and xml_utils.content_hash on records of
+about --size MB (the test record with a large eainfo section), from a file
+and from an lxml element, against a plain sha256 of the file.
+
+usage: python benchmarks/bench_content_hash.py [--size 5] [--repeat 10]
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from lxml import etree
+
+from pymdwizard.core import xml_utils
+
+from bench_xmlnode import make_attr
+
+RECORD_FNAME = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data',
+                            'USGS_ASC_PolarBears_FGDC.xml')
+
+
+def make_record(size_mb):
+    """
+    Returns the test record with attrs added to its first detailed
+    entity until it is about size_mb when saved
+    """
+    record = etree.parse(RECORD_FNAME).getroot()
+    detailed = record.find('eainfo/detailed')
+    attr_size = len(xml_utils.node_to_string(make_attr(0)))
+    num_attrs = int(size_mb * 2**20 / attr_size)
+    for i in range(num_attrs):
+        detailed.append(make_attr(i))
+    return record
+
+
+def timed(func, repeat, *args):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(size_mb, repeat):
+    record = make_record(size_mb)
+    fname = os.path.join(tempfile.mkdtemp(), 'record.xml')
+    xml_utils.save_to_file(record, fname)
+    print('record: {:.1f} MB'.format(os.path.getsize(fname) / 2.0**20))
+
+    def sha256_file(fname):
+        with open(fname, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    print('{:>28}  {:>8}'.format('', 'ms'))
+    for label, func, arg in [
+            ('sha256 of the file bytes', sha256_file, fname),
+            ('canonicalize(fname)', xml_utils.canonicalize, fname),
+            ('content_hash(fname)', xml_utils.content_hash, fname),
+            ('content_hash(element)', xml_utils.content_hash, record)]:
+        print('{:>28}  {:>8.1f}'.format(label, timed(func, repeat, arg)))
+    os.remove(fname)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--size', type=float, default=5,
+                        help='approximate size of the record in MB')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    run(args.size, args.repeat)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Compare the peak memory and time of parsing a whole record with
+xml_utils.fname_to_node and streaming its detailed entities with
+xml_utils.iter_detailed.
+
+The test record has --entities detailed entities, each with --attrs attrs
+of --edoms enumerated domain (edom) values.  Each measurement runs in a
+fresh process so the peak resident memory (Unix only) is its own.
+
+usage: python benchmarks/bench_iterparse.py [--entities 20] [--attrs 100]
+                                            [--edoms 500]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from lxml import etree
+
+from pymdwizard.core import xml_utils
+
+
+def write_record(fname, entities, attrs, edoms):
+    with etree.xmlfile(fname, encoding='utf-8') as xf:
+        with xf.element('metadata'):
+            xf.write(xml_utils.xml_node('idinfo'))
+            with xf.element('eainfo'):
+                for i in range(entities):
+                    with xf.element('detailed'):
+                        enttyp = xml_utils.xml_node('enttyp')
+                        xml_utils.xml_node('enttypl', 'table_{}'.format(i),
+                                           parent_node=enttyp)
+                        xf.write(enttyp)
+                        for j in range(attrs):
+                            xf.write(make_attr(j, edoms))
+            xf.write(xml_utils.xml_node('metainfo'))
+
+
+def make_attr(i, edoms):
+    attr = xml_utils.xml_node('attr')
+    xml_utils.xml_node('attrlabl', 'field_{}'.format(i), parent_node=attr)
+    xml_utils.xml_node('attrdef', 'Definition of field {}'.format(i),
+                       parent_node=attr)
+    for j in range(edoms):
+        attrdomv = xml_utils.xml_node('attrdomv', parent_node=attr)
+        edom = xml_utils.xml_node('edom', parent_node=attrdomv)
+        xml_utils.xml_node('edomv', 'code_{}'.format(j), parent_node=edom)
+        xml_utils.xml_node('edomvd', 'Lookup table value {}'.format(j),
+                           parent_node=edom)
+        xml_utils.xml_node('edomvds', 'Producer defined', parent_node=edom)
+    return attr
+
+
+def count_edoms(fname, mode):
+    """
+    Count the edom elements in fname and print the count, seconds and
+    peak resident memory (MB)
+    """
+    start = time.time()
+    if mode == 'parse':
+        record = xml_utils.fname_to_node(fname)
+        count = len(record.findall('eainfo/detailed/attr/attrdomv/edom'))
+    else:
+        count = sum(len(detailed.findall('attr/attrdomv/edom'))
+                    for detailed in xml_utils.iter_detailed(fname))
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        # linux reports kilobytes, mac os bytes
+        peak *= 1024
+    print(count, elapsed, peak / 2.0**20)
+
+
+def run(entities, attrs, edoms):
+    fname = os.path.join(tempfile.mkdtemp(), 'big_record.xml')
+    write_record(fname, entities, attrs, edoms)
+    print('record: {:.0f} MB, {} edoms'.format(
+        os.path.getsize(fname) / 2.0**20, entities * attrs * edoms))
+    print('{:>14}  {:>8}  {:>12}'.format('', 'seconds', 'peak MB'))
+    for mode in ['parse', 'iter_detailed']:
+        output = subprocess.check_output(
+            [sys.executable, __file__, '--count', fname, mode],
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+        count, elapsed, peak = output.decode().split()
+        print('{:>14}  {:>8.2f}  {:>12.0f}'.format(mode, float(elapsed),
+                                                   float(peak)))
+    os.remove(fname)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--entities', type=int, default=20)
+    parser.add_argument('--attrs', type=int, default=100)
+    parser.add_argument('--edoms', type=int, default=500)
+    parser.add_argument('--count', nargs=2, metavar=('FNAME', 'MODE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.count:
+        count_edoms(*args.count)
+    else:
+        run(args.entities, args.attrs, args.edoms)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time taxonomy.get_full_hierarchies, merge_taxons, get_common_names and
+gen_fgdc_taxoncl for --species TSNs against a stand in for ITIS that
+answers getFullHierarchyFromTSN and getCommonNamesFromTSN after --latency
+seconds, with different numbers of concurrent queries.
+The response cache is turned off so every TSN is a round trip.
+
+usage: python benchmarks/bench_itis_hierarchies.py [--species 100]
+                                                   [--latency 0.2]
+"""
+import argparse
+import time
+
+from lxml import etree
+
+from pymdwizard.core import taxonomy
+
+NS = 'http://data.itis_service.itis.usgs.gov/xsd'
+
+
+def make_hierarchy(tsn):
+    """
+    Returns a getFullHierarchyFromTSN response for a made up species,
+    every species is in its own genus of the family Ursidae
+    """
+    ranks = [('Kingdom', 'Animalia', 202423, ''),
+             ('Phylum', 'Chordata', 158852, 202423),
+             ('Class', 'Mammalia', 179913, 158852),
+             ('Order', 'Carnivora', 180539, 179913),
+             ('Family', 'Ursidae', 180540, 180539),
+             ('Genus', 'Genus{}'.format(tsn), tsn + 1000000, 180540),
+             ('Species', 'Species{}'.format(tsn), tsn, tsn + 1000000)]
+    response = etree.Element('getFullHierarchyFromTSNResponse')
+    for rank_name, taxon_name, rank_tsn, parent_tsn in ranks:
+        item = etree.SubElement(response, '{%s}hierarchyList' % NS)
+        for tag, text in [('author', ''), ('parentName', ''),
+                          ('parentTsn', str(parent_tsn)),
+                          ('rankName', rank_name), ('taxonName', taxon_name),
+                          ('tsn', str(rank_tsn))]:
+            etree.SubElement(item, '{%s}%s' % (NS, tag)).text = text
+    return etree.tostring(response)
+
+
+def make_common_names(tsn):
+    """
+    Returns a getCommonNamesFromTSN response with an English and a French
+    common name
+    """
+    response = etree.Element('getCommonNamesFromTSNResponse')
+    for language in ['English', 'French']:
+        item = etree.SubElement(response, '{%s}commonNames' % NS)
+        for tag, text in [('commonName', '{} {}'.format(language, tsn)),
+                          ('language', language), ('tsn', str(tsn))]:
+            etree.SubElement(item, '{%s}%s' % (NS, tag)).text = text
+    return etree.tostring(response)
+
+
+class Response(object):
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class Session(object):
+    def __init__(self, latency):
+        self.latency = latency
+
+    def get(self, url, params=None, timeout=None):
+        time.sleep(self.latency)
+        if 'tsn' not in params:
+            # getRankNames, an empty answer falls back to the snapshot
+            return Response(b'<getRankNamesResponse/>')
+        if url.endswith('getCommonNamesFromTSN'):
+            return Response(make_common_names(int(params['tsn'])))
+        return Response(make_hierarchy(int(params['tsn'])))
+
+
+def run(species, latency):
+    taxonomy._session = Session(latency)
+    taxonomy.set_response_cache(None)
+    # rank names are looked up once per process, keep them out of the timing
+    taxonomy.get_rank_lookup()
+    tsns = list(range(1, species + 1))
+
+    print('{} TSNs, {:.0f} ms per round trip'.format(species, latency * 1000))
+    print('{:>36}  {:>8}'.format('', 's'))
+    for workers in [1, 4, taxonomy.ITIS_MAX_WORKERS, 32]:
+        start = time.perf_counter()
+        taxonomy.get_full_hierarchies(tsns, include_children=False,
+                                      max_workers=workers)
+        label = 'get_full_hierarchies, {} workers'.format(workers)
+        print('{:>36}  {:8.2f}'.format(label, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    root = taxonomy.merge_taxons(tsns)
+    print('{:>36}  {:8.2f}'.format('merge_taxons',
+                                   time.perf_counter() - start))
+
+    # every taxon in the merged tree has its common names looked up
+    tree_tsns = [t.tsn for t in root.walk() if t.tsn]
+    for workers in [1, taxonomy.ITIS_MAX_WORKERS]:
+        start = time.perf_counter()
+        taxonomy.get_common_names(tree_tsns, max_workers=workers)
+        label = 'get_common_names, {} workers'.format(workers)
+        print('{:>36}  {:8.2f}'.format(label, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    taxonomy.gen_fgdc_taxoncl(tsns, include_common_names=True)
+    print('{:>36}  {:8.2f}'.format('gen_fgdc_taxoncl with common names',
+                                   time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--species', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+    run(args.species, args.latency)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Time taxonomy.merge_hierarchies on synthetic hierarchies with about
+--taxa distinct taxa, against the recursive find_child_by_tsn it used to
+rely on (only up to --legacy-max taxa, it is quadratic).
+
+usage: python benchmarks/bench_merge_taxons.py [--taxa 10000]
+                                               [--legacy-max 2500]
+"""
+import argparse
+import time
+
+from pymdwizard.core import taxonomy
+
+COLUMNS = ['tsn', 'author', 'parentName', 'parentTsn', 'rankName',
+           'taxonName']
+
+# rank name, number of species in each taxon of that rank
+RANKS = [('Phylum', 3000), ('Class', 1000), ('Order', 300), ('Family', 30),
+         ('Genus', 3), ('Species', 1)]
+
+
+def make_hierarchies(num_species):
+    """
+    Returns a get_full_hierarchy_from_tsn(as_dataframe=False) style list
+    for each of num_species species, all in the kingdom Animalia
+    """
+    hierarchies = []
+    for i in range(num_species):
+        rows = [('202423', '', '', '', 'Kingdom', 'Animalia')]
+        parent_tsn, parent_name = '202423', 'Animalia'
+        for level, (rank_name, size) in enumerate(RANKS):
+            tsn = str((level + 1) * 10000000 + i // size)
+            name = '{}{}'.format(rank_name, i // size)
+            rows.append((tsn, '', parent_name, parent_tsn, rank_name, name))
+            parent_tsn, parent_name = tsn, name
+        hierarchies.append([dict(zip(COLUMNS, row)) for row in rows])
+    return hierarchies
+
+
+class LegacyTaxon(taxonomy.Taxon):
+    def find_child_by_tsn(self, tsn):
+        if str(self.tsn) == str(tsn):
+            return self
+        else:
+            for child in self.children:
+                match = child.find_child_by_tsn(tsn)
+                if match:
+                    return match
+        return None
+
+
+def count_taxa(taxon):
+    return 1 + sum(count_taxa(child) for child in taxon.children)
+
+
+def timed_merge(hierarchies, taxon_class):
+    taxonomy.Taxon = taxon_class
+    try:
+        start = time.perf_counter()
+        root = taxonomy.merge_hierarchies(hierarchies)
+        return time.perf_counter() - start, root
+    finally:
+        taxonomy.Taxon = Taxon
+
+
+Taxon = taxonomy.Taxon
+
+
+def run(num_taxa, legacy_max):
+    # rank names come from the bundled snapshot
+    taxonomy.set_offline()
+    taxonomy.get_rank_lookup()
+
+    per_species = sum(1.0 / size for rank_name, size in RANKS)
+    print('{:>8}  {:>10}  {:>10}'.format('taxa', 'indexed s', 'legacy s'))
+    for size in sorted(set([num_taxa // 10, num_taxa // 5, num_taxa])):
+        hierarchies = make_hierarchies(int(size / per_species))
+        elapsed, root = timed_merge(hierarchies, Taxon)
+        legacy = ''
+        if count_taxa(root) <= legacy_max:
+            legacy_elapsed, legacy_root = timed_merge(hierarchies,
+                                                      LegacyTaxon)
+            assert str(legacy_root) == str(root)
+            legacy = '{:10.2f}'.format(legacy_elapsed)
+        print('{:8d}  {:10.2f}  {:>10}'.format(count_taxa(root), elapsed,
+                                               legacy))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--taxa', type=int, default=10000)
+    parser.add_argument('--legacy-max', type=int, default=2500)
+    args = parser.parse_args()
+    run(args.taxa, args.legacy_max)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Benchmark XMLNode.add_child, XMLNode.copy, XMLNode.to_xml and str(XMLNode)
+on entity and attribute (eainfo) sections with a growing number of <attr>
+elements.
+
+The legacy_* functions reproduce the previous implementations, which
+round-tripped every node through its string representation.
+
+usage: python benchmarks/bench_xmlnode.py [--sizes 1000 10000 20000]
+"""
+import argparse
+import time
+
+from lxml import etree
+
+from pymdwizard.core import xml_utils
+from pymdwizard.core.xml_utils import XMLNode
+
+
+def make_eainfo(num_attrs):
+    """
+    Returns an lxml eainfo element with a single detailed
+    containing num_attrs attr elements
+    """
+    eainfo = xml_utils.xml_node('eainfo')
+    detailed = xml_utils.xml_node('detailed', parent_node=eainfo)
+    enttyp = xml_utils.xml_node('enttyp', parent_node=detailed)
+    xml_utils.xml_node('enttypl', 'table', parent_node=enttyp)
+    xml_utils.xml_node('enttypd', 'a big table', parent_node=enttyp)
+    xml_utils.xml_node('enttypds', 'Producer defined', parent_node=enttyp)
+    for i in range(num_attrs):
+        detailed.append(make_attr(i))
+    return eainfo
+
+
+def make_attr(i):
+    attr = xml_utils.xml_node('attr')
+    xml_utils.xml_node('attrlabl', 'field_{}'.format(i), parent_node=attr)
+    xml_utils.xml_node('attrdef', 'Definition of field {} & co'.format(i),
+                       parent_node=attr)
+    xml_utils.xml_node('attrdefs', 'Producer defined', parent_node=attr)
+    attrdomv = xml_utils.xml_node('attrdomv', parent_node=attr)
+    xml_utils.xml_node('udom', 'Unrepresentable domain', parent_node=attrdomv)
+    return attr
+
+
+def legacy_add_child(node, child):
+    if type(child) == etree._Element:
+        node_str = xml_utils.node_to_string(child)
+    else:
+        node_str = child.to_str()
+    child_copy = XMLNode(node_str)
+    node.children.append(child_copy)
+    node.add_attr(child.tag, child)
+
+
+def legacy_copy(node):
+    return XMLNode(node.to_str())
+
+
+def legacy_to_xml(node):
+    parser = etree.XMLParser(ns_clean=True, recover=True, encoding='utf-8')
+    return etree.fromstring(node.to_str(), parser=parser)
+
+
+def legacy_str(node, level=0):
+    if node.text:
+        cur_node = xml_utils.xml_node(node.tag, node.text)
+        result = "{}{}".format("  "*level, etree.tostring(
+            cur_node, pretty_print=True).decode()).rstrip()
+    else:
+        result = "{}<{}>\n".format("  "*level, node.tag)
+        result += '\n'.join([legacy_str(child, level=level+1)
+                             for child in node.children])
+        result += '\n{}</{}>'.format("  "*level, node.tag)
+    return result
+
+
+def add_children(attrs, add_child):
+    detailed = XMLNode(tag='detailed')
+    for attr in attrs:
+        add_child(detailed, attr)
+    eainfo = XMLNode(tag='eainfo')
+    add_child(eainfo, detailed)
+    return eainfo
+
+
+def timed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def run(sizes):
+    print('{:>8}  {:>22}  {:>22}  {:>22}  {:>22}'.format(
+        'attrs', 'add_child old/new (s)', 'copy old/new (s)',
+        'to_xml old/new (s)', 'str old/new (s)'))
+    for size in sizes:
+        node = XMLNode(make_eainfo(size))
+        attrs = node.detailed.attr
+
+        add_old = timed(add_children, attrs, legacy_add_child)
+        add_new = timed(add_children, attrs,
+                        lambda parent, child: parent.add_child(child))
+        copy_old = timed(legacy_copy, node)
+        copy_new = timed(node.copy)
+        to_xml_old = timed(legacy_to_xml, node)
+        to_xml_new = timed(node.to_xml)
+        str_old = timed(legacy_str, node)
+        str_new = timed(str, node)
+
+        print('{:>8}  {:>10.3f} {:>10.3f}  {:>10.3f} {:>10.3f}  '
+              '{:>10.3f} {:>10.3f}  {:>10.3f} {:>10.3f}'.format(
+                  size, add_old, add_new, copy_old, copy_new,
+                  to_xml_old, to_xml_new, str_old, str_new))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 5000, 10000, 20000],
+                        help='numbers of attr elements to benchmark')
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Compare the memory used by XMLNode and CompactXMLNode trees of entity and
+attribute (eainfo) sections with a growing number of <attr> elements.
+
+'compact lazy' is a CompactXMLNode that has only read the top of the
+tree, 'compact full' has read every node.  The lxml tree itself is built
+before measuring and is not included.
+
+usage: python benchmarks/bench_xmlnode_memory.py [--sizes 1000 10000 20000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from pymdwizard.core.xml_utils import XMLNode, CompactXMLNode
+
+from bench_xmlnode import make_eainfo
+
+
+def walk(node):
+    stack = [node]
+    while stack:
+        stack.extend(stack.pop().children)
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.time()
+    result = build()
+    elapsed = time.time() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 2.0**20, elapsed
+
+
+def run(sizes):
+    print('{:>8}  {:>18}  {:>18}  {:>18}'.format(
+        'attrs', 'XMLNode MB (s)', 'compact full MB (s)',
+        'compact lazy MB (s)'))
+    for size in sizes:
+        eainfo = make_eainfo(size)
+
+        node, full_mb, full_s = measure(lambda: XMLNode(eainfo))
+
+        def compact_full():
+            compact = CompactXMLNode(eainfo)
+            walk(compact)
+            return compact
+        compact, compact_mb, compact_s = measure(compact_full)
+        assert compact.to_str() == node.to_str()
+
+        def compact_lazy():
+            compact = CompactXMLNode(eainfo)
+            compact.detailed.enttyp.enttypl
+            return compact
+        lazy, lazy_mb, lazy_s = measure(compact_lazy)
+
+        print('{:>8}  {:>9.1f} {:>8.3f}  {:>9.1f} {:>8.3f}  '
+              '{:>9.1f} {:>8.3f}'.format(size, full_mb, full_s,
+                                         compact_mb, compact_s,
+                                         lazy_mb, lazy_s))
+        del node, compact, lazy
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 5000, 10000, 20000],
+                        help='numbers of attr elements to benchmark')
+    args = parser.parse_args()
+    run(args.sizes)
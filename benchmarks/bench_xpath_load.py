@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+Load the USGS_ASC_PolarBears_FGDC.xml test record into every widget of the
+metadata editor and report how much of the load time is spent evaluating
+and compiling xpaths.
+
+lxml methods don't show up in cProfile, so xpath calls are timed directly:
+the record is parsed into elements with a timed xpath method, and
+xml_utils.compile_xpath returns timed XPath objects.
+
+usage: python benchmarks/bench_xpath_load.py [--repeat 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+from lxml import etree
+from PyQt5.QtWidgets import QApplication
+
+from pymdwizard.core import xml_utils
+from pymdwizard.gui.MetadataRoot import MetadataRoot
+
+RECORD_FNAME = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data',
+                            'USGS_ASC_PolarBears_FGDC.xml')
+
+
+class XPathTimer(object):
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+
+    def timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.calls += 1
+
+
+timer = XPathTimer()
+
+
+class TimedElement(etree.ElementBase):
+    def xpath(self, _path, **kwargs):
+        return timer.timed(etree.ElementBase.xpath, self, _path, **kwargs)
+
+
+def timed_compile_xpath(compile_xpath):
+    def compile_and_time(xpath):
+        compiled = timer.timed(compile_xpath, xpath)
+        return lambda node: timer.timed(compiled, node)
+    return compile_and_time
+
+
+def run(repeat):
+    app = QApplication.instance() or QApplication(sys.argv)
+    root = MetadataRoot()
+    for section in root.lazy_sections:
+        root.build_section(section)
+
+    parser = etree.XMLParser()
+    parser.set_element_class_lookup(
+        etree.ElementDefaultClassLookup(element=TimedElement))
+    record = etree.parse(RECORD_FNAME, parser)
+
+    # the first load includes one off costs (e.g. filling caches)
+    root._from_xml(record)
+
+    compile_xpath = xml_utils.compile_xpath
+    xml_utils.compile_xpath = timed_compile_xpath(compile_xpath)
+    timer.seconds, timer.calls = 0.0, 0
+    start = time.perf_counter()
+    try:
+        for i in range(repeat):
+            root._from_xml(record)
+    finally:
+        xml_utils.compile_xpath = compile_xpath
+    elapsed = time.perf_counter() - start
+
+    print('load time: {:.3f} s per load ({} loads)'.format(elapsed / repeat,
+                                                            repeat))
+    print('xpath: {:.4f} s per load, {:.1%} of load time, {} calls '
+          'per load'.format(timer.seconds / repeat, timer.seconds / elapsed,
+                            timer.calls // repeat))
+    print('compile_xpath cache: {}'.format(compile_xpath.cache_info()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='number of times to load the record')
+    args = parser.parse_args()
+    run(args.repeat)
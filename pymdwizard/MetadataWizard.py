@@ -4,7 +4,8 @@ import argparse
 
 import os
 import sys
-
+import time
+import builtins
 
 
 def set_clean_path():
@@ -13,13 +14,66 @@ def set_clean_path():
     python_dname = os.path.join(root_dir, 'Python35_64')
     os.environ['path'] = ";".join([python_dname, os.path.join(python_dname, 'Library', 'bin')])
 
+
+def time_imports():
+    """
+    Wrap the builtin __import__ so that the time spent importing each new
+    module (including the modules it imports in turn) is recorded.
+    This has to happen before pymdwizard itself is imported.
+
+    Returns
+    -------
+    tuple : (list of [depth, module name, seconds] in the order the
+             imports started, function that removes the wrapper)
+    """
+    imports = []
+    depth = [0]
+    original_import = builtins.__import__
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return original_import(name, globals, locals, fromlist, level)
+
+        entry = [depth[0], name, 0.0]
+        imports.append(entry)
+        depth[0] += 1
+        start = time.time()
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            depth[0] -= 1
+            entry[2] = time.time() - start
+
+    def restore():
+        builtins.__import__ = original_import
+
+    builtins.__import__ = timed_import
+    return imports, restore
+
+
 if __name__ == '__main__':
+    launch_time = time.time()
+
     parser = argparse.ArgumentParser(description="Metadata Wizard")
     parser.add_argument("xml_fname", help="The FGDC (or BDP) XML file to load", type=str, default=None, nargs='?',)
     parser.add_argument("introspect_fname", help="The CSV or SHP file to use for populating the spdom, spdoinfo, spref and eainfo sections", type=str, default=None, nargs='?',)
+    parser.add_argument("--profile-startup", help="Print the time taken by imports, each section of the form and until the window is first painted", action='store_true')
+    parser.add_argument("--fast", help="Do not hold the splash screen open while starting", action='store_true')
     args = parser.parse_args()
 
     set_clean_path()
-    from pymdwizard.gui import MainWindow
+
+    if args.profile_startup:
+        imports, restore_import = time_imports()
+        from pymdwizard.gui import MainWindow
+        restore_import()
+
+        from pymdwizard.core import startup_timer
+        timer = startup_timer.start(start_time=launch_time, imports=imports)
+        timer.record('milestone', 'modules imported')
+    else:
+        from pymdwizard.gui import MainWindow
+
     MainWindow.launch_main(xml_fname=args.xml_fname,
-                           introspect_fname=args.introspect_fname)
+                           introspect_fname=args.introspect_fname,
+                           fast=args.fast)
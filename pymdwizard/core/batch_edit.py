@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+License:            Creative Commons Attribution 4.0 International (CC BY 4.0)
+                    http://creativecommons.org/licenses/by/4.0/
+
+PURPOSE
+Apply a declarative set of changes (patches) to directories or lists of FGDC
+records in parallel.  Each record is parsed once, all the patches are applied
+and the record is replaced atomically, only if something changed.  A dry run
+reports a diff of each record instead of writing it.
+
+A patch set is a json list of patches (see xml_utils.apply_patch), e.g.:
+    [{"xpath": "idinfo/citation/citeinfo/pubdate", "action": "set_text",
+      "text": "201707"},
+     {"xpath": "idinfo/citation/citeinfo/origin", "action": "set_text",
+      "old": "Erin Whorton", "text": "Erin N. Whorton"},
+     {"xpath": "idinfo/citation/citeinfo/onlink", "action": "delete"},
+     {"xpath": "idinfo/citation/citeinfo", "action": "append",
+      "xml": "<onlink>https://www.usgs.gov</onlink>"}]
+
+usage:
+    python -m pymdwizard.core.batch_edit patches.json c:/temp/metadata
+    python -m pymdwizard.core.batch_edit patches.json c:/temp/metadata --dry-run
+    python -m pymdwizard.core.batch_validation c:/temp/metadata -o report.csv
+
+
+SCRIPT DEPENDENCIES
+------------------------------------------------------------------------------
+    None
+
+
+U.S. GEOLOGICAL SURVEY DISCLAIMER
+------------------------------------------------------------------------------
+Any use of trade, product or firm names is for descriptive purposes only and
+does not imply endorsement by the U.S. Geological Survey.
+
+Although this information product, for the most part, is in the public domain,
+it also contains copyrighted material as noted in the text. Permission to
+reproduce copyrighted items for other than personal use must be secured from
+the copyright owner.
+
+Although these data have been processed successfully on a computer system at
+the U.S. Geological Survey, no warranty, expressed or implied is made
+regarding the display or utility of the data on any other system, or for
+general or scientific purposes, nor shall the act of distribution constitute
+any such warranty. The U.S. Geological Survey shall not be held liable for
+improper or incorrect use of the data described and/or contained herein.
+
+Although this program has been used by the U.S. Geological Survey (USGS), no
+warranty, expressed or implied, is made by the USGS or the U.S. Government as
+to the accuracy and functioning of the program and related program material
+nor shall the fact of distribution constitute any such warranty, and no
+responsibility is assumed by the USGS in connection therewith.
+------------------------------------------------------------------------------
+"""
+# built in Python imports
+import os
+import sys
+import json
+import shutil
+import difflib
+import argparse
+import tempfile
+import functools
+import multiprocessing
+
+# external library imports
+from lxml import etree
+
+# internal package imports
+from pymdwizard.core import xml_utils
+from pymdwizard.core.batch_validation import find_records
+
+
+def load_patches(fname):
+    """
+    Read and check a json patch set
+
+    Parameters
+    ----------
+    fname : str
+            json file containing a list of patches
+
+    Returns
+    -------
+        list of dict
+    """
+    with open(fname, encoding='utf-8') as patch_file:
+        patches = json.load(patch_file)
+    if isinstance(patches, dict):
+        patches = [patches]
+    for patch in patches:
+        xml_utils.check_patch(patch)
+    return patches
+
+
+def write_atomic(contents, fname):
+    """
+    Replace the contents of a file, so that it is either completely
+    written or left as it was, even if the process is interrupted.
+
+    Parameters
+    ----------
+    contents : str
+    fname : str
+
+    Returns
+    -------
+    None
+    """
+    dirname = os.path.dirname(os.path.abspath(fname))
+    fd, temp_fname = tempfile.mkstemp(dir=dirname, suffix='.tmp',
+                                      prefix='.' + os.path.basename(fname))
+    try:
+        with os.fdopen(fd, 'w') as temp_file:
+            temp_file.write(contents)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        if os.path.exists(fname):
+            shutil.copymode(fname, temp_fname)
+        os.replace(temp_fname, fname)
+    except BaseException:
+        os.remove(temp_fname)
+        raise
+
+
+def edit_record(fname, patches, dry_run=False):
+    """
+    Apply a patch set to a single record
+
+    Parameters
+    ----------
+    fname : str
+            full path to the xml file
+    patches : list of dict
+            see xml_utils.apply_patch
+    dry_run : bool
+            don't change the file, return a diff of the changes instead
+
+    Returns
+    -------
+        tuple: (filename, changes, diff, error)
+        changes is the number of nodes changed, diff is a unified diff
+        (dry runs only, otherwise None) and error the reason the record
+        could not be edited, or None
+    """
+    try:
+        # blank text is dropped so new nodes are indented like the rest
+        parser = etree.XMLParser(remove_blank_text=True)
+        element = etree.parse(fname, parser=parser).getroot()
+    except BaseException as e:
+        return fname, 0, None, 'could not open file: {}'.format(e)
+
+    if dry_run:
+        # compare against the record as it would be saved without changes,
+        # so the diff doesn't include differences in whitespace
+        original = xml_utils.node_to_string(element)
+
+    try:
+        changes = xml_utils.apply_patches(element, patches)
+    except (ValueError, TypeError, etree.XPathError) as e:
+        # a patch that fails on this record mustn't stop the whole batch
+        return fname, 0, None, str(e)
+
+    diff = None
+    if changes:
+        contents = xml_utils.node_to_string(element)
+        if dry_run:
+            diff = ''.join(difflib.unified_diff(
+                original.splitlines(True), contents.splitlines(True),
+                fromfile=fname, tofile=fname))
+        else:
+            try:
+                write_atomic(contents, fname)
+            except OSError as e:
+                return fname, 0, None, 'could not write file: {}'.format(e)
+    return fname, changes, diff, None
+
+
+def edit_records(source, patches, workers=None, chunksize=16,
+                 dry_run=False):
+    """
+    Generator that applies a patch set to many records over a pool of
+    processes.  Results are yielded as soon as they are completed, not in
+    the order of the inputs.
+
+    Parameters
+    ----------
+    source : str or list
+            directory to search or list of file names
+    patches : list of dict
+            see xml_utils.apply_patch
+    workers : int (optional)
+            number of worker processes, defaults to the cpu count.
+            1 runs everything in the current process.
+    chunksize : int
+            number of files sent to a worker at a time
+    dry_run : bool
+            don't change any files, return diffs of the changes instead
+
+    Returns
+    -------
+        generator of (filename, changes, diff, error) tuples
+    """
+    for patch in patches:
+        xml_utils.check_patch(patch)
+
+    fnames = find_records(source)
+    if not fnames:
+        return
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(fnames)))
+
+    edit = functools.partial(edit_record, patches=patches, dry_run=dry_run)
+    if workers == 1:
+        for fname in fnames:
+            yield edit(fname)
+        return
+
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        for result in pool.imap_unordered(edit, fnames, chunksize=chunksize):
+            yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Apply a patch set to all the FGDC records in a directory")
+    parser.add_argument("patches", help="json file containing the patch set")
+    parser.add_argument("source", nargs='+',
+                        help="directory to search or list of xml files")
+    parser.add_argument("-n", "--dry-run", action='store_true',
+                        help="print a diff of the changes, don't save them")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of worker processes (default: cpu count)")
+    parser.add_argument("-c", "--chunksize", type=int, default=16,
+                        help="number of files handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    if len(args.source) == 1:
+        source = args.source[0]
+    else:
+        source = args.source
+
+    patches = load_patches(args.patches)
+    results = edit_records(source, patches, workers=args.workers,
+                           chunksize=args.chunksize, dry_run=args.dry_run)
+    edited = failed = 0
+    for fname, changes, diff, error in results:
+        if error:
+            failed += 1
+            print('{}: {}'.format(fname, error), file=sys.stderr)
+        elif changes:
+            edited += 1
+            if diff:
+                sys.stdout.write(diff)
+    verb = 'would be changed' if args.dry_run else 'changed'
+    print('{} records {}, {} errors'.format(edited, verb, failed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+License:            Creative Commons Attribution 4.0 International (CC BY 4.0)
+                    http://creativecommons.org/licenses/by/4.0/
+
+PURPOSE
+------------------------------------------------------------------------------
+Validate directories or lists of FGDC records in parallel and write the
+results to a csv or jsonl report.
+
+usage:
+    python -m pymdwizard.core.batch_validation c:/temp/metadata -o report.csv
+
+
+SCRIPT DEPENDENCIES
+------------------------------------------------------------------------------
+    None
+
+
+U.S. GEOLOGICAL SURVEY DISCLAIMER
+------------------------------------------------------------------------------
+Any use of trade, product or firm names is for descriptive purposes only and
+does not imply endorsement by the U.S. Geological Survey.
+
+Although this information product, for the most part, is in the public domain,
+it also contains copyrighted material as noted in the text. Permission to
+reproduce copyrighted items for other than personal use must be secured from
+the copyright owner.
+
+Although these data have been processed successfully on a computer system at
+the U.S. Geological Survey, no warranty, expressed or implied is made
+regarding the display or utility of the data on any other system, or for
+general or scientific purposes, nor shall the act of distribution constitute
+any such warranty. The U.S. Geological Survey shall not be held liable for
+improper or incorrect use of the data described and/or contained herein.
+
+Although this program has been used by the U.S. Geological Survey (USGS), no
+warranty, expressed or implied, is made by the USGS or the U.S. Government as
+to the accuracy and functioning of the program and related program material
+nor shall the fact of distribution constitute any such warranty, and no
+responsibility is assumed by the USGS in connection therewith.
+------------------------------------------------------------------------------
+"""
+# built in Python imports
+import os
+import sys
+import csv
+import json
+import glob
+import argparse
+import functools
+import multiprocessing
+
+# internal package imports
+from pymdwizard.core import xml_utils
+from pymdwizard.core import fgdc_utils
+
+REPORT_COLUMNS = ['filename', 'title', 'abstract', 'errors']
+
+
+def find_records(source, pattern='*.xml', recursive=True):
+    """
+    Returns the list of xml files to validate
+
+    Parameters
+    ----------
+    source : str or list
+            directory to search or list of file names
+    pattern : str
+            glob pattern the file names must match
+    recursive : bool
+            whether to include sub directories of source
+
+    Returns
+    -------
+        list of str
+    """
+    if not isinstance(source, str):
+        return list(source)
+
+    if os.path.isfile(source):
+        return [source]
+
+    if recursive:
+        search = os.path.join(source, '**', pattern)
+    else:
+        search = os.path.join(source, pattern)
+
+    fnames = glob.glob(search, recursive=recursive)
+    return sorted(f for f in fnames if '~' not in os.path.basename(f))
+
+
+def validate_record(fname, schema='fgdc', use_cache=False):
+    """
+    Validate a single record and pull out the items used in the report
+
+    Parameters
+    ----------
+    fname : str
+            full path to the xml file
+    schema : str
+            'fgdc', 'bdp' or the full file path to a local schema
+    use_cache : bool
+            reuse results from the on disk validation cache
+
+    Returns
+    -------
+        tuple: (filename, title, abstract, errors)
+        errors is a list of (xpath, message, line number) tuples
+    """
+    try:
+        xml = xml_utils.fname_to_node(fname)
+    except BaseException:
+        return (fname, "<<<could not get the title>>>",
+                "<<<could not get the abstract>>>", "<<<could not open file>>>")
+
+    title = xml_utils.get_text_content(xml, 'idinfo/citation/citeinfo/title')
+    abstract = xml_utils.get_text_content(xml, 'idinfo/descript/abstract')
+    errors = fgdc_utils.validate_xml(xml, xsl_fname=schema,
+                                     use_cache=use_cache)
+    return fname, title, abstract, errors
+
+
+def _init_worker(schema):
+    """
+    Compile the schema once when each worker process starts
+    """
+    fgdc_utils.preload_schemas(schema)
+
+
+def validate_records(source, schema='fgdc', workers=None, chunksize=16,
+                     skip=None, use_cache=False):
+    """
+    Generator that validates many records over a pool of processes.
+    Results are yielded as soon as they are completed, not in the order
+    of the inputs.
+
+    Parameters
+    ----------
+    source : str or list
+            directory to search or list of file names
+    schema : str
+            'fgdc', 'bdp' or the full file path to a local schema
+    workers : int (optional)
+            number of worker processes, defaults to the cpu count.
+            1 runs everything in the current process.
+    chunksize : int
+            number of files sent to a worker at a time
+    skip : set (optional)
+            file names that should not be validated, for instance the
+            files already in a report being resumed
+    use_cache : bool
+            reuse results from the on disk validation cache for records
+            that have not changed since they were last validated
+
+    Returns
+    -------
+        generator of (filename, title, abstract, errors) tuples
+    """
+    fnames = find_records(source)
+    if skip:
+        fnames = [f for f in fnames if f not in skip]
+
+    if not fnames:
+        return
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(fnames)))
+
+    if workers == 1:
+        for fname in fnames:
+            yield validate_record(fname, schema=schema, use_cache=use_cache)
+        return
+
+    validate = functools.partial(validate_record, schema=schema,
+                                 use_cache=use_cache)
+    # don't hand an open sqlite connection to the forked workers
+    if fgdc_utils._validation_cache is not None:
+        fgdc_utils._validation_cache.close()
+    pool = multiprocessing.Pool(processes=workers, initializer=_init_worker,
+                                initargs=(schema,))
+    try:
+        for result in pool.imap_unordered(validate, fnames,
+                                          chunksize=chunksize):
+            yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def _report_format(report_fname):
+    if report_fname.lower().endswith(('.jsonl', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_report(report_fname):
+    """
+    Returns the file names already contained in an existing report
+
+    Parameters
+    ----------
+    report_fname : str
+            csv or jsonl report written by write_report
+
+    Returns
+    -------
+        set of str
+    """
+    if not os.path.exists(report_fname):
+        return set()
+
+    done = set()
+    with open(report_fname, newline='', encoding='utf-8') as report:
+        if _report_format(report_fname) == 'jsonl':
+            for line in report:
+                try:
+                    done.add(json.loads(line)['filename'])
+                except (ValueError, KeyError):
+                    # a partially written last line from an interrupted run
+                    pass
+        else:
+            for row in csv.DictReader(report):
+                done.add(row['filename'])
+    return done
+
+
+def write_report(results, report_fname, append=False):
+    """
+    Write validation results to a csv or jsonl report as they arrive.
+
+    Parameters
+    ----------
+    results : iterable
+            of (filename, title, abstract, errors) tuples
+    report_fname : str
+            output file name, ending in .jsonl writes one json document
+            per line, otherwise a csv is written
+    append : bool
+            add to the end of an existing report instead of overwriting it
+
+    Returns
+    -------
+        int : the number of records written
+    """
+    fmt = _report_format(report_fname)
+    new_file = not append or not os.path.exists(report_fname)
+    mode = 'w' if new_file else 'a'
+
+    count = 0
+    with open(report_fname, mode, newline='', encoding='utf-8') as report:
+        if fmt == 'csv':
+            csvwriter = csv.writer(report, delimiter=',', quotechar='"',
+                                   quoting=csv.QUOTE_MINIMAL)
+            if new_file:
+                csvwriter.writerow(REPORT_COLUMNS)
+
+        for fname, title, abstract, errors in results:
+            if fmt == 'csv':
+                csvwriter.writerow([fname, title, abstract, str(errors)])
+            else:
+                record = dict(zip(REPORT_COLUMNS,
+                                  [fname, title, abstract, errors]))
+                report.write(json.dumps(record) + '\n')
+            report.flush()
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Validate all the FGDC records in a directory")
+    parser.add_argument("source", nargs='+',
+                        help="directory to search or list of xml files")
+    parser.add_argument("-o", "--report", default='fgdc_report.csv',
+                        help="csv or jsonl file to write the results to")
+    parser.add_argument("-s", "--schema", default='fgdc',
+                        help="'fgdc', 'bdp' or path to a local xsd")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of worker processes (default: cpu count)")
+    parser.add_argument("-c", "--chunksize", type=int, default=16,
+                        help="number of files handed to a worker at a time")
+    parser.add_argument("-r", "--resume", action='store_true',
+                        help="skip files already in the report and append")
+    parser.add_argument("--cache", action='store_true',
+                        help="reuse results for records that have not changed")
+    parser.add_argument("--clear-cache", action='store_true',
+                        help="empty the validation cache before starting")
+    args = parser.parse_args(argv)
+
+    if args.clear_cache:
+        fgdc_utils.clear_validation_cache()
+
+    if len(args.source) == 1:
+        source = args.source[0]
+    else:
+        source = args.source
+
+    skip = read_report(args.report) if args.resume else None
+    results = validate_records(source, schema=args.schema,
+                               workers=args.workers,
+                               chunksize=args.chunksize, skip=skip,
+                               use_cache=args.cache)
+    count = write_report(results, args.report, append=args.resume)
+    print('{} records written to {}'.format(count, args.report))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
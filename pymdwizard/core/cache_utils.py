@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+License:            Creative Commons Attribution 4.0 International (CC BY 4.0)
+                    http://creativecommons.org/licenses/by/4.0/
+
+PURPOSE
+------------------------------------------------------------------------------
+Provide a small persistent key/value cache stored in the user's cache
+directory.  Used to keep results that are expensive to recompute between
+sessions (validation results, ITIS responses, etc.)
+
+
+SCRIPT DEPENDENCIES
+------------------------------------------------------------------------------
+    None
+
+
+U.S. GEOLOGICAL SURVEY DISCLAIMER
+------------------------------------------------------------------------------
+Any use of trade, product or firm names is for descriptive purposes only and
+does not imply endorsement by the U.S. Geological Survey.
+
+Although this information product, for the most part, is in the public domain,
+it also contains copyrighted material as noted in the text. Permission to
+reproduce copyrighted items for other than personal use must be secured from
+the copyright owner.
+
+Although these data have been processed successfully on a computer system at
+the U.S. Geological Survey, no warranty, expressed or implied is made
+regarding the display or utility of the data on any other system, or for
+general or scientific purposes, nor shall the act of distribution constitute
+any such warranty. The U.S. Geological Survey shall not be held liable for
+improper or incorrect use of the data described and/or contained herein.
+
+Although this program has been used by the U.S. Geological Survey (USGS), no
+warranty, expressed or implied, is made by the USGS or the U.S. Government as
+to the accuracy and functioning of the program and related program material
+nor shall the fact of distribution constitute any such warranty, and no
+responsibility is assumed by the USGS in connection therewith.
+------------------------------------------------------------------------------
+"""
+# built in Python imports
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+def get_cache_dname():
+    """
+    Returns the directory pymdwizard keeps its cache files in,
+    creating it if it does not exist yet.
+
+    Returns
+    -------
+        str : full path to the cache directory
+    """
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA',
+                              os.path.expanduser(r'~\AppData\Local'))
+        dname = os.path.join(base, 'USGS', 'pymdwizard', 'Cache')
+    elif sys.platform == 'darwin':
+        dname = os.path.expanduser('~/Library/Caches/pymdwizard')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME',
+                              os.path.expanduser('~/.cache'))
+        dname = os.path.join(base, 'pymdwizard')
+
+    if not os.path.exists(dname):
+        os.makedirs(dname)
+    return dname
+
+
+class SQLiteCache(object):
+    """
+    A key/value store in a single sqlite file with least recently used
+    eviction once it holds more than max_entries items or max_bytes of data.
+    Safe to share between threads and between processes, a process forked
+    with an open cache opens its own connection on first use.
+    Entries older than a max_age can be ignored when they are read.
+    Reads only record the access time in memory, it is written out in
+    batches so that reads don't have to wait for a write to the file.
+
+    Parameters
+    ----------
+    fname : str
+            the sqlite file to use, relative names are placed in the
+            user cache directory
+    max_entries : int
+            maximum number of items to keep
+    max_bytes : int
+            maximum total size of the stored values
+    """
+    # number of reads whose access times are held before writing them
+    access_batch_size = 100
+
+    def __init__(self, fname, max_entries=10000, max_bytes=100*1024**2):
+        if not os.path.isabs(fname):
+            fname = os.path.join(get_cache_dname(), fname)
+        self.fname = fname
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._connection = None
+        # process the connection was opened in
+        self._pid = None
+        self._lock = threading.RLock()
+        # key: time it was last read, not yet written to the file
+        self._accessed = {}
+
+    def _connect(self):
+        if self._connection is not None and self._pid != os.getpid():
+            # inherited through a fork, sqlite connections can not be
+            # shared between processes.  No transaction is ever left open,
+            # so dropping it does not affect the parent.
+            self._connection = None
+            self._accessed = {}
+
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.fname, timeout=30,
+                                               check_same_thread=False)
+            self._pid = os.getpid()
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                   key TEXT PRIMARY KEY,
+                   value BLOB,
+                   size INTEGER,
+                   accessed REAL,
+                   created REAL)""")
+            self._connection.execute(
+                """CREATE INDEX IF NOT EXISTS cache_accessed
+                   ON cache (accessed)""")
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key, default=None, max_age=None):
+        """
+        Returns the value stored for key, or default if it is not present
+        or was stored more than max_age seconds ago
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                'SELECT value, created FROM cache WHERE key=?',
+                (key,)).fetchone()
+            if row is None or _expired(row[1], max_age):
+                return default
+
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= self.access_batch_size:
+                self.flush()
+            return bytes(row[0])
+
+    def set(self, key, value):
+        """
+        Store value (bytes) under key, evicting old items if needed
+        """
+        with self._lock:
+            connection = self._connect()
+            now = time.time()
+            self._accessed.pop(key, None)
+            connection.execute(
+                'INSERT OR REPLACE INTO cache '
+                '(key, value, size, accessed, created) VALUES (?, ?, ?, ?, ?)',
+                (key, sqlite3.Binary(value), len(value), now, now))
+            connection.commit()
+            self.evict()
+
+    def flush(self):
+        """
+        Write out the access times of the items read since the last flush
+        """
+        with self._lock:
+            if not self._accessed:
+                return
+            connection = self._connect()
+            connection.executemany(
+                'UPDATE cache SET accessed=? WHERE key=?',
+                [(accessed, key) for key, accessed in self._accessed.items()])
+            connection.commit()
+            self._accessed = {}
+
+    def delete(self, key):
+        with self._lock:
+            connection = self._connect()
+            connection.execute('DELETE FROM cache WHERE key=?', (key,))
+            connection.commit()
+
+    def evict(self):
+        """
+        Remove the least recently used items until the cache is within
+        the max_entries and max_bytes limits
+        """
+        with self._lock:
+            # the least recently used items depend on the pending reads
+            self.flush()
+            connection = self._connect()
+            count, total = connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                return
+
+            rows = connection.execute(
+                'SELECT key, size FROM cache ORDER BY accessed').fetchall()
+            doomed = []
+            for key, size in rows:
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                count -= 1
+                total -= size
+            connection.executemany('DELETE FROM cache WHERE key=?', doomed)
+            connection.commit()
+
+    def clear(self):
+        """
+        Remove everything from the cache
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute('DELETE FROM cache')
+            connection.commit()
+            self._accessed = {}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                if self._pid == os.getpid():
+                    self.flush()
+                self._connection.close()
+                self._connection = None
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT 1 FROM cache WHERE key=?', (key,)).fetchone()
+            return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute(
+                'SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def __getstate__(self):
+        # connections can not be sent to other processes
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_lock'] = None
+        state['_accessed'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+
+class DirectoryCache(object):
+    """
+    The same interface as SQLiteCache, with each value stored in its own
+    file in a directory.  Useful where sqlite files can not be shared,
+    e.g. on some network drives.  The directory is only scanned for items
+    to evict every evict_interval writes, or sooner if the writes since
+    the last scan could have taken it over the limits.
+
+    Parameters
+    ----------
+    dname : str
+            the directory to use, relative names are placed in the
+            user cache directory
+    max_entries : int
+            maximum number of items to keep
+    max_bytes : int
+            maximum total size of the stored values
+    """
+    # number of writes between scans of the directory, other processes
+    # can be writing to it too
+    evict_interval = 100
+
+    def __init__(self, dname, max_entries=10000, max_bytes=100*1024**2):
+        if not os.path.isabs(dname):
+            dname = os.path.join(get_cache_dname(), dname)
+        if not os.path.exists(dname):
+            os.makedirs(dname)
+        self.dname = dname
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # (count, total size) at most in the directory, from the last scan
+        # plus the writes since, None until the first scan
+        self._usage = None
+        self._writes = 0
+
+    def _fname(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.dname, digest + '.cache')
+
+    def _entries(self):
+        entries = []
+        for fname in os.listdir(self.dname):
+            if fname.endswith('.cache'):
+                fname = os.path.join(self.dname, fname)
+                try:
+                    entries.append((fname, os.stat(fname)))
+                except OSError:
+                    pass
+        return entries
+
+    def get(self, key, default=None, max_age=None):
+        """
+        Returns the value stored for key, or default if it is not present
+        or was stored more than max_age seconds ago
+        """
+        fname = self._fname(key)
+        try:
+            created = os.path.getmtime(fname)
+            if _expired(created, max_age):
+                return default
+            with open(fname, 'rb') as f:
+                value = f.read()
+            # the access time marks it as recently used
+            os.utime(fname, (time.time(), created))
+        except OSError:
+            return default
+        return value
+
+    def set(self, key, value):
+        """
+        Store value (bytes) under key, evicting old items if needed
+        """
+        fname = self._fname(key)
+        temp_fname = '{}.{}.tmp'.format(fname, os.getpid())
+        with open(temp_fname, 'wb') as f:
+            f.write(value)
+        os.replace(temp_fname, fname)
+
+        self._writes += 1
+        if self._usage is None or self._writes >= self.evict_interval:
+            self.evict()
+        else:
+            # counts a replaced item twice, which only makes the next
+            # scan come sooner
+            count, total = self._usage
+            self._usage = count + 1, total + len(value)
+            if count + 1 > self.max_entries or \
+                    total + len(value) > self.max_bytes:
+                self.evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._fname(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Remove the least recently used items until the cache is within
+        the max_entries and max_bytes limits
+        """
+        entries = self._entries()
+        count = len(entries)
+        total = sum(stat.st_size for fname, stat in entries)
+        self._writes = 0
+        self._usage = count, total
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        entries.sort(key=lambda entry: entry[1].st_atime)
+        for fname, stat in entries:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+            count -= 1
+            total -= stat.st_size
+        self._usage = count, total
+
+    def clear(self):
+        """
+        Remove everything from the cache
+        """
+        for fname, stat in self._entries():
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+
+    def close(self):
+        pass
+
+    def __contains__(self, key):
+        return os.path.exists(self._fname(key))
+
+    def __len__(self):
+        return len(self._entries())
+
+
+def _expired(created, max_age):
+    return max_age is not None and \
+           (created is None or time.time() - created > max_age)
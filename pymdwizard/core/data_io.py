@@ -2,9 +2,6 @@
 import os
 
 import pandas as pd
-import geopandas as gpd
-
-from  osgeo import ogr, osr
 
 def read_csv(filepath):
     """
@@ -25,6 +22,7 @@ def read_csv(filepath):
 
 
 def read_shp(filepath):
+    import geopandas as gpd
     df = gpd.read_file(filepath)
     return df[[c for c in df.columns if c != 'geometry']]
 
@@ -1,3 +1,9 @@
+import os
+import re
+import json
+import hashlib
+import threading
+
 import requests
 
 from dateutil import parser
@@ -7,9 +13,185 @@ import pandas as pd
 
 from pymdwizard.core import xml_utils
 from pymdwizard.core import utils
+from pymdwizard.core import cache_utils
+
+
+SCHEMA_ALIASES = {'fgdc': 'FGDC/fgdc-std-001-1998-annotated.xsd',
+                  'bdp': 'FGDC/BDPfgdc-std-001-1998-annotated.xsd'}
+
+# process wide registry of compiled schemas
+# keyed on (absolute path, modification time) of the xsd
+_schema_cache = {}
+_schema_lock = threading.Lock()
+
+
+def get_schema_fname(xsl_fname='fgdc'):
+    """
+    Resolve a schema alias into the full path of the xsd it refers to
+
+    Parameters
+    ----------
+    xsl_fname : str
+                'fgdc', 'bdp' or the full file path to a local schema
+
+    Returns
+    -------
+        str : absolute path to the xsd file
+    """
+    if xsl_fname.lower() in SCHEMA_ALIASES:
+        xsl_fname = utils.get_resource_path(SCHEMA_ALIASES[xsl_fname.lower()])
+    return os.path.abspath(xsl_fname)
+
+
+def _schema_key(xsl_fname):
+    fname = get_schema_fname(xsl_fname)
+    return fname, os.path.getmtime(fname)
+
+
+def load_schema(xsl_fname='fgdc'):
+    """
+    Returns the compiled lxml XMLSchema for a schema.
+    Each schema is only parsed and compiled once per process, subsequent
+    calls return the same object unless the xsd has been modified on disk.
+
+    Parameters
+    ----------
+    xsl_fname : str
+                'fgdc', 'bdp' or the full file path to a local schema
+
+    Returns
+    -------
+        lxml XMLSchema
+    """
+    key = _schema_key(xsl_fname)
+    with _schema_lock:
+        try:
+            return _schema_cache[key]
+        except KeyError:
+            pass
+
+        # drop any stale versions of this same file
+        for stale_key in [k for k in _schema_cache if k[0] == key[0]]:
+            del _schema_cache[stale_key]
+
+        xmlschema = etree.XMLSchema(etree.parse(key[0]))
+        _schema_cache[key] = xmlschema
+        return xmlschema
+
+
+def preload_schemas(*xsl_fnames):
+    """
+    Compile one or more schemas ahead of time so that the first call to
+    validate_xml does not pay the cost.
+
+    Parameters
+    ----------
+    xsl_fnames : str
+                'fgdc', 'bdp' or the full file path to a local schema
+                if none specified both 'fgdc' and 'bdp' are loaded
+
+    Returns
+    -------
+        None
+    """
+    if not xsl_fnames:
+        xsl_fnames = list(SCHEMA_ALIASES.keys())
 
+    for xsl_fname in xsl_fnames:
+        load_schema(xsl_fname)
 
-def validate_xml(xml, xsl_fname='fgdc', as_dataframe=False):
+
+def invalidate_schema(xsl_fname=None):
+    """
+    Remove a compiled schema from the registry, it will be recompiled
+    the next time it is needed.
+
+    Parameters
+    ----------
+    xsl_fname : str (optional)
+                'fgdc', 'bdp' or the full file path to a local schema
+                if not specified all compiled schemas are removed
+
+    Returns
+    -------
+        None
+    """
+    with _schema_lock:
+        if xsl_fname is None:
+            _schema_cache.clear()
+        else:
+            fname = get_schema_fname(xsl_fname)
+            for key in [k for k in _schema_cache if k[0] == fname]:
+                del _schema_cache[key]
+
+
+VALIDATION_CACHE_FNAME = 'validation.sqlite'
+_validation_cache = None
+
+
+def get_validation_cache():
+    """
+    Returns the on disk cache of validation results shared by this process
+
+    Returns
+    -------
+        cache_utils.SQLiteCache
+    """
+    global _validation_cache
+    if _validation_cache is None:
+        _validation_cache = cache_utils.SQLiteCache(VALIDATION_CACHE_FNAME)
+    return _validation_cache
+
+
+def clear_validation_cache():
+    """
+    Remove all of the stored validation results
+
+    Returns
+    -------
+        None
+    """
+    get_validation_cache().clear()
+
+
+def _validation_cache_key(xml, xsl_fname):
+    """
+    Key for a record/schema combination in the validation cache.
+    Records are hashed on their canonical form (see
+    xml_utils.canonicalize), so records that only differ in formatting
+    share their results.
+    """
+    schema_fname, schema_mtime = _schema_key(xsl_fname)
+    return '{}|{}|{}'.format(xml_utils.content_hash(xml),
+                             schema_fname, schema_mtime)
+
+
+def _update_error_lines(tree, errors):
+    """
+    Replace the line numbers of cached errors with those of the elements
+    they refer to in tree, which can be formatted differently from the
+    record the errors were found in.
+    """
+    if isinstance(tree, etree._ElementTree):
+        tree = tree.getroot()
+    if tree.sourceline is None:
+        # built in memory, there are no lines to find
+        return errors
+
+    updated = []
+    for xpath, message, line in errors:
+        if xpath != 'Unknown':
+            try:
+                matches = tree.xpath('/' + xpath)
+            except etree.XPathError:
+                matches = []
+            if matches and matches[0].sourceline is not None:
+                line = matches[0].sourceline
+        updated.append((xpath, message, line))
+    return updated
+
+
+def validate_xml(xml, xsl_fname='fgdc', as_dataframe=False, use_cache=False):
     """
 
     Parameters
@@ -29,6 +211,14 @@ def validate_xml(xml, xsl_fname='fgdc', as_dataframe=False):
                 full file path to another local schema.
 
                 if not specified defaults to 'fgdc'
+                compiled schemas are shared through load_schema
+
+    as_dataframe : bool (optional)
+                return a pandas dataframe instead of a list
+
+    use_cache : bool (optional)
+                look the record up in the on disk validation cache and
+                store the results there if it is not found.
 
     Returns
     -------
@@ -36,41 +226,208 @@ def validate_xml(xml, xsl_fname='fgdc', as_dataframe=False):
         (
     """
 
-    if xsl_fname.lower() == 'fgdc':
-        xsl_fname = utils.get_resource_path('fgdc/fgdc-std-001-1998-annotated.xsd')
-    elif xsl_fname.lower() == 'bdp':
-        xsl_fname = utils.get_resource_path('fgdc/BDPfgdc-std-001-1998-annotated.xsd')
-    else:
-        xsl_fname = xsl_fname
+    if use_cache:
+        # parsed once to be hashed, validated and to find the lines of
+        # cached errors in
+        tree = xml_utils.xml_document_loader(xml)
+        cache = get_validation_cache()
+        cache_key = _validation_cache_key(tree, xsl_fname)
+        cached = cache.get(cache_key)
+        if cached is None:
+            errors = validate_xml(tree, xsl_fname)
+            cache.set(cache_key, json.dumps(errors).encode('utf-8'))
+        else:
+            errors = [tuple(error) for error in json.loads(cached.decode())]
+            errors = _update_error_lines(tree, errors)
+        return _format_errors(errors, as_dataframe)
 
-    xmlschema_doc = etree.parse(xsl_fname)
-    xmlschema = etree.XMLSchema(xmlschema_doc)
+    xmlschema = load_schema(xsl_fname)
 
-    xml_str = xml_utils.node_to_string(xml_utils.xml_document_loader(xml))
-    tree = etree.ElementTree(etree.fromstring(xml_str))
+    tree = xml_utils.xml_document_loader(xml)
 
     if xmlschema.validate(tree):
         return []
 
-    # tree = etree.ElementTree(xml)
-    line_lookup = dict([(e.sourceline, tree.getpath(e)) for e in tree.xpath('.//*')])
-    line_lookup[tree.getroot().sourceline] = tree.getpath(tree.getroot())
     errors = []
+    missing_lines = set()
     for error in xmlschema.error_log:
-        try:
-            errors.append((line_lookup[error.line][1:],
-                           clean_error_message(error.message), error.line))
-        except KeyError:
-            errors.append(('Unknown', clean_error_message(error.message),
-                           error.line))
+        errors.append([error.path, clean_error_message(error.message),
+                       error.line])
+        if not error.path:
+            missing_lines.add(error.line)
+
+    if missing_lines:
+        line_lookup = _lookup_lines(tree, missing_lines)
+        for error in errors:
+            if not error[0]:
+                error[0] = line_lookup.get(error[2], '')
+
+    errors = [(xpath[1:] if xpath else 'Unknown', message, line)
+              for xpath, message, line in errors]
+
+    return _format_errors(errors, as_dataframe)
+
 
-    if as_dataframe:
+def _format_errors(errors, as_dataframe=False):
+    if as_dataframe and errors:
         cols = ['xpath', 'message', 'line number']
         return pd.DataFrame.from_records(errors, columns=cols)
     else:
         return errors
 
 
+def _lookup_lines(tree, lines):
+    """
+    Find the xpath of the elements that start on each of the lines given.
+    Only used for errors that libxml did not report a path for, and stops
+    as soon as all the lines have been found.
+
+    Parameters
+    ----------
+    tree : lxml element or document
+    lines : set of int
+            source line numbers to resolve
+
+    Returns
+    -------
+        dict : line number -> xpath
+    """
+    if isinstance(tree, etree._ElementTree):
+        root = tree.getroot()
+    else:
+        root = tree
+        tree = root.getroottree()
+
+    last_line = max(lines)
+    line_lookup = {}
+    for element in root.iter(tag=etree.Element):
+        line = element.sourceline
+        if line is None:
+            continue
+        if line > last_line:
+            break
+        if line in lines:
+            # the last element starting on a line is the one reported
+            line_lookup[line] = tree.getpath(element)
+    return line_lookup
+
+
+METADATA_SECTIONS = ['idinfo', 'dataqual', 'spdoinfo', 'spref', 'eainfo',
+                     'distinfo', 'metainfo']
+
+# the content model of metadataType in both the fgdc and bdp schemas
+_METADATA_LAYOUT = re.compile(r'^idinfo (dataqual )?(spdoinfo )?(spref )?'
+                              r'(eainfo )?(distinfo )*metainfo $')
+
+
+class SectionValidator(object):
+    """
+    Validates a record one top level section (idinfo, dataqual, spdoinfo,
+    spref, eainfo, distinfo, metainfo) at a time.  Each section is checked
+    against its own global element in the schema, and sections that have
+    not changed since the last call reuse their previous errors.
+
+    Records whose top level layout does not match the schema are
+    validated in full with validate_xml.
+
+    Parameters
+    ----------
+    xsl_fname : str (optional)
+                'fgdc', 'bdp' or the full file path to a local schema
+    """
+    def __init__(self, xsl_fname='fgdc'):
+        self.xsl_fname = xsl_fname
+        # (schema key, section xpath) -> (section digest, errors)
+        self._results = {}
+
+    def clear(self):
+        """
+        Forget the cached section results
+        """
+        self._results = {}
+
+    def validate(self, xml, xsl_fname=None, as_dataframe=False):
+        """
+        Parameters
+        ----------
+        xml : lxml document or element
+                or
+              filename
+                or
+              string containing xml representation
+        xsl_fname : str (optional)
+                'fgdc', 'bdp' or the full file path to a local schema
+                defaults to the schema this validator was created with
+        as_dataframe : bool (optional)
+                return a pandas dataframe instead of a list
+
+        Returns
+        -------
+            list of (xpath, message, line number) tuples, the same as
+            validate_xml
+        """
+        if xsl_fname is None:
+            xsl_fname = self.xsl_fname
+
+        metadata = xml_utils.xml_document_loader(xml)
+        if isinstance(metadata, etree._ElementTree):
+            metadata = metadata.getroot()
+
+        sections = [child for child in metadata
+                    if isinstance(child.tag, str)]
+        layout = ''.join(child.tag + ' ' for child in sections)
+        if metadata.tag != 'metadata' or not _METADATA_LAYOUT.match(layout):
+            self.clear()
+            return validate_xml(metadata, xsl_fname, as_dataframe)
+
+        schema_key = _schema_key(xsl_fname)
+        xmlschema = load_schema(xsl_fname)
+        distinfo_count = layout.split().count('distinfo')
+
+        results = {}
+        errors = []
+        for section in sections:
+            xpath = section.tag
+            if xpath == 'distinfo' and distinfo_count > 1:
+                xpath = metadata.getroottree().getpath(section).split('/')[-1]
+
+            key = (schema_key, xpath)
+            digest = hashlib.sha1(etree.tostring(section,
+                                                 method='c14n')).digest()
+            try:
+                last_digest, section_errors = self._results[key]
+                if last_digest != digest:
+                    raise KeyError
+            except KeyError:
+                section_errors = self._validate_section(xmlschema, section,
+                                                        xpath)
+            results[key] = (digest, section_errors)
+            errors.extend(section_errors)
+
+        self._results = results
+        return _format_errors(errors, as_dataframe)
+
+    def _validate_section(self, xmlschema, section, xpath):
+        if xmlschema.validate(section):
+            return []
+
+        errors = []
+        for error in xmlschema.error_log:
+            if error.path:
+                # error paths start at the section element
+                path = 'metadata/' + xpath + error.path[len(section.tag)+1:]
+            else:
+                path = _lookup_lines(section, {error.line}).get(error.line)
+                if path:
+                    section_path = section.getroottree().getpath(section)
+                    path = 'metadata/' + xpath + path[len(section_path):]
+                else:
+                    path = 'Unknown'
+            errors.append((path, clean_error_message(error.message),
+                           error.line))
+        return errors
+
+
 def clean_error_message(message):
     """
     Returns a cleaned up, more informative translation
@@ -45,18 +45,57 @@ import collections
 from pymdwizard.core.xml_utils import xml_node
 from pymdwizard.core import utils
 
-try:
-    python_root = utils.get_install_dname('python')
-    gdal_data = os.path.join(python_root, 'Library', 'share', 'gdal')
-    os.environ['GDAL_DATA'] = gdal_data
-
-    from osgeo import gdal, osr, ogr
-    gdal.UseExceptions()
-    gdal.AllRegister()
-    use_gdal = True
-except ImportError:
-    print('ERROR Importing GDAL, Spatial functionality limited')
-    use_gdal = False
+# GDAL is slow to import, so it is not imported until one of the functions
+# below first uses gdal, osr or ogr.  use_gdal is None until then.
+use_gdal = None
+
+
+def _load_gdal():
+    """
+    Import GDAL and replace the module level gdal, osr and ogr placeholders
+    with the real modules.
+
+    Returns
+    -------
+    bool : True if GDAL could be imported
+    """
+    global gdal, osr, ogr, use_gdal
+    if use_gdal is not None:
+        return use_gdal
+
+    try:
+        python_root = utils.get_install_dname('python')
+        gdal_data = os.path.join(python_root, 'Library', 'share', 'gdal')
+        os.environ['GDAL_DATA'] = gdal_data
+
+        from osgeo import gdal, osr, ogr
+        gdal.UseExceptions()
+        gdal.AllRegister()
+        use_gdal = True
+    except ImportError:
+        print('ERROR Importing GDAL, Spatial functionality limited')
+        use_gdal = False
+    return use_gdal
+
+
+class _DeferredGDALModule(object):
+    """
+    Placeholder for one of the osgeo modules that imports GDAL the
+    first time one of its attributes is used.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        if not _load_gdal():
+            raise ImportError('GDAL is required for ' +
+                              '{}.{}'.format(self.name, attr))
+        return getattr(globals()[self.name], attr)
+
+
+gdal = _DeferredGDALModule('gdal')
+osr = _DeferredGDALModule('osr')
+ogr = _DeferredGDALModule('ogr')
 
 def _get_raster_extent(src):
     """
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""
+License:            Creative Commons Attribution 4.0 International (CC BY 4.0)
+                    http://creativecommons.org/licenses/by/4.0/
+
+PURPOSE
+------------------------------------------------------------------------------
+Collect and report how long the parts of the application startup take
+(module imports, construction of each section of the form and the time
+until the main window is first painted).  Used by the --profile-startup
+option of MetadataWizard.py
+
+
+SCRIPT DEPENDENCIES
+------------------------------------------------------------------------------
+    None
+
+
+U.S. GEOLOGICAL SURVEY DISCLAIMER
+------------------------------------------------------------------------------
+Any use of trade, product or firm names is for descriptive purposes only and
+does not imply endorsement by the U.S. Geological Survey.
+
+Although this information product, for the most part, is in the public domain,
+it also contains copyrighted material as noted in the text. Permission to
+reproduce copyrighted items for other than personal use must be secured from
+the copyright owner.
+
+Although these data have been processed successfully on a computer system at
+the U.S. Geological Survey, no warranty, expressed or implied is made
+regarding the display or utility of the data on any other system, or for
+general or scientific purposes, nor shall the act of distribution constitute
+any such warranty. The U.S. Geological Survey shall not be held liable for
+improper or incorrect use of the data described and/or contained herein.
+
+Although this program has been used by the U.S. Geological Survey (USGS), no
+warranty, expressed or implied, is made by the USGS or the U.S. Government as
+to the accuracy and functioning of the program and related program material
+nor shall the fact of distribution constitute any such warranty, and no
+responsibility is assumed by the USGS in connection therewith.
+------------------------------------------------------------------------------
+"""
+# built in Python imports
+import time
+import contextlib
+
+
+class StartupTimer(object):
+    """
+    Timings recorded while the application starts
+
+    Parameters
+    ----------
+    start_time : float (optional)
+                 time.time() when the application was launched,
+                 defaults to now
+    imports : list (optional)
+              (depth, module name, seconds) for each module imported,
+              in the order the imports started
+    """
+    def __init__(self, start_time=None, imports=None):
+        if start_time is None:
+            start_time = time.time()
+        self.start_time = start_time
+        self.imports = list(imports or [])
+        # (category, name, seconds)
+        self.timings = []
+
+    def elapsed(self):
+        """
+        Returns
+        -------
+        float : seconds since the application was launched
+        """
+        return time.time() - self.start_time
+
+    def record(self, category, name, seconds=None):
+        """
+        Record a timing
+
+        Parameters
+        ----------
+        category : str
+                   'section' for widget construction or 'milestone'
+                   for points in the startup sequence
+        name : str
+               what was timed
+        seconds : float (optional)
+                  how long it took, defaults to the time since launch
+
+        Returns
+        -------
+        None
+        """
+        if seconds is None:
+            seconds = self.elapsed()
+        self.timings.append((category, name, seconds))
+
+    @contextlib.contextmanager
+    def timed(self, category, name):
+        """
+        Context manager that records how long its block takes
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(category, name, time.time() - start)
+
+    def report(self, min_seconds=0.005, max_depth=2):
+        """
+        Format the recorded timings as a table
+
+        Parameters
+        ----------
+        min_seconds : float
+                      imports faster than this are left out of the report
+        max_depth : int
+                    imports nested deeper than this are left out of the
+                    report (0 only shows the modules imported directly)
+
+        Returns
+        -------
+        str
+        """
+        titles = {'section': 'Section construction',
+                  'milestone': 'Time since launch'}
+
+        lines = ['Startup timing (seconds)']
+        if self.imports:
+            lines += ['', 'Imports:']
+            for depth, name, seconds in self.imports:
+                if seconds >= min_seconds and depth <= max_depth:
+                    lines.append('{:8.3f}  {}{}'.format(seconds, '  ' * depth,
+                                                        name))
+
+        categories = []
+        for category, name, seconds in self.timings:
+            if category not in categories:
+                categories.append(category)
+
+        for category in categories:
+            lines += ['', titles.get(category, category) + ':']
+            for which, name, seconds in self.timings:
+                if which == category:
+                    lines.append('{:8.3f}  {}'.format(seconds, name))
+
+        return '\n'.join(lines)
+
+
+_timer = None
+
+
+def start(start_time=None, imports=None):
+    """
+    Start collecting startup timings
+
+    Parameters
+    ----------
+    start_time : float (optional)
+                 time.time() when the application was launched
+    imports : list (optional)
+              import timings collected before pymdwizard was imported
+
+    Returns
+    -------
+    StartupTimer
+    """
+    global _timer
+    _timer = StartupTimer(start_time=start_time, imports=imports)
+    return _timer
+
+
+def stop():
+    """
+    Stop collecting startup timings
+
+    Returns
+    -------
+    StartupTimer : the timer that was active, or None
+    """
+    global _timer
+    timer, _timer = _timer, None
+    return timer
+
+
+def get_timer():
+    """
+    Returns
+    -------
+    StartupTimer : the active timer, None if startup is not being profiled
+    """
+    return _timer
+
+
+def record(category, name, seconds=None):
+    """
+    Record a timing on the active timer, does nothing if there isn't one
+    """
+    if _timer is not None:
+        _timer.record(category, name, seconds)
+
+
+@contextlib.contextmanager
+def timed(category, name):
+    """
+    Time a block on the active timer, does nothing if there isn't one
+    """
+    if _timer is None:
+        yield
+    else:
+        with _timer.timed(category, name):
+            yield
@@ -5,10 +5,31 @@ Attributes
 ----------
 ITIS_BASE_URL : str
     ITIS service base url
+RANK_NAMES_FNAME : str
+    file in the user cache directory the ITIS rank names are kept in
+ITIS_CACHE_FNAME : str
+    sqlite file in the user cache directory ITIS responses are kept in
+ITIS_CACHE_TTL : int
+    default number of seconds a cached ITIS response is used for
+ITIS_MAX_WORKERS : int
+    default number of ITIS queries made at the same time
+ITIS_RETRIES : int
+    number of times a query that failed for a transient reason is retried
+ITIS_BACKOFF : float
+    seconds to wait before the first retry, doubled for each one after
+ITIS_TIMEOUT : tuple
+    (connect, read) timeout in seconds for each ITIS query
 """
+import os
+import json
+import time
+import urllib.parse
 import collections
+import threading
+import concurrent.futures
 import requests
 import warnings
+import pkg_resources
 
 from lxml import etree
 
@@ -20,6 +41,7 @@ except ImportError:
 
 # internal package imports
 from pymdwizard.core import xml_utils
+from pymdwizard.core import cache_utils
 
 ITIS_BASE_URL = 'http://www.itis.gov/ITISWebService/services/ITISService/'
 NS21 = {'ax21': 'http://data.itis_service.itis.usgs.gov/xsd'}
@@ -34,6 +56,29 @@ kingdom_lookup = {'Animalia': 202423,
                  'Archaea': 935939,
                  None: None}
 
+RANK_NAMES_FNAME = 'itis_rank_names.json'
+
+# ranks merge_taxons can place above Kingdom, these are not in ITIS
+_ROOT_RANKS = {'Life': 1, 'Domain': 5}
+
+_rank_lookup = None
+_rank_lock = threading.Lock()
+
+ITIS_CACHE_FNAME = 'itis.sqlite'
+ITIS_CACHE_TTL = 30 * 24 * 60 * 60
+
+_session = None
+# None until first used, False when caching has been turned off
+_response_cache = None
+_cache_ttl = ITIS_CACHE_TTL
+_offline = False
+_itis_lock = threading.Lock()
+
+ITIS_MAX_WORKERS = 16
+ITIS_RETRIES = 3
+ITIS_BACKOFF = 0.5
+ITIS_TIMEOUT = (5, 30)
+
 
 def search_by_common_name(common_name, as_dataframe=True, **kwargs):
     """
@@ -126,6 +171,49 @@ def get_full_hierarchy_from_tsn(tsn, as_dataframe=True, include_children=True,
         return d
 
 
+def get_full_hierarchies(tsns, as_dataframe=True, include_children=True,
+                          max_workers=ITIS_MAX_WORKERS):
+    """
+        Returns the get_full_hierarchy_from_tsn result for each of a list
+        of tsns, querying ITIS for up to max_workers of them at a time.
+
+    Parameters
+    ----------
+    tsns : list of int
+        The ITIS taxonomic serial numbers to query
+
+    as_dataframe : bool
+        if True return pandas dataframes, if False return lists of dictionaries
+
+    include_children : bool
+        flag to optionally return the child taxonomies of the given taxon
+
+    max_workers : int
+        maximum number of concurrent queries
+
+    Returns
+    -------
+        list with a result for each tsn, in the same order as tsns
+    """
+    def fetch(tsn):
+        return get_full_hierarchy_from_tsn(tsn, as_dataframe=as_dataframe,
+                                           include_children=include_children)
+
+    hierarchies = _map_concurrent(fetch, tsns, max_workers)
+    return [hierarchies[tsn] for tsn in tsns]
+
+
+def _map_concurrent(func, items, max_workers):
+    """
+    Returns {item: func(item)} for each unique item, calling func for up
+    to max_workers items at a time
+    """
+    unique_items = list(collections.OrderedDict.fromkeys(items))
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(unique_items)))) as pool:
+        return dict(zip(unique_items, pool.map(func, unique_items)))
+
+
 def get_common_names_tsn(tsn, as_dataframe=True, **kwargs):
     """
         Returns a list of items from the ITIS getFullHierarchyFromTSN function.
@@ -153,6 +241,37 @@ def get_common_names_tsn(tsn, as_dataframe=True, **kwargs):
         return xml_utils.element_to_list(commmon_names)
 
 
+def get_common_names(tsns, language='English', max_workers=ITIS_MAX_WORKERS):
+    """
+        Returns the common names in one language of each of a list of tsns,
+        querying ITIS for up to max_workers of them at a time.
+
+    Parameters
+    ----------
+    tsns : list of int
+        The ITIS taxonomic serial numbers to query
+
+    language : str
+        only common names in this language are returned
+
+    max_workers : int
+        maximum number of concurrent queries
+
+    Returns
+    -------
+        dictionary of str(tsn) to a list of common names
+    """
+    def fetch(tsn):
+        try:
+            common_names = get_common_names_tsn(tsn, as_dataframe=False)
+        except (ValueError, IndexError):
+            return []
+        return [common_name['commonName'] for common_name in common_names
+                if common_name.get('language') == language]
+
+    return _map_concurrent(fetch, [str(tsn) for tsn in tsns], max_workers)
+
+
 def get_rank_names(as_dataframe=True, **kwargs):
     """
     Provides a list of all the unique rank names contained in the database and
@@ -179,6 +298,77 @@ def get_rank_names(as_dataframe=True, **kwargs):
         return xml_utils.element_to_list(rank_names)
 
 
+def get_rank_lookup(refresh=False):
+    """
+    Returns a dictionary of ITIS rank name to rank ID, e.g. {'Genus': 180}.
+    The table is only built once per process and is shared by every Taxon.
+
+    It is read from RANK_NAMES_FNAME in the user cache directory if present,
+    otherwise fetched from ITIS (and written to that file), otherwise read
+    from the snapshot bundled in resources/taxonomy.
+
+    Parameters
+    ----------
+    refresh : bool
+        if True ignore the cache file and fetch the table from ITIS again
+
+    Returns
+    -------
+        dict
+    """
+    global _rank_lookup
+    with _rank_lock:
+        if _rank_lookup is None or refresh:
+            _rank_lookup = _load_rank_lookup(refresh)
+        return _rank_lookup
+
+
+def _load_rank_lookup(refresh=False):
+    cache_fname = os.path.join(cache_utils.get_cache_dname(),
+                               RANK_NAMES_FNAME)
+    if not refresh:
+        lookup = _read_rank_lookup(cache_fname)
+        if lookup:
+            return lookup
+
+    try:
+        rank_names = get_rank_names(as_dataframe=False)
+    except requests.exceptions.RequestException:
+        rank_names = []
+
+    if rank_names:
+        lookup = {}
+        for rank in rank_names:
+            lookup[rank['rankName']] = int(rank['rankId'])
+        lookup.update(_ROOT_RANKS)
+        _write_rank_lookup(cache_fname, lookup)
+        return lookup
+
+    snapshot_fname = pkg_resources.resource_filename(
+        'pymdwizard', 'resources/taxonomy/rank_names.json')
+    return _read_rank_lookup(cache_fname) or \
+           _read_rank_lookup(snapshot_fname) or dict(_ROOT_RANKS)
+
+
+def _read_rank_lookup(fname):
+    try:
+        with open(fname) as f:
+            return {name: int(rank_id)
+                    for name, rank_id in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _write_rank_lookup(fname, lookup):
+    temp_fname = '{}.{}.tmp'.format(fname, os.getpid())
+    try:
+        with open(temp_fname, 'w') as f:
+            json.dump(lookup, f, indent=1, sort_keys=True)
+        os.replace(temp_fname, fname)
+    except OSError:
+        pass
+
+
 def get_currency_from_tsn(tsn, as_dataframe=True, **kwargs):
     """
         Returns a list of items from the ITIS getFullHierarchyFromTSN function.
@@ -236,11 +426,147 @@ def get_full_record_from_tsn(tsn, as_dataframe=False, **kwargs):
         return xml_utils.node_to_dict(results, add_fgdc=False)
 
 
+def get_session():
+    """
+    Returns the requests Session used for all ITIS queries, so that
+    connections are reused between them.
+
+    Returns
+    -------
+        requests.Session
+    """
+    global _session
+    with _itis_lock:
+        if _session is None:
+            _session = requests.Session()
+            # keep a connection for each concurrent query
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=ITIS_MAX_WORKERS,
+                pool_maxsize=ITIS_MAX_WORKERS)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def get_response_cache():
+    """
+    Returns the cache ITIS responses are stored in, by default a
+    cache_utils.SQLiteCache named ITIS_CACHE_FNAME in the user cache directory.
+
+    Returns
+    -------
+        cache_utils.SQLiteCache, cache_utils.DirectoryCache or None
+        if caching has been turned off
+    """
+    global _response_cache
+    with _itis_lock:
+        if _response_cache is None:
+            _response_cache = cache_utils.SQLiteCache(ITIS_CACHE_FNAME)
+        if _response_cache is False:
+            return None
+        return _response_cache
+
+
+def set_response_cache(cache, ttl=ITIS_CACHE_TTL):
+    """
+    Change where ITIS responses are cached and for how long.
+
+    Parameters
+    ----------
+    cache : cache_utils.SQLiteCache, cache_utils.DirectoryCache or None
+        Any object with the same get/set methods can be used.
+        None turns caching off.
+    ttl : int
+        number of seconds a cached response is used before ITIS is queried
+        again, None to keep responses until they are evicted
+
+    Returns
+    -------
+        None
+    """
+    global _response_cache, _cache_ttl
+    with _itis_lock:
+        _response_cache = False if cache is None else cache
+        _cache_ttl = ttl
+
+
+def set_offline(offline=True):
+    """
+    In offline mode ITIS is never queried, every function in this module
+    answers from the response cache regardless of the age of the entries,
+    and raises requests.exceptions.ConnectionError for anything not cached.
+
+    Parameters
+    ----------
+    offline : bool
+
+    Returns
+    -------
+        None
+    """
+    global _offline
+    _offline = offline
+
+
+def _cache_key(url, payload):
+    params = sorted((str(k), str(v)) for k, v in payload.items())
+    return url + '?' + urllib.parse.urlencode(params)
+
+
+def _is_transient(error):
+    if isinstance(error, (requests.exceptions.ConnectionError,
+                          requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, 'response', None)
+    return response is not None and \
+           (response.status_code == 429 or response.status_code >= 500)
+
+
+def _request(url, payload):
+    """
+    GET url with the shared session, retrying ITIS_RETRIES times with
+    exponential backoff when the failure looks transient
+    """
+    for attempt in range(ITIS_RETRIES + 1):
+        try:
+            out = get_session().get(url, params=payload,
+                                   timeout=ITIS_TIMEOUT)
+            out.raise_for_status()
+            return out
+        except requests.exceptions.RequestException as e:
+            if attempt == ITIS_RETRIES or not _is_transient(e):
+                raise
+        time.sleep(ITIS_BACKOFF * 2**attempt)
+
+
 def _get_xml(url, payload, **kwargs):
-    out = requests.get(url, params=payload)
-    out.raise_for_status()
+    cache = get_response_cache()
+    key = _cache_key(url, payload)
+
+    content = None
+    if cache is not None:
+        content = cache.get(key, max_age=None if _offline else _cache_ttl)
+
+    if content is None:
+        if _offline:
+            raise requests.exceptions.ConnectionError(
+                'Offline and no cached ITIS response for ' + key)
+        try:
+            out = _request(url, payload)
+        except requests.exceptions.RequestException:
+            # an expired response is better than none
+            content = cache.get(key) if cache is not None else None
+            if content is None:
+                raise
+        else:
+            xmlparser = etree.XMLParser()
+            tt = etree.fromstring(out.content, xmlparser)
+            if cache is not None:
+                cache.set(key, out.content)
+            return tt
+
     xmlparser = etree.XMLParser()
-    tt = etree.fromstring(out.content, xmlparser)
+    tt = etree.fromstring(content, xmlparser)
     return tt
 
 
@@ -289,32 +615,21 @@ class Taxon(object):
         self.taxon_value = taxon_value
         self.tsn = tsn
 
-        self.populate_ranknames()
-
         if not taxon_name and not taxon_value and tsn:
             self.load_from_tsn()
 
-        if children:
-            self.children = children
-        else:
-            self.children = []
+        self.children = []
         self.parent = parent
-        self.indent = "  "*int(int(self._indent_lookup[taxon_name]) / 10)
-
-    def populate_ranknames(self):
-        try:
-            self._rank_names = get_rank_names()
-
-            self._rank_names.drop_duplicates(inplace=True)
-            del(self._rank_names['kingdomName'])
-            self._rank_names['rankId'] = pd.to_numeric(self._rank_names['rankId'])
-            self. _rank_names = self._rank_names.append(pd.DataFrame([{"rankName": "Life", "rankId":1}]))
-            self._rank_names = self._rank_names.append(pd.DataFrame([{"rankName": "Domain", "rankId":5}]))
-
-            self._indent_lookup = dict(zip(self._rank_names.rankName, self._rank_names.rankId))
-        except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError):
-            self._rank_names = {}
-            self._indent_lookup = {}
+        # str(tsn) to Taxon for every taxon in the tree, only kept on the
+        # root and updated by add_child
+        if parent is None:
+            self._tsn_index = {str(tsn): self}
+        else:
+            self._tsn_index = None
+            parent._root()._tsn_index.setdefault(str(tsn), self)
+        for child in children or []:
+            self.add_child(child)
+        self.indent = "  "*int(get_rank_lookup().get(taxon_name, 0) / 10)
 
     def __eq__(self, other):
         return self.taxon_name == other.taxon_name and \
@@ -343,12 +658,49 @@ class Taxon(object):
         -------
             None
         """
+        if child._tsn_index is None:
+            # moved from another tree, which keeps it in its index
+            child_index = {}
+            for taxon in child.walk():
+                child_index.setdefault(str(taxon.tsn), taxon)
+        else:
+            child_index = child._tsn_index
+            child._tsn_index = None
+
         child.parent = self
         #         child.indent = "  "+self.indent
         self.children.append(child)
 
+        root_index = self._root()._tsn_index
+        for key, taxon in child_index.items():
+            root_index.setdefault(key, taxon)
+
+    def walk(self):
+        """
+        Generator over this taxon and all of its descendants, parents
+        before their children
+
+        Returns
+        -------
+            generator of Taxon
+        """
+        stack = [self]
+        while stack:
+            taxon = stack.pop()
+            yield taxon
+            stack.extend(reversed(taxon.children))
+
+    def _root(self):
+        taxon = self
+        while taxon.parent is not None:
+            taxon = taxon.parent
+        return taxon
+
     def find_child_by_tsn(self, tsn):
         """
+        Looks up this taxon or one of its descendants in the index kept on
+        the root, only descendants added with add_child (or the
+        constructor) are found.
 
         Parameters
         ----------
@@ -359,13 +711,21 @@ class Taxon(object):
             If no match is found returns None
             else returns taxon object which matches the given tsn
         """
-        if str(self.tsn) == str(tsn):
-            return self
-        else:
-            for child in self.children:
-                match = child.find_child_by_tsn(tsn)
-                if match:
-                    return match
+        root = self._root()
+        match = root._tsn_index.get(str(tsn))
+        if match is None or self is root:
+            return match
+
+        taxon = match
+        while taxon is not None:
+            if taxon is self:
+                return match
+            taxon = taxon.parent
+        # the tsn is somewhere else in the tree, but could also be below
+        # this taxon
+        for taxon in self.walk():
+            if str(taxon.tsn) == str(tsn):
+                return taxon
         return None
 
     def load_from_tsn(self):
@@ -373,10 +733,16 @@ class Taxon(object):
 
 
 def get_kingdom(heirarchy):
-    try:
-        return str(heirarchy[heirarchy.rankName == 'Kingdom']['taxonName'][0])
-    except IndexError:
-        return None
+    for row in _hierarchy_rows(heirarchy):
+        if row['rankName'] == 'Kingdom':
+            return str(row['taxonName'])
+    return None
+
+
+def _hierarchy_rows(heirarchy):
+    if pd is not None and isinstance(heirarchy, pd.DataFrame):
+        return heirarchy.to_dict('records')
+    return heirarchy
 
 
 def get_taxon_root(kingdoms):
@@ -414,24 +780,38 @@ def merge_taxons(tsns):
 
 
     """
-    heirarchies  = []
-    for tsn in tsns:
-        hierarchy = get_full_hierarchy_from_tsn(tsn, include_children=False)
-        heirarchies.append(hierarchy)
+    heirarchies = get_full_hierarchies(tsns, as_dataframe=False,
+                                       include_children=False)
+    return merge_hierarchies(heirarchies)
+
+
+def merge_hierarchies(heirarchies):
+    """
 
+    Parameters
+    ----------
+    heirarchies : list of pandas dataframes or lists of dictionaries
+        as returned by get_full_hierarchy_from_tsn, each row is a taxon
+        whose parent is in an earlier row or is the root
+
+    Returns
+    -------
+        a Taxon that contains all of the taxons in all of the hierarchies
+    """
+    heirarchies = [_hierarchy_rows(h) for h in heirarchies]
     kingdoms = list(set([get_kingdom(h) for h in heirarchies]))
 
     root_taxon = get_taxon_root(kingdoms)
 
     for hierarchy in heirarchies:
-        for row in hierarchy.itertuples():
+        for row in hierarchy:
             #see if taxonomy is alreay there
-            existing_taxon = root_taxon.find_child_by_tsn(row.tsn)
+            existing_taxon = root_taxon.find_child_by_tsn(row['tsn'])
             if not existing_taxon:
-                child_taxon = Taxon(taxon_name=row.rankName,
-                                    taxon_value=row.taxonName,
-                                    tsn=row.tsn)
-                parent = root_taxon.find_child_by_tsn(row.parentTsn)
+                child_taxon = Taxon(taxon_name=row['rankName'],
+                                    taxon_value=row['taxonName'],
+                                    tsn=row['tsn'])
+                parent = root_taxon.find_child_by_tsn(row['parentTsn'])
                 parent.add_child(child_taxon)
 
     return root_taxon
@@ -462,7 +842,12 @@ def gen_fgdc_taxoncl(tsns, include_common_names=False, include_tsns=[]):
 
 
 def _gen_fgdc_taxonomy_section(taxon, include_common_names=False,
-                               include_tsns=[]):
+                               include_tsns=[], common_names=None):
+    if include_common_names and common_names is None:
+        # fetch the names for the whole tree at once, below are lookups
+        common_names = get_common_names(
+            [t.tsn for t in taxon.walk() if t.tsn])
+
     taxonomicclassification = etree.Element("taxoncl")
     taxrankname = etree.Element("taxonrn")
     taxrankname.text = taxon.taxon_name
@@ -473,15 +858,10 @@ def _gen_fgdc_taxonomy_section(taxon, include_common_names=False,
     taxonomicclassification.append(taxrankvalue)
 
     if include_common_names and taxon.tsn:
-        try:
-            df = get_common_names_tsn(taxon.tsn)
-            if 'language' in df.columns:
-                for common_name in df.query('language == "English"').commonName:
-                    applicable_common_name = etree.Element("common")
-                    applicable_common_name.text = common_name
-                    taxonomicclassification.append(applicable_common_name)
-        except (ValueError, IndexError):
-            pass
+        for common_name in common_names.get(str(taxon.tsn), []):
+            applicable_common_name = etree.Element("common")
+            applicable_common_name.text = common_name
+            taxonomicclassification.append(applicable_common_name)
 
     if str(taxon.tsn) in include_tsns:
         tsn_common_name = etree.Element("common")
@@ -490,7 +870,8 @@ def _gen_fgdc_taxonomy_section(taxon, include_common_names=False,
 
     for child in taxon.children:
         child_node = _gen_fgdc_taxonomy_section(child, include_common_names,
-                                                include_tsns=include_tsns)
+                                                include_tsns=include_tsns,
+                                                common_names=common_names)
         taxonomicclassification.append(child_node)
 
     return taxonomicclassification
@@ -42,6 +42,7 @@ import sys
 import os
 import datetime
 import traceback
+import json
 import pkg_resources
 
 from lxml import etree
@@ -113,31 +114,44 @@ def populate_widget(widget, contents):
     widget : QtGui:QWidget
             This widget has QLineEdits with names that correspond to the keys
             in the dictionary.
-    contents : dict
+    contents : dict or lxml element
             A dictionary containing key that correspond to line edits and
             values that will be inserted as text.  This dictionary will be
             flattened if it contains a nested hierarchy.
+            An element is converted with a single pass of
+            xml_utils.node_to_dict(flat=True), the last step of each path
+            is the widget name.
     Returns
     -------
     None
 
     """
-    if not isinstance(contents, dict):
-        contents = xml_utils.node_to_dict(contents)
+    if isinstance(contents, dict):
+        items = []
+        stack = [iter(contents.items())]
+        while stack:
+            for key, value in stack[-1]:
+                if isinstance(value, dict):
+                    stack.append(iter(value.items()))
+                    break
+                items.append((key, value))
+            else:
+                stack.pop()
+    else:
+        items = [(path.rsplit('/', 1)[-1].split('[', 1)[0], value)
+                 for path, value in
+                 xml_utils.node_to_dict(contents, flat=True).items()]
 
-    for key, value in contents.items():
-        if isinstance(value, dict):
-            populate_widget(widget, value)
-        else:
+    for key, value in items:
+        try:
+            child_widget = getattr(widget.ui, key)
+        except AttributeError:
             try:
-                child_widget = getattr(widget.ui, key)
+                child_widget = getattr(widget, key)
             except AttributeError:
-                try:
-                    child_widget = getattr(widget, key)
-                except AttributeError:
-                    child_widget = None
+                child_widget = None
 
-            set_text(child_widget, value)
+        set_text(child_widget, value)
 
 
 def set_text(widget, text):
@@ -189,9 +203,9 @@ def populate_widget_element(widget, element, xpath):
     -------
         None
     """
-    if element.xpath(xpath):
-        first_child = element.xpath(xpath)[0]
-        set_text(widget, first_child.text)
+    matches = xml_utils.compile_xpath(xpath)(element)
+    if matches:
+        set_text(widget, matches[0].text)
 
 
 # Back up the reference to the exceptionhook
@@ -249,6 +263,30 @@ def get_resource_path(fname):
     """
     return pkg_resources.resource_filename('pymdwizard',
                                            'resources/{}'.format(fname))
+
+
+_annotation_lookup = None
+
+
+def get_annotation_lookup():
+    """
+    Returns the FGDC element annotations (long_name and annotation for
+    each element shortname) stored in resources/FGDC/bdp_lookup.
+
+    The file is only read the first time this is called, every later call
+    returns the same dictionary, which should be treated as read only.
+
+    Returns
+    -------
+        dict : {shortname: {'long_name': str, 'annotation': str}}
+    """
+    global _annotation_lookup
+    if _annotation_lookup is None:
+        annotation_lookup_fname = get_resource_path('FGDC/bdp_lookup')
+        with open(annotation_lookup_fname, encoding='utf-8') as data_file:
+            _annotation_lookup = json.loads(data_file.read())
+    return _annotation_lookup
+
 def set_window_icon(widget):
     icon = QIcon(get_resource_path('icons/Ducky.ico'))
     widget.setWindowIcon(icon)
@@ -39,8 +39,14 @@ responsibility is assumed by the USGS in connection therewith.
 ------------------------------------------------------------------------------
 """
 # built in Python imports
+import io
 import os
+import re
+import sys
 import collections
+import copy
+import functools
+import hashlib
 import warnings
 
 # external library imports
@@ -79,6 +85,91 @@ def xml_document_loader(xml_locator):
         return xml_locator
 
 
+# text nodes that start or end with whitespace
+_PADDED_TEXT = etree.XPath("//text()[normalize-space(substring(., 1, 1)) = ''"
+                           " or normalize-space(substring(., string-length(.)))"
+                           " = '']")
+# whitespace after a tag in c14n output, text can't contain a raw < or >
+# and carriage returns are written as &#xD;
+_C14N_LEADING_SPACE = re.compile(rb'>(?:[ \t\n]|&#xD;)+')
+# whitespace before a tag, matched in the reversed output
+_C14N_TRAILING_SPACE = re.compile(rb'<(?:[ \t\n]|;Dx#&)+')
+# a '>' in a c14n attribute value (or a false positive in text)
+_C14N_ATTRIBUTE_GT = re.compile(rb'="[^"]*>')
+
+
+def canonicalize(xml):
+    """
+    Returns the canonical form of an xml document, so that records with
+    the same content have the same canonical form regardless of how they
+    were formatted.
+
+    Whitespace only text (indentation) is removed, whitespace around
+    text is stripped, comments are dropped, and the result is serialized
+    as Canonical XML (c14n), which fixes the order of attributes,
+    namespace declarations and the quoting and escaping of values.
+
+    The order of elements is kept, the FGDC schema is made of sequences
+    so the order of elements is part of the content.
+
+    Parameters
+    ----------
+    xml : str or lxml element or lxml document
+          file path and name to an xml document, string representation of
+          an xml document or lxml element or document
+
+    Returns
+    -------
+    bytes
+    """
+    if isinstance(xml, str) and os.path.exists(xml):
+        xml = etree.parse(xml, parser=etree.XMLParser(huge_tree=True))
+    elif isinstance(xml, str):
+        try:
+            xml = etree.fromstring(xml)
+        except ValueError:
+            # strings with an encoding declaration have to be bytes
+            xml = etree.fromstring(xml.encode('utf-8'))
+    if type(xml) == etree._ElementTree:
+        xml = xml.getroot()
+
+    c14n = etree.tostring(xml, method='c14n', with_comments=False)
+    if b'="' in c14n and _C14N_ATTRIBUTE_GT.search(c14n) is not None:
+        # the whitespace around text can't be found in the c14n output,
+        # strip it from a copy of the element instead
+        xml = copy.deepcopy(xml)
+        for text in _PADDED_TEXT(xml):
+            stripped = text.strip(' \t\r\n') or None
+            if text.is_text:
+                text.getparent().text = stripped
+            else:
+                text.getparent().tail = stripped
+        return etree.tostring(xml, method='c14n', with_comments=False)
+
+    c14n = _C14N_LEADING_SPACE.sub(b'>', c14n)
+    # searching backwards from each tag is much faster than trying every
+    # space in the text as the start of a match
+    return _C14N_TRAILING_SPACE.sub(b'<', c14n[::-1])[::-1]
+
+
+def content_hash(xml):
+    """
+    Returns a hash of the content of an xml document, records that only
+    differ in formatting have the same hash.  See canonicalize.
+
+    Parameters
+    ----------
+    xml : str or lxml element or lxml document
+          file path and name to an xml document, string representation of
+          an xml document or lxml element or document
+
+    Returns
+    -------
+    str : sha256 hex digest
+    """
+    return hashlib.sha256(canonicalize(xml)).hexdigest()
+
+
 def save_to_file(element, fname):
     """
     Save the provided element as the filename provided
@@ -95,35 +186,78 @@ def save_to_file(element, fname):
         text_file.write(node_to_string(element))
 
 
-def node_to_dict(node, add_fgdc=True):
+def node_to_dict(node, add_fgdc=True, flat=False):
     """
+    Converts an lxml element into a dictionary in a single pass over its
+    descendants.
 
     Parameters
     ----------
     node : lxml element
+    add_fgdc : bool
+        prefix each tag with 'fgdc_', which is how the widgets that
+        display the content are named.
+    flat : bool
+        If True, return a flat dictionary keyed on the path of each leaf
+        relative to node, e.g. 'cntaddr/city'.  Repeated siblings are kept
+        and get a one-based index, e.g. 'cntaddr/address[2]'.
 
     Returns
     -------
         dictionary contain a key value pair for each child item in the node
-        where the key is the item's tag and the value is the item's text
+        where the key is the item's tag and the value is the item's text.
+        Nested items are contained in nested dictionaries unless flat is
+        True.  In the nested form only the last of repeated siblings is kept.
     """
-    node_dict = collections.OrderedDict()
-
-    if len(node.getchildren()) == 0:
-        tag = _parse_tag(node.tag)
+    def _key(tag):
+        tag = _parse_tag(tag)
         if add_fgdc:
             tag = 'fgdc_' + tag
-        node_dict[tag] = node.text
-    else:
-        for child in node.getchildren():
-            tag = _parse_tag(child.tag)
-            if add_fgdc:
-                tag = 'fgdc_' + tag
-            if len(child.getchildren()) > 0:
-                content = node_to_dict(child, add_fgdc=add_fgdc)
+        return tag
+
+    node_dict = collections.OrderedDict()
+
+    children = _element_children(node)
+    if not children:
+        node_dict[_key(node.tag)] = node.text
+        return node_dict
+
+    if flat:
+        def _keyed(prefix, children):
+            counts = collections.Counter(child.tag for child in children)
+            seen = collections.Counter()
+            keyed = []
+            for child in children:
+                key = prefix + _key(child.tag)
+                if counts[child.tag] > 1:
+                    seen[child.tag] += 1
+                    key += '[{}]'.format(seen[child.tag])
+                keyed.append((key, child))
+            return keyed
+
+        # depth first in document order, so widgets are filled in the
+        # same order they appear in the record
+        stack = _keyed('', children)[::-1]
+        while stack:
+            key, child = stack.pop()
+            grandchildren = _element_children(child)
+            if grandchildren:
+                stack.extend(_keyed(key + '/', grandchildren)[::-1])
+            else:
+                node_dict[key] = child.text
+        return node_dict
+
+    stack = [(node_dict, children)]
+    while stack:
+        parent_dict, children = stack.pop()
+        for child in children:
+            grandchildren = _element_children(child)
+            if grandchildren:
+                content = collections.OrderedDict()
+                stack.append((content, grandchildren))
             else:
                 content = child.text
-            node_dict[tag] = content
+            parent_dict[_key(child.tag)] = content
     return node_dict
 
 
@@ -143,7 +277,7 @@ def _parse_tag(tag):
     return tag[tag.find("}")+1:]
 
 
-def element_to_list(results):
+def element_to_list(results, flat=False):
     """
     Returns the results(etree) formatted into a list of dictionaries.
     This is useful for flat data structures, e.g. homogeneous results that
@@ -153,13 +287,33 @@ def element_to_list(results):
     ----------
     results : list of lxml nodes
         This list would could be returned from an xpath query for example
+    flat : bool
+        passed to node_to_dict, nested content is keyed on its path
 
     Returns
     -------
     List of dictionaries. Each dictionary in this list is the result of
     the _node_to_dict function
     """
-    return [node_to_dict(item, add_fgdc=False) for item in results]
+    return [node_to_dict(item, add_fgdc=False, flat=flat) for item in results]
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_xpath(xpath):
+    """
+    Returns a compiled etree.XPath for an xpath string.  The most recently
+    used ones are cached, so the same literal xpaths used to load every
+    record are only compiled once.
+
+    Parameters
+    ----------
+    xpath : str
+
+    Returns
+    -------
+    etree.XPath : call it with an lxml element (or tree) to search
+    """
+    return etree.XPath(xpath)
 
 
 def search_xpath(node, xpath, only_first=True):
@@ -184,7 +338,7 @@ def search_xpath(node, xpath, only_first=True):
 
     if type(node) == etree._Element or \
             type(node) == etree._ElementTree:
-        matches = node.xpath(xpath)
+        matches = compile_xpath(xpath)(node)
         if len(matches) == 0:
             if only_first:
                 return None
@@ -221,7 +375,7 @@ def get_text_content(node, xpath=''):
         return None
 
     if xpath:
-        nodes = node.xpath(xpath)
+        nodes = compile_xpath(xpath)(node)
     else:
         nodes = [node, ]
 
@@ -235,23 +389,26 @@ def get_text_content(node, xpath=''):
         return ''
 
 
-def element_to_df(results):
+def element_to_df(results, flat=False):
     """
     Returns the results (etree) formatted into a pandas dataframe.
     This only intended to be used on flat data structures, e.g. a list of
     homogeneous elements.
-    For nested or hierarchical data structures this result will be awkward.
+    For nested or hierarchical data structures this result will be awkward
+    unless flat is True, which gives a column for each leaf path.
 
     Parameters
     ----------
     results : list of lxml nodes
         This list would could be returned from an xpath query for example
+    flat : bool
+        passed to node_to_dict, nested content is keyed on its path
 
     Returns
     -------
     pandas dataframe
     """
-    results_list = element_to_list(results)
+    results_list = element_to_list(results, flat=flat)
     return pd.DataFrame.from_dict(results_list)
 
 
@@ -271,6 +428,102 @@ def node_to_string(node):
     return etree.tostring(node, pretty_print=True).decode()
 
 
+# characters that are not allowed in xml, lxml raises a ValueError for these
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f'
+                                '\ud800-\udfff\ufffe\uffff]')
+# characters that need escaping or checking before text can be written as is
+_SPECIAL_XML_CHARS = re.compile('[&<>\r\x00-\x08\x0b\x0c\x0e-\x1f'
+                                '\ud800-\udfff\ufffe\uffff]')
+
+
+def _escape_text(text):
+    """
+    Escape text the same way lxml does for element text.  Non-ascii
+    characters are written as numeric character references.
+    """
+    if _SPECIAL_XML_CHARS.search(text) is not None:
+        if _INVALID_XML_CHARS.search(text) is not None:
+            # let lxml raise the same ValueError as xml_node would
+            xml_node('text', text)
+        text = text.replace('&', '&amp;').replace('<', '&lt;')
+        text = text.replace('>', '&gt;').replace('\r', '&#13;')
+    if not text.isascii():
+        text = text.encode('ascii', 'xmlcharrefreplace').decode()
+    return text
+
+
+def write_node(node, stream, level=0):
+    """
+    Write the pretty printed string of an XMLNode (or CompactXMLNode) and
+    its children to a file or buffer.
+
+    The output is the same as str(node).  Nodes are written as they are
+    reached, without building the whole string first, and the tree is
+    walked without recursion so deep trees can be written.
+
+    Parameters
+    ----------
+    node : XMLNode or CompactXMLNode
+    stream : file like object opened for writing text
+    level : int, optional
+            The indentation level (two spaces each) of node
+
+    Returns
+    -------
+    None
+    """
+    write = stream.write
+    # items are either strings to write or (node, level) tuples
+    stack = [(node, level)]
+    while stack:
+        item = stack.pop()
+        if type(item) == str:
+            write(item)
+            continue
+
+        node, level = item
+        indent = '  ' * level
+        tag = node.tag
+        if node.text:
+            if tag.startswith('{'):
+                # lxml writes namespaced tags with a prefix
+                cur_node = xml_node(tag, node.text)
+                write(indent + etree.tostring(
+                    cur_node, pretty_print=True).decode().rstrip())
+            else:
+                write('{0}<{1}>{2}</{1}>'.format(
+                    indent, tag, _escape_text(str(node.text))))
+            continue
+
+        write('{}<{}>\n'.format(indent, tag))
+        stack.append('\n{}</{}>'.format(indent, tag))
+        children = node.children
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], level + 1))
+            if i:
+                stack.append('\n')
+
+
+def node_to_str(node, level=0):
+    """
+    Returns the pretty printed string of an XMLNode (or CompactXMLNode),
+    see write_node
+
+    Parameters
+    ----------
+    node : XMLNode or CompactXMLNode
+    level : int, optional
+            The indentation level (two spaces each) of node
+
+    Returns
+    -------
+    str
+    """
+    stream = io.StringIO()
+    write_node(node, stream, level=level)
+    return stream.getvalue()
+
+
 def fname_to_node(fname):
     """
 
@@ -285,6 +538,110 @@ def fname_to_node(fname):
     return etree.parse(fname)
 
 
+def iter_elements(fname, path):
+    """
+    Stream the elements at a path in an xml file without loading the whole
+    document, for records too large to parse in one go.
+
+    Each element is yielded once it has been completely read, and is
+    cleared (along with everything before it) when the next one is
+    requested, so memory use is bounded by the size of the largest
+    matching element.  Use copy.deepcopy on an element to keep it.
+
+    Parameters
+    ----------
+    fname : str
+            full file and path to the the file to read
+    path : str
+            absolute path of the elements to return, starting with the
+            root tag, e.g. 'metadata/eainfo/detailed'.  A step can be '*'
+            to match any tag
+
+    Returns
+    -------
+    generator of lxml elements
+    """
+    steps = path.strip('/').split('/')
+    if steps[-1] == '*':
+        return _iter_elements_by_depth(fname, steps)
+    return _iter_elements_by_tag(fname, steps)
+
+
+def _path_matches(steps, tags):
+    return len(steps) == len(tags) and \
+           all(step in ('*', tag) for step, tag in zip(steps, tags))
+
+
+def _iter_elements_by_tag(fname, steps):
+    # lxml only reports the end of elements with the last tag in the path,
+    # which is much faster than following every element from python
+    for event, element in etree.iterparse(fname, tag=steps[-1],
+                                          huge_tree=True):
+        ancestors = list(element.iterancestors())
+        tags = [ancestor.tag for ancestor in reversed(ancestors)]
+        if not _path_matches(steps, tags + [element.tag]):
+            continue
+        yield element
+        # drop this element and everything before it in the document
+        element.clear()
+        for node in [element] + ancestors[:-1]:
+            while node.getprevious() is not None:
+                del node.getparent()[0]
+
+
+def _iter_elements_by_depth(fname, steps):
+    depth = len(steps)
+    tags = []
+    for event, element in etree.iterparse(fname, events=('start', 'end'),
+                                          huge_tree=True):
+        if event == 'start':
+            tags.append(element.tag)
+            continue
+
+        if len(tags) <= depth:
+            if _path_matches(steps, tags):
+                yield element
+            # everything at or above the depth of path is finished with
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+        tags.pop()
+
+
+def iter_sections(fname):
+    """
+    Stream the top level sections (idinfo, dataqual, eainfo ...) of a
+    record, see iter_elements
+
+    Parameters
+    ----------
+    fname : str
+            full file and path to the the file to read
+
+    Returns
+    -------
+    generator of lxml elements
+    """
+    return iter_elements(fname, '*/*')
+
+
+def iter_detailed(fname):
+    """
+    Stream the detailed entity (eainfo/detailed) elements of a record,
+    see iter_elements
+
+    Parameters
+    ----------
+    fname : str
+            full file and path to the the file to read
+
+    Returns
+    -------
+    generator of lxml elements
+    """
+    return iter_elements(fname, '*/eainfo/detailed')
+
+
 def string_to_node(str_node):
     """
     covert an string representation of a node into an lxml node
@@ -352,17 +709,307 @@ def clear_children(element):
     for child in element.getchildren():
         element.remove(child)
 
+PATCH_ACTIONS = ('set_text', 'replace', 'append', 'delete')
+
+
+def check_patch(patch):
+    """
+    Raise a ValueError if a patch (see apply_patch) is not valid
+
+    Parameters
+    ----------
+    patch : dict
+
+    Returns
+    -------
+    None
+    """
+    if 'xpath' not in patch:
+        raise ValueError('patch has no xpath: {}'.format(patch))
+    action = patch.get('action')
+    if action not in PATCH_ACTIONS:
+        raise ValueError('patch action must be one of {}: {}'.format(
+            ', '.join(PATCH_ACTIONS), patch))
+    if action == 'set_text' and 'text' not in patch:
+        raise ValueError('set_text patch has no text: {}'.format(patch))
+    if action in ('replace', 'append') and 'xml' not in patch:
+        raise ValueError('{} patch has no xml: {}'.format(action, patch))
+    if patch.get('create') and not _is_simple_path(patch['xpath']):
+        raise ValueError('only paths of plain tags can be created: '
+                         '{}'.format(patch))
+    try:
+        # evaluate against an empty element to catch xpaths that compile
+        # but can't be evaluated (unbound prefixes or variables) or don't
+        # return nodes (count(), string(), ...)
+        result = compile_xpath(patch['xpath'])(etree.Element('metadata'))
+    except etree.XPathError as e:
+        raise ValueError('invalid xpath {}: {}'.format(patch['xpath'], e))
+    if not isinstance(result, list):
+        raise ValueError('patch xpath must select elements: '
+                         '{}'.format(patch['xpath']))
+
+
+def _is_simple_path(xpath):
+    return all(re.match(r'^[A-Za-z_][\w.-]*$', step)
+               for step in xpath.split('/'))
+
+
+def _create_path(element, xpath):
+    """
+    Returns the first element at a path of plain tags below element,
+    adding any elements along the path that don't exist
+    """
+    for tag in xpath.split('/'):
+        child = element.find(tag)
+        if child is None:
+            child = xml_node(tag, parent_node=element)
+        element = child
+    return element
+
+
+def apply_patch(element, patch):
+    """
+    Apply one declarative change to an lxml element (or tree)
+
+    Parameters
+    ----------
+    element : lxml element or tree
+    patch : dict
+            'xpath' : the nodes to change, relative to element
+            'action' : one of
+                'set_text' : set the text of the nodes to patch['text'].
+                    If 'old' is given only nodes with that text are changed.
+                    If 'create' is True and nothing matches the xpath
+                    (a path of plain tags) it is created.
+                'replace' : replace the nodes with patch['xml']
+                'append' : add patch['xml'] as a child of the nodes,
+                    at patch['index'] if given
+                'delete' : remove the nodes
+            'xml' : str or lxml element for replace and append
+
+    Returns
+    -------
+    int : the number of nodes changed
+    """
+    check_patch(patch)
+    if type(element) == etree._ElementTree:
+        element = element.getroot()
+
+    action = patch['action']
+    matches = compile_xpath(patch['xpath'])(element)
+    if not matches and action == 'set_text' and patch.get('create'):
+        matches = [_create_path(element, patch['xpath'])]
+
+    if action in ('replace', 'append'):
+        new_node = patch['xml']
+        if type(new_node) != etree._Element:
+            new_node = string_to_node(new_node)
+
+    changed = 0
+    for node in matches:
+        if not isinstance(node, etree._Element):
+            raise ValueError('patch xpath must select elements: '
+                             '{}'.format(patch['xpath']))
+        if action == 'set_text':
+            if 'old' in patch and (node.text or '').strip() != patch['old']:
+                continue
+            if node.text != patch['text']:
+                node.text = patch['text']
+                changed += 1
+        elif action == 'append':
+            node.insert(patch.get('index', len(node)), copy.deepcopy(new_node))
+            changed += 1
+        elif node.getparent() is not None:
+            if action == 'replace':
+                node.getparent().replace(node, copy.deepcopy(new_node))
+            else:
+                node.getparent().remove(node)
+            changed += 1
+    return changed
+
+
+def apply_patches(element, patches):
+    """
+    Apply a list of patches (see apply_patch) in order
+
+    Parameters
+    ----------
+    element : lxml element or tree
+    patches : list of dict
+
+    Returns
+    -------
+    int : the number of nodes changed
+    """
+    return sum(apply_patch(element, patch) for patch in patches)
+
+
+def diff_nodes(old, new):
+    """
+    Compare two versions of an xml document and return the patches (see
+    apply_patch) that turn old into new.
+
+    Children are aligned by tag and position, the first <origin> in old is
+    compared to the first <origin> in new and so on.  Children that are
+    only in old are deleted, children only in new are inserted, and
+    elements whose children have been reordered are replaced.  Differences
+    in whitespace around text are ignored.
+
+    Parameters
+    ----------
+    old : lxml element or tree
+    new : lxml element or tree
+          must have the same root tag as old
+
+    Returns
+    -------
+    list of dict : patches with xpaths relative to the root, apply them in
+                   order with apply_patches.  Empty if nothing changed.
+    """
+    if type(old) == etree._ElementTree:
+        old = old.getroot()
+    if type(new) == etree._ElementTree:
+        new = new.getroot()
+    if old.tag != new.tag:
+        raise ValueError('can not diff <{}> and <{}>'.format(old.tag,
+                                                             new.tag))
+    patches = []
+    _diff_element(old, new, '.', patches)
+    return patches
+
+
+def _element_children(element):
+    # skip comments and processing instructions
+    return [child for child in element if isinstance(child.tag, str)]
+
+
+def _diff_element(old, new, path, patches):
+    if (old.text or '').strip() != (new.text or '').strip():
+        patches.append({'xpath': path, 'action': 'set_text',
+                        'text': (new.text or '').strip()})
+
+    old_children = _element_children(old)
+    new_children = _element_children(new)
+    old_by_tag = collections.defaultdict(list)
+    for child in old_children:
+        old_by_tag[child.tag].append(child)
+    new_by_tag = collections.defaultdict(list)
+    for child in new_children:
+        new_by_tag[child.tag].append(child)
+
+    # (position in new, step in the xpath, old child, new child)
+    aligned = []
+    seen = collections.Counter()
+    for i, child in enumerate(new_children):
+        k = seen[child.tag]
+        seen[child.tag] += 1
+        if k < len(old_by_tag[child.tag]):
+            if max(len(old_by_tag[child.tag]),
+                   len(new_by_tag[child.tag])) == 1:
+                step = child.tag
+            else:
+                step = '{}[{}]'.format(child.tag, k + 1)
+            aligned.append((i, step, old_by_tag[child.tag][k], child))
+
+    old_positions = dict((id(child), i) for i, child in enumerate(old_children))
+    old_order = [old_positions[id(old_child)]
+                 for i, step, old_child, new_child in aligned]
+    if old_order != sorted(old_order):
+        # children have been moved around, not just added or removed
+        if path == '.':
+            # named steps, so the sections deleted can be told from the
+            # patches (see patch_sections)
+            for child in reversed(old_children):
+                tag_children = old_by_tag[child.tag]
+                step = child.tag if len(tag_children) == 1 else \
+                    '{}[{}]'.format(child.tag, tag_children.index(child) + 1)
+                patches.append({'xpath': step, 'action': 'delete'})
+            for i, child in enumerate(new_children):
+                patches.append({'xpath': path, 'action': 'append',
+                                'xml': _node_xml(child), 'index': i})
+        else:
+            patches.append({'xpath': path, 'action': 'replace',
+                            'xml': _node_xml(new)})
+        return
+
+    for i, step, old_child, new_child in aligned:
+        child_path = step if path == '.' else path + '/' + step
+        _diff_element(old_child, new_child, child_path, patches)
+
+    for tag, tag_children in old_by_tag.items():
+        for k in reversed(range(len(new_by_tag[tag]), len(tag_children))):
+            step = tag if len(tag_children) == 1 else \
+                '{}[{}]'.format(tag, k + 1)
+            patches.append({'xpath': step if path == '.' else
+                            path + '/' + step, 'action': 'delete'})
+
+    aligned_positions = set(i for i, step, old_child, new_child in aligned)
+    for i, child in enumerate(new_children):
+        if i not in aligned_positions:
+            patches.append({'xpath': path, 'action': 'append',
+                            'xml': _node_xml(child), 'index': i})
+
+
+def _node_xml(element):
+    return etree.tostring(element, with_tail=False).decode()
+
+
+def patch_sections(patches):
+    """
+    Returns the tags of the top level sections (idinfo, eainfo ...) that a
+    list of patches from diff_nodes changes
+
+    Parameters
+    ----------
+    patches : list of dict
+
+    Returns
+    -------
+    list of str : in the order they are first changed
+    """
+    sections = []
+    for patch in patches:
+        first_step = patch['xpath'].split('/')[0]
+        if first_step == '.':
+            if patch['action'] != 'append':
+                continue
+            tag = string_to_node(patch['xml']).tag
+        else:
+            tag = split_tag(first_step)[0]
+        if tag != '*' and tag not in sections:
+            sections.append(tag)
+    return sections
+
+
 ###############################################################################
 # Experimental xml convenience classes
 ###############################################################################
 
 class XMLRecord(object):
-    def __init__(self, fname):
+    def __init__(self, fname, compact=False, lazy=False):
+        """
+        Parameters
+        ----------
+        fname : str
+                The xml file to load
+        compact : bool, optional
+                If True the contents are loaded into CompactXMLNodes,
+                which use less memory than XMLNodes
+        lazy : bool, optional
+                If True the contents are LazyXMLNodes, which read and
+                change the parsed lxml tree (self.record) directly.
+                Nodes are only created for the elements that are used.
+        """
         self.fname = fname
         self.record = etree.parse(fname)
         self._root = self.record.getroot()
         self.tag = self._root.tag
-        self.__dict__[self._root.tag] = XMLNode(self.record.getroot())
+        if lazy:
+            self.__dict__[self._root.tag] = LazyXMLNode(self._root)
+        elif compact:
+            self.__dict__[self._root.tag] = CompactXMLNode(self._root)
+        else:
+            self.__dict__[self._root.tag] = XMLNode(self._root)
         self._contents = self.__dict__[self._root.tag]
 
     def __repr__(self):
@@ -379,7 +1026,7 @@ class XMLRecord(object):
             fname = self.fname
 
         with open(fname, "w") as text_file:
-            text_file.write(self.__str__())
+            write_node(self._contents, text_file)
 
     def validate(self, schema='fgdc', as_dataframe=True):
         from pymdwizard.core import fgdc_utils
@@ -411,16 +1058,7 @@ class XMLNode(object):
         return self.__str__()
 
     def __str__(self, level=0):
-        if self.text:
-            cur_node = xml_node(self.tag, self.text)
-            result = "{}{}".format("  "*level, etree.tostring(cur_node, pretty_print=True).decode()).rstrip()
-        else:
-            result = "{}<{}>\n".format("  "*level, self.tag, self.tag)
-
-            result += '\n'.join([child.__str__(level=level+1) for child in self.children])
-
-            result += '\n{}</{}>'.format("  "*level, self.tag)
-        return result
+        return node_to_str(self, level=level)
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
@@ -453,9 +1091,26 @@ class XMLNode(object):
             self.__dict__[tag] = child_object
 
     def to_xml(self):
-        str_element = self.to_str()
-        parser = etree.XMLParser(ns_clean=True, recover=True, encoding='utf-8')
-        element = etree.fromstring(str_element, parser=parser)
+        """
+        Build an lxml element from this node and its children
+
+        As in the string representation of a node, nodes that have text
+        are written out with only their text.
+
+        Returns
+        -------
+        lxml element
+        """
+        element = xml_node(self.tag, self.text or '')
+        stack = [(self, element)]
+        while stack:
+            node, node_element = stack.pop()
+            if node.text:
+                continue
+            for child in node.children:
+                child_element = xml_node(child.tag, child.text or '',
+                                         parent_node=node_element)
+                stack.append((child, child_element))
         return element
 
     def from_str(self, str_element):
@@ -536,27 +1191,456 @@ class XMLNode(object):
         else:
             self.children = []
 
-    def add_child(self, child, index=-1):
+    def add_child(self, child, index=-1, deep_copy=False):
+        """
+        Add a child node to this node
+
+        Parameters
+        ----------
+        child : XMLNode or lxml element
+                lxml elements are converted to an XMLNode
+        index : int, optional
+                The positional index to insert the child at.
+                If none specified the child is added after the existing ones
+        deep_copy : bool, optional
+                If True a copy of child is added, otherwise the child node
+                itself is added and changes made to it will show up in both
+                places it is used.
+
+        Returns
+        -------
+        XMLNode : the node that was added
+        """
         if index == -1:
             index = len(self.children)
         if index < -1:
             index += 1
 
         if type(child) == etree._Element:
-            node_str = node_to_string(child)
-        else:
-            node_str = child.to_str()
-        child_copy = XMLNode(node_str)
+            child = XMLNode(child)
+        elif deep_copy:
+            child = child.copy()
 
-        self.children.insert(index, child_copy)
+        self.children.insert(index, child)
         self.add_attr(child.tag, child)
+        return child
 
     def copy(self):
-        node_str = self.to_str()
-        self_copy = XMLNode(node_str)
+        """
+        Returns
+        -------
+        XMLNode : a deep copy of this node and its children
+        """
+        self_copy = XMLNode()
+        stack = [(self, self_copy)]
+        while stack:
+            node, node_copy = stack.pop()
+            node_copy.tag = node.tag
+            node_copy.text = node.text
+            node_copy.add_attr(node_copy.tag, node_copy)
+            for child in node.children:
+                child_copy = XMLNode()
+                node_copy.children.append(child_copy)
+                node_copy.add_attr(child.tag, child_copy)
+                stack.append((child, child_copy))
         return self_copy
 
 
+class CompactXMLNode(object):
+    """
+    Memory efficient version of XMLNode with the same attribute style
+    access to child nodes (record.metadata.idinfo.citation...).
+
+    Instead of a __dict__ with an entry for every child tag each node
+    has fixed slots.  The tag -> children index used for attribute access
+    is only built the first time a child is looked up by tag, so nodes
+    that are never accessed that way (leaves, or nodes that are only
+    iterated or saved) don't carry one.  Nodes without children share one
+    empty tuple.  A node made from an lxml element only reads the
+    children of the element the first time they are used, and then drops
+    its reference to the element.
+
+    Unlike XMLNode, other attributes (for instance node.widget) can not be
+    added to a node, and children should be changed with add_child and
+    clear_children rather than by modifying the children list, so that
+    the index stays up to date.
+    """
+    __slots__ = ('tag', 'text', '_children', '_element', '_tags')
+
+    def __init__(self, element=None, tag='', text='', parent_node=None,
+                 index=-1):
+        self.tag = tag
+        # same as the text of an XMLNode made from xml_node(tag, text)
+        self.text = str(text).strip() if text is not None else ''
+        self._children = ()
+        self._element = None
+        # tag -> list of child nodes, None until first needed
+        self._tags = None
+
+        if type(element) == etree._Element:
+            self.from_xml(element)
+        elif type(element) == str:
+            self.from_str(element)
+
+        if parent_node is not None:
+            parent_node.add_child(self, index=index)
+
+    __repr__ = XMLNode.__repr__
+    __str__ = XMLNode.__str__
+    __eq__ = XMLNode.__eq__
+    to_str = XMLNode.to_str
+    to_xml = XMLNode.to_xml
+    xpath = XMLNode.xpath
+    xpath_march = XMLNode.xpath_march
+
+    def __getattr__(self, name):
+        # only called for names that aren't slots, methods or properties,
+        # i.e. the tags of child nodes
+        if name.startswith('_') or name in CompactXMLNode.__slots__:
+            raise AttributeError(name)
+        try:
+            return self._get_tag(name)
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getstate__(self):
+        return (self.tag, self.text, self.children)
+
+    def __setstate__(self, state):
+        self.tag, self.text, children = state
+        self._element = None
+        self._children = ()
+        self._tags = None
+        for child in children:
+            self.add_child(child)
+
+    @property
+    def children(self):
+        if self._element is not None:
+            self._materialize()
+        return self._children
+
+    def _materialize(self):
+        element, self._element = self._element, None
+        # skip comments and processing instructions
+        children = [CompactXMLNode(child_element) for child_element in element
+                    if isinstance(child_element.tag, str)]
+        self._children = children or ()
+        self._tags = None
+
+    def _get_tag(self, tag):
+        """
+        Returns the child node(s) with a tag, the same as the attribute of
+        an XMLNode with that name: a single node, or a list if there is
+        more than one.  Like XMLNode the tag of the node itself returns the
+        node.
+
+        Raises KeyError if there is no such child
+        """
+        children = self.children
+        if self._tags is None and children:
+            self._tags = {}
+            for child in children:
+                self._tags.setdefault(child.tag, []).append(child)
+
+        matches = []
+        if tag == self.tag:
+            matches.append(self)
+        if children:
+            matches.extend(self._tags.get(tag, ()))
+        if not matches:
+            raise KeyError(tag)
+        elif len(matches) == 1:
+            return matches[0]
+        return matches
+
+    def from_xml(self, element):
+        # lxml returns a new string for every .tag lookup, interning them
+        # shares one string between all the nodes with the same tag
+        self.tag = sys.intern(element.tag)
+        try:
+            self.text = element.text.strip()
+        except AttributeError:
+            self.text = ''
+        self._children = ()
+        self._element = element
+        self._tags = None
+
+    def from_str(self, str_element):
+        self.from_xml(string_to_node(str_element))
+
+    def search_xpath(self, xpath=''):
+        if not xpath:
+            return self
+
+        xpath_items = xpath.split('/')
+        xpath_remainder = '/'.join(xpath_items[1:])
+        first_item = xpath_items[0]
+        try:
+            tag, index = split_tag(first_item)
+            results = self._get_tag(tag)
+            if '[' in first_item:
+                return results[index].search_xpath(xpath_remainder)
+            elif type(results) == list:
+                aggregator = []
+                for result in results:
+                    node = result.search_xpath(xpath_remainder)
+                    if node is not None:
+                        aggregator.append(node)
+                return aggregator
+            else:
+                return results.search_xpath(xpath_remainder)
+        except:
+            return []
+
+    def clear_children(self, tag=None):
+        if tag is not None:
+            self._children = [c for c in self.children if c.tag != tag] or ()
+            if self._tags is not None:
+                self._tags.pop(tag, None)
+        else:
+            self._element = None
+            self._children = ()
+        if not self._children:
+            self._tags = None
+
+    def add_child(self, child, index=-1, deep_copy=False):
+        """
+        Add a child node to this node
+
+        Parameters
+        ----------
+        child : CompactXMLNode, XMLNode or lxml element
+                XMLNodes and lxml elements are converted to a
+                CompactXMLNode
+        index : int, optional
+                The positional index to insert the child at.
+                If none specified the child is added after the existing ones
+        deep_copy : bool, optional
+                If True a copy of child is added, otherwise the child node
+                itself is added.
+
+        Returns
+        -------
+        CompactXMLNode : the node that was added
+        """
+        if not self.children:
+            self._children = []
+        if type(child) == etree._Element:
+            child = CompactXMLNode(child)
+        elif not isinstance(child, CompactXMLNode):
+            child = CompactXMLNode.from_node(child)
+        elif deep_copy:
+            child = child.copy()
+
+        if index == -1:
+            self._children.append(child)
+            if self._tags is not None:
+                self._tags.setdefault(child.tag, []).append(child)
+        else:
+            if index < -1:
+                index += 1
+            self._children.insert(index, child)
+            # rebuilt in document order the next time it is needed
+            self._tags = None
+        return child
+
+    def copy(self):
+        """
+        Returns
+        -------
+        CompactXMLNode : a deep copy of this node and its children
+        """
+        return CompactXMLNode.from_node(self)
+
+    @staticmethod
+    def from_node(node):
+        """
+        Make a CompactXMLNode copy of an XMLNode or CompactXMLNode
+
+        Parameters
+        ----------
+        node : XMLNode or CompactXMLNode
+
+        Returns
+        -------
+        CompactXMLNode
+        """
+        root_copy = CompactXMLNode._copy_of(node)
+        if root_copy._element is not None:
+            return root_copy
+
+        stack = [(node, root_copy)]
+        while stack:
+            node, node_copy = stack.pop()
+            for child in node.children:
+                child_copy = CompactXMLNode._copy_of(child)
+                if child_copy._element is None:
+                    stack.append((child, child_copy))
+                if not node_copy._children:
+                    node_copy._children = []
+                node_copy._children.append(child_copy)
+        return root_copy
+
+    @staticmethod
+    def _copy_of(node):
+        """
+        A CompactXMLNode with the tag and text of node but no children.
+        If node hasn't read the children of its element yet the copy
+        shares the element, which is never modified.
+        """
+        node_copy = CompactXMLNode()
+        node_copy.tag = node.tag
+        node_copy.text = node.text
+        node_copy._element = getattr(node, '_element', None)
+        return node_copy
+
+
+class LazyXMLNode(object):
+    """
+    XMLNode style access (record.metadata.idinfo.citation...) to an lxml
+    element that reads and writes the element itself.
+
+    The wrapper for a child is only created when it is used, nothing is
+    copied out of the lxml tree, and changes (node.text = 'new',
+    add_child, clear_children) are made to the tree directly.  A new
+    wrapper is returned each time a child is looked up, so compare nodes
+    with == rather than is.
+    """
+    __slots__ = ('element',)
+
+    def __init__(self, element=None, tag='', text='', parent_node=None,
+                 index=-1):
+        if type(element) == str:
+            element = string_to_node(element)
+        elif element is None:
+            element = xml_node(tag, text)
+        self.element = element
+
+        if parent_node is not None:
+            parent_node.add_child(self, index=index)
+
+    __repr__ = XMLNode.__repr__
+    __str__ = XMLNode.__str__
+    __eq__ = XMLNode.__eq__
+    to_str = XMLNode.to_str
+    to_xml = XMLNode.to_xml
+    xpath = XMLNode.xpath
+    xpath_march = XMLNode.xpath_march
+    search_xpath = CompactXMLNode.search_xpath
+
+    def __getattr__(self, name):
+        # only called for names that aren't slots, methods or properties,
+        # i.e. the tags of child nodes
+        if name.startswith('_') or name in LazyXMLNode.__slots__:
+            raise AttributeError(name)
+        try:
+            return self._get_tag(name)
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getstate__(self):
+        return node_to_string(self.element)
+
+    def __setstate__(self, state):
+        self.element = string_to_node(state)
+
+    @property
+    def tag(self):
+        return self.element.tag
+
+    @property
+    def text(self):
+        try:
+            return self.element.text.strip()
+        except AttributeError:
+            return ''
+
+    @text.setter
+    def text(self, text):
+        if text is None or not str(text):
+            self.element.text = None
+        else:
+            self.element.text = str(text)
+
+    @property
+    def children(self):
+        # skip comments and processing instructions
+        return [LazyXMLNode(child) for child in self.element
+                if isinstance(child.tag, str)]
+
+    def _get_tag(self, tag):
+        """
+        Returns the child node(s) with a tag, the same as the attribute of
+        an XMLNode with that name: a single node, or a list if there is
+        more than one.  Like XMLNode the tag of the node itself returns the
+        node.
+
+        Raises KeyError if there is no such child
+        """
+        matches = [LazyXMLNode(child)
+                   for child in self.element.iterchildren(tag)]
+        if tag == self.tag:
+            matches.insert(0, self)
+        if not matches:
+            raise KeyError(tag)
+        elif len(matches) == 1:
+            return matches[0]
+        return matches
+
+    def clear_children(self, tag=None):
+        for child in self.element.getchildren():
+            if tag is None or child.tag == tag:
+                self.element.remove(child)
+
+    def add_child(self, child, index=-1, deep_copy=False):
+        """
+        Add a child node to this node
+
+        Parameters
+        ----------
+        child : LazyXMLNode, XMLNode, CompactXMLNode or lxml element
+                The element of a LazyXMLNode or an lxml element is added
+                to the tree (copied if it is already in a tree),
+                other nodes are converted to lxml
+        index : int, optional
+                The positional index to insert the child at.
+                If none specified the child is added after the existing ones
+        deep_copy : bool, optional
+                If True a copy of child is always added
+
+        Returns
+        -------
+        LazyXMLNode : the node that was added
+        """
+        if isinstance(child, LazyXMLNode):
+            child = child.element
+        elif type(child) != etree._Element:
+            child = child.to_xml()
+        if deep_copy or child.getparent() is not None:
+            child = copy.deepcopy(child)
+
+        if index < -1:
+            index += 1
+        siblings = [sibling for sibling in self.element
+                    if isinstance(sibling.tag, str)]
+        if index == -1 or index >= len(siblings):
+            self.element.append(child)
+        else:
+            if index < 0:
+                index = max(len(siblings) + index, 0)
+            self.element.insert(self.element.index(siblings[index]), child)
+        return LazyXMLNode(child)
+
+    def copy(self):
+        """
+        Returns
+        -------
+        LazyXMLNode : a node with a deep copy of this node's element
+        """
+        return LazyXMLNode(copy.deepcopy(self.element))
+
+
 def split_tag(tag):
     """
     parse an xml tag into the tag itself and the tag index
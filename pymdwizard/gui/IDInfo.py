@@ -147,7 +147,11 @@ class IdInfo(WizardWidget):
             e.ignore()
 
     def children(self):
-        return super(IdInfo, self).children() + [self.root_widget.spatial_tab.spdom]
+        # spdom is displayed on the spatial tab, which might not be built yet
+        spdom = self.root_widget.get_tag_widget('spdom', build=False)
+        if spdom is None:
+            return super(IdInfo, self).children()
+        return super(IdInfo, self).children() + [spdom]
 
     def switch_schema(self, schema):
         self.schema = schema
@@ -157,7 +161,7 @@ class IdInfo(WizardWidget):
             self.taxonomy.hide()
 
     def clear_widget(self):
-        self.root_widget.spatial_tab.spdom.clear_widget()
+        self.root_widget.clear_tag('spdom')
         WizardWidget.clear_widget(self)
 
     def _to_xml(self):
@@ -186,7 +190,7 @@ class IdInfo(WizardWidget):
         status_node = self.status._to_xml()
         idinfo_node.append(status_node)
 
-        spdom_node = self.root_widget.spatial_tab.spdom._to_xml()
+        spdom_node = self.root_widget.tag_to_xml('spdom')
         idinfo_node.append(spdom_node)
 
         keywords = self.keywords._to_xml()
@@ -261,7 +265,7 @@ class IdInfo(WizardWidget):
 
         spdom = xml_utils.search_xpath(xml_idinfo, 'spdom')
         if spdom is not None:
-            self.root_widget.spatial_tab.spdom._from_xml(spdom)
+            self.root_widget.tag_from_xml(spdom)
 
         keywords = xml_utils.search_xpath(xml_idinfo, 'keywords')
         if keywords is not None:
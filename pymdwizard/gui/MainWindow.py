@@ -39,7 +39,6 @@ responsibility is assumed by the USGS in connection therewith.
 ------------------------------------------------------------------------------
 """
 import sys, os
-import json
 import tempfile
 import time
 import datetime
@@ -50,15 +49,20 @@ from lxml import etree
 
 from PyQt5.QtWidgets import QMainWindow, QApplication, QSplashScreen, QMessageBox, QAction
 from PyQt5.QtWidgets import QWidget, QPushButton
+from PyQt5.QtWidgets import QLineEdit, QPlainTextEdit, QTextEdit, QComboBox
+from PyQt5.QtWidgets import QAbstractButton
 from PyQt5.QtWidgets import QFileDialog, QDialog
 from PyQt5.QtCore import QFile, QFileInfo
 from PyQt5.QtCore import Qt, QSettings, QFileSystemWatcher
+from PyQt5.QtCore import QObject, QThread, QTimer, QEvent
+from PyQt5.QtCore import pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QPainter, QPixmap
 
 
 from pymdwizard.gui.ui_files import UI_MainWindow
 from pymdwizard.gui.MetadataRoot import MetadataRoot
 from pymdwizard.core import xml_utils, utils, fgdc_utils
+from pymdwizard.core import startup_timer
 from pymdwizard.gui.Preview import Preview
 
 import sip
@@ -66,6 +70,11 @@ import sip
 class PyMdWizardMainForm(QMainWindow):
 
     max_recent_files = 10
+    # milliseconds to wait after the last key stroke before validating
+    validate_delay = 1500
+
+    # run number, xml string, schema
+    validation_requested = pyqtSignal(int, str, str)
 
     def __init__(self, parent=None):
         super(self.__class__, self).__init__()
@@ -79,6 +88,12 @@ class PyMdWizardMainForm(QMainWindow):
         self.error_widgets = []
         # the last error widget that was highlighted
         self.last_highlight = None
+        # incremented for each validation started, results from older
+        # runs are ignored when they come back from the worker
+        self.validation_run = 0
+        # whether the results of the current run should be reported
+        # with a message box
+        self.validation_interactive = True
 
         self.build_ui()
         self.connect_events()
@@ -100,6 +115,8 @@ class PyMdWizardMainForm(QMainWindow):
 
         self.metadata_root = MetadataRoot()
         self.ui.centralwidget.layout().addWidget(self.metadata_root)
+        self.widget_index = self.metadata_root.make_index()
+        self.metadata_root.section_built.connect(self.section_built)
 
         for i in range(PyMdWizardMainForm.max_recent_files):
             self.recent_file_actions.append(
@@ -110,6 +127,22 @@ class PyMdWizardMainForm(QMainWindow):
 
         self.ui.menuErrors.clear()
 
+        self.validation_thread = QThread(self)
+        self.validation_worker = ValidationWorker()
+        self.validation_worker.moveToThread(self.validation_thread)
+        self.validation_thread.start()
+        QApplication.instance().aboutToQuit.connect(
+            self.stop_validation_worker)
+
+        self.validation_timer = QTimer(self)
+        self.validation_timer.setSingleShot(True)
+        self.validation_timer.setInterval(self.validate_delay)
+
+        self.actionValidate_as_you_type = QAction('Validate as I type', self,
+                                                  checkable=True)
+        self.ui.menuValidate.insertAction(self.ui.actionClear_validation,
+                                          self.actionValidate_as_you_type)
+
         settings = QSettings('USGS', 'pymdwizard')
         template_fname = settings.value('template_fname')
 
@@ -138,6 +171,18 @@ class PyMdWizardMainForm(QMainWindow):
         self.ui.actionLaunch_Jupyter.triggered.connect(self.launch_jupyter)
         self.ui.actionUpdate.triggered.connect(self.update_from_github)
 
+        self.validation_requested.connect(self.validation_worker.validate)
+        self.validation_worker.finished.connect(self.validation_finished)
+        self.validation_worker.failed.connect(self.validation_failed)
+        self.validation_timer.timeout.connect(self.validate_in_background)
+        self.actionValidate_as_you_type.toggled.connect(
+            self.set_validate_as_you_type)
+
+        settings = QSettings('USGS', 'pymdwizard')
+        as_you_type = settings.value('validate_as_you_type', False)
+        self.actionValidate_as_you_type.setChecked(as_you_type in [True,
+                                                                   'true'])
+
     def open_recent_file(self):
         """
         handles the opening of a recent file selection
@@ -224,6 +269,7 @@ class PyMdWizardMainForm(QMainWindow):
         try:
             new_record = etree.parse(fname)
             self.metadata_root._from_xml(new_record)
+            self.widget_index.invalidate()
             self.statusBar().showMessage("File loaded", 10000)
         except BaseException as e:
             import traceback
@@ -248,7 +294,44 @@ class PyMdWizardMainForm(QMainWindow):
             self.last_updated = time.time()
             confirm = QMessageBox.question(self, "File Changed", msg, QMessageBox.Yes | QMessageBox.No)
             if confirm == QMessageBox.Yes:
-                self.load_file(self.cur_fname)
+                self.reload_file(self.cur_fname)
+
+    def reload_file(self, fname):
+        """
+        Reload only the sections of the form that differ from the file on
+        disk.  If the two can't be compared the whole file is loaded.
+
+        Parameters
+        ----------
+        fname : str
+                full file path and name of the file to reload
+        Returns
+        -------
+        None
+        """
+        try:
+            new_record = etree.parse(fname)
+            patches = xml_utils.diff_nodes(self.metadata_root._to_xml(),
+                                           new_record)
+        except BaseException:
+            self.load_file(fname)
+            return
+
+        # the file may have been replaced rather than changed in place
+        if fname not in self.file_watcher.files():
+            self.file_watcher.addPath(fname)
+        self.last_updated = time.time()
+
+        sections = xml_utils.patch_sections(patches)
+        if sections:
+            self.clear_validation()
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                self.metadata_root.reload_sections(new_record, sections)
+            finally:
+                QApplication.restoreOverrideCursor()
+            self.widget_index.invalidate()
+        self.statusBar().showMessage("File reloaded", 10000)
 
     def save_as(self):
         """
@@ -308,12 +391,40 @@ class PyMdWizardMainForm(QMainWindow):
             QMessageBox.warning(self, "Metadata Wizard", msg)
             return
 
-        xml_utils.save_to_file(self.metadata_root._to_xml(), fname)
+        record = self.metadata_root._to_xml()
+        if self.is_saved(record, fname):
+            self.statusBar().showMessage("No changes to save", 2000)
+            return
+
+        xml_utils.save_to_file(record, fname)
         self.last_updated = time.time()
 
         self.set_current_file(fname)
         self.statusBar().showMessage("File saved", 2000)
 
+    def is_saved(self, record, fname):
+        """
+        Is the content of a record the same as the file it would be saved
+        to, ignoring differences in formatting.
+
+        Parameters
+        ----------
+        record : lxml element
+        fname : str
+                full file path and name
+
+        Returns
+        -------
+        bool
+        """
+        if fname != self.cur_fname or not os.path.exists(fname):
+            return False
+        try:
+            return xml_utils.content_hash(fname) == \
+                   xml_utils.content_hash(record)
+        except BaseException:
+            return False
+
     def new_record(self):
         """
         Create a new record.
@@ -472,10 +583,39 @@ class PyMdWizardMainForm(QMainWindow):
 
         """
         if self.exit() == 'Close':
+            self.stop_validation_worker()
             event.accept()
         else:
             event.ignore()
 
+    def stop_validation_worker(self):
+        """
+        Shut down the background validation thread
+
+        Returns
+        -------
+        None
+        """
+        self.validation_timer.stop()
+        self.validation_thread.quit()
+        self.validation_thread.wait()
+
+    def section_built(self, section):
+        """
+        A section of the form was built the first time it was needed,
+        the widgets it contains have to be added to the widget index
+
+        Parameters
+        ----------
+        section : str
+                  name of the section that was built
+
+        Returns
+        -------
+        None
+        """
+        self.widget_index.invalidate()
+
     def clear_validation(self):
         """
         Remove the error highlighting from all the error widgets
@@ -486,9 +626,7 @@ class PyMdWizardMainForm(QMainWindow):
         """
         self.ui.menuErrors.clear()
 
-        annotation_lookup_fname = utils.get_resource_path("FGDC/bdp_lookup")
-        with open(annotation_lookup_fname, encoding='utf-8') as data_file:
-            annotation_lookup = json.loads(data_file.read())
+        annotation_lookup = utils.get_annotation_lookup()
 
         for widget in self.error_widgets:
 
@@ -505,26 +643,152 @@ class PyMdWizardMainForm(QMainWindow):
     def validate(self):
         """
         Check the current record against the schema and highlight any
-        error widgets
+        error widgets.  The schema validation itself runs on a background
+        thread, the results are displayed by validation_finished.
 
         Returns
         -------
         None
         """
+        self.start_validation(interactive=True)
+
+    def validate_in_background(self):
+        """
+        Quietly validate the record, only highlighting the errors found.
+        Used by the 'Validate as I type' option.
+
+        Returns
+        -------
+        None
+        """
+        self.start_validation(interactive=False)
+
+    def start_validation(self, interactive=True):
+        """
+        Serialize the current record and send it to the validation worker
 
+        Parameters
+        ----------
+        interactive : bool
+            report the results with a message box
+
+        Returns
+        -------
+        None
+        """
         if self.metadata_root.schema == 'bdp':
-            xsl_fname = utils.get_resource_path('FGDC/BDPfgdc-std-001-1998-annotated.xsd')
+            schema = 'bdp'
         else:
-            xsl_fname = utils.get_resource_path('FGDC/fgdc-std-001-1998-annotated.xsd')
-        from pymdwizard.core import fgdc_utils
-        errors = fgdc_utils.validate_xml(self.metadata_root._to_xml(), xsl_fname)
+            schema = 'fgdc'
+
+        # starting a new run cancels any run that is still in progress
+        self.validation_run += 1
+        self.validation_worker.latest_run = self.validation_run
+        self.validation_interactive = interactive
+        self.validation_timer.stop()
+
+        xml_str = xml_utils.node_to_string(self.metadata_root._to_xml())
+        self.statusBar().showMessage("Validating...")
+        self.validation_requested.emit(self.validation_run, xml_str, schema)
+
+    def set_validate_as_you_type(self, checked):
+        """
+        Turn revalidating the record shortly after each edit on or off
+
+        Parameters
+        ----------
+        checked : bool
+
+        Returns
+        -------
+        None
+        """
+        settings = QSettings('USGS', 'pymdwizard')
+        settings.setValue('validate_as_you_type', checked)
+
+        app = QApplication.instance()
+        if checked:
+            app.focusChanged.connect(self.watch_for_edits)
+            self.watch_for_edits(None, app.focusWidget())
+        else:
+            try:
+                app.focusChanged.disconnect(self.watch_for_edits)
+            except TypeError:
+                # was not connected
+                pass
+            self.validation_timer.stop()
+
+    def watch_for_edits(self, old, now):
+        """
+        Connect the change signal of a widget in the form to edit_made
+        the first time it gets the focus.  Widgets have to have the focus
+        to be edited, and this also covers widgets created after the
+        option was turned on.
+
+        Parameters
+        ----------
+        old : QWidget
+            The widget that lost the focus
+        now : QWidget
+            The widget that has the focus
+
+        Returns
+        -------
+        None
+        """
+        if now is None or getattr(now, 'restarts_validation', False) or \
+                not self.metadata_root.isAncestorOf(now):
+            return
+
+        if isinstance(now, (QLineEdit, QPlainTextEdit, QTextEdit)):
+            now.textChanged.connect(self.edit_made)
+        elif isinstance(now, QComboBox):
+            now.currentIndexChanged.connect(self.edit_made)
+            now.editTextChanged.connect(self.edit_made)
+        elif isinstance(now, QAbstractButton):
+            now.toggled.connect(self.edit_made)
+        now.restarts_validation = True
+
+    def edit_made(self):
+        """
+        Restart the validation timer after an edit in the form
+        """
+        if self.actionValidate_as_you_type.isChecked():
+            self.validation_timer.start()
+
+    def validation_finished(self, run, errors):
+        """
+        Highlight the errors returned by the validation worker
+
+        Parameters
+        ----------
+        run : int
+            The validation run these results are from
+        errors : list
+            list of (xpath, message, line number) tuples
+
+        Returns
+        -------
+        None
+        """
+        if run != self.validation_run:
+            # a newer validation has been started since this one
+            return
+
+        # errors in sections that haven't been built yet are from the xml
+        # as it was loaded, which the widgets can change when they load it.
+        # Build those sections and validate again, so the errors shown are
+        # the ones the record will have the next time it's validated.
+        built = [self.metadata_root.build_for_xpath(error[0])
+                 for error in errors]
+        if any(built):
+            self.start_validation(interactive=self.validation_interactive)
+            return
 
         self.clear_validation()
 
         marked_errors = []
 
-        self.widget_lookup = self.metadata_root.make_tree(widget=self.metadata_root)
-
         error_count = 0
         for error in errors:
             xpath, error_msg, line_num = error
@@ -537,16 +801,10 @@ class PyMdWizardMainForm(QMainWindow):
                 self.ui.menuErrors.addAction(action)
                 marked_errors.append(xpath)
 
-                # widget = self.metadata_root.get_widget(xpath)
-                widgets = self.widget_lookup.xpath_march(xpath, as_list=True)
-                for widget in widgets:
-                    if isinstance(widget, list):
-                        for w in widget:
-                            print('problem highlighting error', xpath, widget)
-                    else:
-                        self.highlight_error(widget.widget, error_msg)
-                        self.error_widgets.append(widget.widget)
-                        error_count += 1
+                for widget in self.widget_index.xpath_march(xpath):
+                    self.highlight_error(widget, error_msg)
+                    self.error_widgets.append(widget)
+                    error_count += 1
 
         if errors:
             msg = "There are {} errors in this record".format(error_count)
@@ -555,11 +813,36 @@ class PyMdWizardMainForm(QMainWindow):
             msg += "\n\n These errors are also listed in the Validation Menu's Errors submenu item above."
             msg += "\n Clicking each error will take you to the section it is contained in."
             msg += "\n Note that some highlighed errors can be in collapsed items, scrolled out of view, or in non-selected tabs"
-            QMessageBox.warning(self, "Validation", msg)
+            if self.validation_interactive:
+                QMessageBox.warning(self, "Validation", msg)
         else:
             msg = "Congratulations there were No FGDC Errors!"
             self.statusBar().showMessage(msg, 20000)
-            QMessageBox.information(self, "Validation", msg)
+            if self.validation_interactive:
+                QMessageBox.information(self, "Validation", msg)
+
+    def validation_failed(self, run, msg):
+        """
+        Report a problem encountered by the validation worker
+
+        Parameters
+        ----------
+        run : int
+            The validation run that failed
+        msg : str
+            the traceback of the error
+
+        Returns
+        -------
+        None
+        """
+        if run != self.validation_run:
+            return
+
+        self.statusBar().showMessage("Validation failed", 20000)
+        if self.validation_interactive:
+            msg = "Could not validate this record:\n{}".format(msg)
+            QMessageBox.warning(self, "Validation", msg)
 
     def goto_error(self, sender):
         """
@@ -601,9 +884,11 @@ class PyMdWizardMainForm(QMainWindow):
                 not sip.isdeleted(self.last_highlight):
             self.highlight_error(self.last_highlight, self.last_highlight.toolTip())
 
-        bad_widget = self.widget_lookup.xpath_march(xpath, as_list=True)
-        self.last_highlight = bad_widget[0].widget
-        self.highlight_error(bad_widget[0].widget, self.sender().text(), superhot=True)
+        bad_widgets = self.widget_index.xpath_march(xpath)
+        if not bad_widgets:
+            return
+        self.last_highlight = bad_widgets[0]
+        self.highlight_error(bad_widgets[0], self.sender().text(), superhot=True)
 
     def highlight_error(self, widget, error_msg, superhot=False):
         """
@@ -811,6 +1096,42 @@ class PyMdWizardMainForm(QMainWindow):
         QMessageBox.information(self, "Update results", msg)
 
 
+class ValidationWorker(QObject):
+    """
+    Validates serialized records on a background thread so that the
+    window stays responsive while large records are checked.
+
+    Runs that were superseded by a newer request before they started
+    are skipped, validation already underway can not be interrupted and
+    its results are ignored by the main form.
+    """
+    # run number, list of errors
+    finished = pyqtSignal(int, list)
+    # run number, error message
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super(ValidationWorker, self).__init__(parent)
+        # set from the main thread to the most recently requested run
+        self.latest_run = 0
+        # validates one section at a time, reusing the results of
+        # sections that have not been edited since the last validation
+        self.section_validator = fgdc_utils.SectionValidator()
+
+    @pyqtSlot(int, str, str)
+    def validate(self, run, xml_str, schema):
+        if run != self.latest_run:
+            return
+
+        try:
+            element = xml_utils.string_to_node(xml_str)
+            errors = self.section_validator.validate(element, schema)
+            self.finished.emit(run, list(errors))
+        except BaseException:
+            import traceback
+            self.failed.emit(run, traceback.format_exc())
+
+
 class JupyterLocationDialog(QDialog):
     def __init__(self, parent=None):
         super(JupyterLocationDialog, self).__init__(parent)
@@ -822,7 +1143,38 @@ class JupyterLocationDialog(QDialog):
         self.msgBox.addButton(QPushButton('Cancel'), QMessageBox.RejectRole)
 
 
-def launch_main(xml_fname=None, introspect_fname=None):
+class FirstPaintReporter(QObject):
+    """
+    Event filter that records the first time the main window is painted
+    on the active startup timer and prints the startup timing report.
+    """
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            timer = startup_timer.stop()
+            if timer is not None:
+                timer.record('milestone', 'first paint')
+                print(timer.report())
+        return False
+
+
+def launch_main(xml_fname=None, introspect_fname=None, fast=False):
+    """
+    Start the Metadata Wizard application
+
+    Parameters
+    ----------
+    xml_fname : str (optional)
+                The FGDC (or BDP) XML file to load
+    introspect_fname : str (optional)
+                The CSV or SHP file to use for populating the eainfo section
+    fast : bool
+           If True the splash screen is not held open for two seconds
+
+    Returns
+    -------
+    None
+    """
     app = QApplication(sys.argv)
 
     import time
@@ -842,15 +1194,24 @@ def launch_main(xml_fname=None, introspect_fname=None):
     splash = QSplashScreen(splash_pix, Qt.WindowStaysOnTopHint)
     splash.show()
     app.processEvents()
-    time.sleep(2)
+    startup_timer.record('milestone', 'splash screen shown')
+    if not fast:
+        time.sleep(2)
 
     app.processEvents()
-    mdwiz = PyMdWizardMainForm()
+    with startup_timer.timed('section', 'main window'):
+        mdwiz = PyMdWizardMainForm()
+
+    if startup_timer.get_timer() is not None:
+        first_paint_reporter = FirstPaintReporter(mdwiz)
+        mdwiz.installEventFilter(first_paint_reporter)
+
     mdwiz.show()
     splash.finish(mdwiz)
 
     if xml_fname is not None and os.path.exists(xml_fname):
-        mdwiz.open_file(xml_fname)
+        with startup_timer.timed('section', 'load ' + os.path.basename(xml_fname)):
+            mdwiz.open_file(xml_fname)
 
     if introspect_fname is not None and os.path.exists(introspect_fname):
         mdwiz.metadata_root.eainfo.detaileds[0].populate_from_fname(introspect_fname)
@@ -39,6 +39,8 @@ responsibility is assumed by the USGS in connection therewith.
 ------------------------------------------------------------------------------
 """
 import sys
+from copy import deepcopy
+
 import lxml
 from lxml import etree
 
@@ -55,6 +57,7 @@ from PyQt5.QtGui import QMouseEvent
 
 from pymdwizard.core import utils
 from pymdwizard.core import xml_utils
+from pymdwizard.core import startup_timer
 
 from pymdwizard.gui.wiz_widget import WizardWidget
 from pymdwizard.gui.ui_files import UI_MetadataRoot
@@ -73,6 +76,33 @@ class MetadataRoot(WizardWidget):
 
     ui_class = UI_MetadataRoot.Ui_metadata_root
 
+    # the section widgets in the order of their pages
+    sections = ['idinfo', 'dataqual', 'spatial_tab', 'eainfo', 'distinfo',
+                'metainfo']
+
+    # sections that are not built until they are first shown or needed.
+    # idinfo is on the first page and metainfo sets the schema of the record
+    # so these two are always built.
+    lazy_sections = ['dataqual', 'spatial_tab', 'eainfo', 'distinfo']
+
+    # xml section tag: (section widget it is displayed in,
+    #                   attribute of that widget or None for the widget itself)
+    section_tags = {'idinfo': ('idinfo', None),
+                    'spdom': ('spatial_tab', 'spdom'),
+                    'dataqual': ('dataqual', None),
+                    'spdoinfo': ('spatial_tab', 'spdoinfo'),
+                    'spref': ('spatial_tab', 'spref'),
+                    'eainfo': ('eainfo', None),
+                    'distinfo': ('distinfo', None),
+                    'metainfo': ('metainfo', None)}
+
+    # xml section tags in the order they are loaded by _from_xml
+    load_order = ['spdoinfo', 'spref', 'idinfo', 'dataqual', 'eainfo',
+                  'distinfo', 'metainfo']
+
+    # emitted with the section name when a lazy section has been built
+    section_built = pyqtSignal(str)
+
     def __init__(self, parent=None):
         self.schema = 'bdp'
         super(self.__class__, self).__init__(parent=parent)
@@ -89,24 +119,240 @@ class MetadataRoot(WizardWidget):
         self.ui.setupUi(self)
         self.setup_dragdrop(self, enable=True)
 
-        self.idinfo = IdInfo(root_widget=self, parent=self)
-        self.ui.page_idinfo.layout().addWidget(self.idinfo)
+        # section name: section widget, for the sections built so far
+        self.section_widgets = {}
+        # xml section tag: the xml loaded for a section that has not been
+        # built yet, or None if the section has been cleared
+        self.pending_xml = {}
+
+        for section in self.sections:
+            if section not in self.lazy_sections:
+                self.build_section(section)
+
+    @property
+    def idinfo(self):
+        return self.build_section('idinfo')
+
+    @property
+    def dataqual(self):
+        return self.build_section('dataqual')
+
+    @property
+    def spatial_tab(self):
+        return self.build_section('spatial_tab')
+
+    @property
+    def eainfo(self):
+        return self.build_section('eainfo')
+
+    @property
+    def distinfo(self):
+        return self.build_section('distinfo')
+
+    @property
+    def metainfo(self):
+        return self.build_section('metainfo')
+
+    def is_built(self, section):
+        """
+        Has the widget for a section been built yet
+
+        Parameters
+        ----------
+        section : str
+                  one of the names in MetadataRoot.sections
+
+        Returns
+        -------
+        bool
+        """
+        return section in self.section_widgets
+
+    def build_section(self, section):
+        """
+        Returns the widget for a section, building it and populating it
+        with any xml that was loaded for it first if needed.
+
+        Parameters
+        ----------
+        section : str
+                  one of the names in MetadataRoot.sections
 
-        self.dataqual =DataQuality()
-        self.ui.page_dataqual.layout().addWidget(self.dataqual)
-        # self.ui.page_dataqual.setLayout(self.dataqual.layout())
+        Returns
+        -------
+        WizardWidget
+        """
+        if section in self.section_widgets:
+            return self.section_widgets[section]
+
+        with startup_timer.timed('section', section):
+            if section == 'idinfo':
+                widget = IdInfo(root_widget=self, parent=self)
+                page = self.ui.page_idinfo
+            elif section == 'dataqual':
+                widget = DataQuality()
+                page = self.ui.page_dataqual
+            elif section == 'spatial_tab':
+                widget = SpatialTab(root_widget=self)
+                widget.switch_schema(self.schema)
+                page = self.ui.page_spatial
+            elif section == 'eainfo':
+                widget = EA()
+                page = self.ui.page_eainfo
+            elif section == 'distinfo':
+                widget = DistInfo(root_widget=self)
+                page = self.ui.page_distinfo
+            elif section == 'metainfo':
+                widget = MetaInfo(root_widget=self)
+                page = self.ui.page_metainfo
+            else:
+                raise KeyError(section)
+
+            page.layout().addWidget(widget)
+            self.section_widgets[section] = widget
+
+            for tag, (tag_section, attr) in self.section_tags.items():
+                if tag_section == section and tag in self.pending_xml:
+                    element = self.pending_xml.pop(tag)
+                    if element is None:
+                        self.get_tag_widget(tag).clear_widget()
+                    else:
+                        self.get_tag_widget(tag)._from_xml(element)
+
+        if section in self.lazy_sections:
+            self.section_built.emit(section)
+        return widget
+
+    def build_for_xpath(self, xpath):
+        """
+        Build the sections that contain the widgets for an xpath, for
+        instance one reported by validation.
 
-        self.spatial_tab = SpatialTab(root_widget=self)
-        self.ui.page_spatial.layout().addWidget(self.spatial_tab)
+        Parameters
+        ----------
+        xpath : str
+                for example 'metadata/spdoinfo/ptvctinf/sdtsterm/sdtstype'
 
-        self.eainfo = EA()
-        self.ui.page_eainfo.layout().addWidget(self.eainfo)
+        Returns
+        -------
+        bool : True if a section had to be built
+        """
+        built = False
+        for tag in xpath.split('/')[1:3]:
+            tag = xml_utils.split_tag(tag)[0]
+            if tag in self.section_tags:
+                section = self.section_tags[tag][0]
+                built |= not self.is_built(section)
+                self.build_section(section)
+        return built
+
+    def get_tag_widget(self, tag, build=True):
+        """
+        Returns the widget that displays an xml section
 
-        self.metainfo = MetaInfo(root_widget=self)
-        self.ui.page_metainfo.layout().addWidget(self.metainfo)
+        Parameters
+        ----------
+        tag : str
+              one of the tags in MetadataRoot.section_tags
+        build : bool
+                build the section the widget is in if it hasn't been yet,
+                if False None is returned for sections that aren't built
 
-        self.distinfo = DistInfo(root_widget=self)
-        self.ui.page_distinfo.layout().addWidget(self.distinfo)
+        Returns
+        -------
+        WizardWidget or None
+        """
+        section, attr = self.section_tags[tag]
+        if not build and not self.is_built(section):
+            return None
+
+        widget = self.build_section(section)
+        if attr is not None:
+            widget = getattr(widget, attr)
+        return widget
+
+    def tag_to_xml(self, tag):
+        """
+        Returns the xml for a section, if the widget for the section hasn't
+        been built the xml that was loaded for it is returned unchanged.
+
+        Parameters
+        ----------
+        tag : str
+              one of the tags in MetadataRoot.section_tags
+
+        Returns
+        -------
+        lxml element
+        """
+        if self.pending_xml.get(tag) is not None and \
+                not self.is_built(self.section_tags[tag][0]):
+            return deepcopy(self.pending_xml[tag])
+        return self.get_tag_widget(tag)._to_xml()
+
+    def tag_has_content(self, tag):
+        """
+        Does a section have content that should be written out to xml
+
+        Parameters
+        ----------
+        tag : str
+              one of the tags in MetadataRoot.section_tags
+
+        Returns
+        -------
+        bool
+        """
+        widget = self.get_tag_widget(tag, build=False)
+        if widget is None:
+            return self.pending_xml.get(tag) is not None
+        return widget.has_content()
+
+    def tag_from_xml(self, element):
+        """
+        Populate the widget for a section from xml, if the widget hasn't
+        been built yet the xml is held until it is.
+
+        Parameters
+        ----------
+        element : lxml element
+                  one of the sections of a record, for instance <spdoinfo>
+
+        Returns
+        -------
+        None
+        """
+        widget = self.get_tag_widget(element.tag, build=False)
+        if widget is None:
+            self.pending_xml[element.tag] = element
+        else:
+            widget._from_xml(element)
+
+    def clear_tag(self, tag):
+        """
+        Clear the widget for a section, if the widget hasn't been built
+        yet any xml held for it is dropped.
+
+        Parameters
+        ----------
+        tag : str
+              one of the tags in MetadataRoot.section_tags
+
+        Returns
+        -------
+        None
+        """
+        widget = self.get_tag_widget(tag, build=False)
+        if widget is None:
+            self.pending_xml[tag] = None
+        else:
+            widget.clear_widget()
+
+    def clear_widget(self):
+        for tag in self.section_tags:
+            if not self.is_built(self.section_tags[tag][0]):
+                self.pending_xml[tag] = None
+        WizardWidget.clear_widget(self)
 
     def connect_events(self):
         """
@@ -151,6 +397,8 @@ class MetadataRoot(WizardWidget):
         elif which_index == 5:
             self.ui.metainfo_button.setChecked(True)
 
+        self.build_section(self.sections[which_index])
+
         old_widget = self.ui.fgdc_metadata.currentWidget()
         new_widget = self.ui.fgdc_metadata.widget(which_index)
 
@@ -160,29 +408,30 @@ class MetadataRoot(WizardWidget):
     def switch_schema(self, schema):
         self.schema = schema
         self.idinfo.switch_schema(schema)
-        self.spatial_tab.switch_schema(schema)
+        if self.is_built('spatial_tab'):
+            self.spatial_tab.switch_schema(schema)
 
     def _to_xml(self):
         metadata_node = etree.Element('metadata')
         idinfo = self.idinfo._to_xml()
         metadata_node.append(idinfo)
 
-        dataqual = self.dataqual._to_xml()
+        dataqual = self.tag_to_xml('dataqual')
         metadata_node.append(dataqual)
 
-        if self.spatial_tab.spdoinfo.has_content():
-            spdoinfo = self.spatial_tab.spdoinfo._to_xml()
+        if self.tag_has_content('spdoinfo'):
+            spdoinfo = self.tag_to_xml('spdoinfo')
             metadata_node.append(spdoinfo)
 
-        if self.spatial_tab.spref.has_content():
-            spref = self.spatial_tab.spref._to_xml()
+        if self.tag_has_content('spref'):
+            spref = self.tag_to_xml('spref')
             metadata_node.append(spref)
 
-        if self.eainfo.has_content():
-            eainfo = self.eainfo._to_xml()
+        if self.tag_has_content('eainfo'):
+            eainfo = self.tag_to_xml('eainfo')
             metadata_node.append(eainfo)
 
-        distinfo = self.distinfo._to_xml()
+        distinfo = self.tag_to_xml('distinfo')
         metadata_node.append(distinfo)
 
         metainfo = self.metainfo._to_xml()
@@ -191,22 +440,31 @@ class MetadataRoot(WizardWidget):
 
 
     def _from_xml(self, metadata_element):
+        for tag in self.load_order:
+            self.populate_section(metadata_element, tag)
 
-        self.populate_section(metadata_element, 'spdoinfo', self.spatial_tab.spdoinfo)
-        #
-        self.populate_section(metadata_element, 'spref', self.spatial_tab.spref)
-
-        self.populate_section(metadata_element, 'idinfo', self.idinfo)
-
-        self.populate_section(metadata_element, 'dataqual', self.dataqual)
-
-        self.populate_section(metadata_element, 'eainfo', self.eainfo)
+    def reload_sections(self, metadata_element, tags):
+        """
+        Populate only some of the sections from a record, for instance the
+        ones that changed in a new version of the record.
 
-        self.populate_section(metadata_element, 'distinfo', self.distinfo)
+        Parameters
+        ----------
+        metadata_element : lxml element or tree
+                           the whole record
+        tags : list of str
+               section tags to load, tags that are not top level sections
+               (MetadataRoot.load_order) are ignored
 
-        self.populate_section(metadata_element, 'metainfo', self.metainfo)
+        Returns
+        -------
+        None
+        """
+        for tag in self.load_order:
+            if tag in tags:
+                self.populate_section(metadata_element, tag)
 
-    def populate_section(self, metadata_element, section_name, widget):
+    def populate_section(self, metadata_element, section_name):
 
         just_this_one = type(metadata_element) == etree._Element
 
@@ -218,9 +476,9 @@ class MetadataRoot(WizardWidget):
             section =  xml_utils.search_xpath(metadata_element, section_name)
 
         if section is not None:
-            widget._from_xml(section)
+            self.tag_from_xml(section)
         elif not just_this_one:
-            widget.clear_widget()
+            self.clear_tag(section_name)
 
 
 class FaderWidget(QWidget):
@@ -95,7 +95,8 @@ class Attr(WizardWidget):  #
     def clear_domain(self):
         for child in self.ui.attrdomv_contents.children():
             if isinstance(child, QWidget):
-                child.deleteLater()
+                self.discard_widget(child)
+        self.widgets_changed.emit()
 
     def set_series(self, series):
         self.series = series
@@ -184,6 +185,7 @@ class Attr(WizardWidget):  #
             pass
 
         self.ui.attrdomv_contents.layout().addWidget(self.domain)
+        self.widgets_changed.emit()
 
     def supersize_me(self, s=''):
         self.animation = QPropertyAnimation(self, b"minimumSize")
@@ -266,8 +268,8 @@ class Attr(WizardWidget):  #
         try:
             if attr.tag == 'attr':
 
-                utils.populate_widget(self, attr)
                 attr_dict = xml_utils.node_to_dict(attr)
+                utils.populate_widget(self, attr_dict)
 
                 if not 'fgdc_attrdomv' in attr_dict.keys():
                     self.ui.comboBox.setCurrentIndex(3)
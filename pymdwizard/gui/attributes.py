@@ -90,6 +90,7 @@ class Attributes(WizardWidget):  #
             attr_i.regularsize_me()
             self.main_layout.insertWidget(len(self.main_layout) - 1, attr_i)
 
+        self.widgets_changed.emit()
         self.attrs[0].supersize_me()
 
     def load_pickle(self, contents):
@@ -121,6 +122,7 @@ class Attributes(WizardWidget):  #
             attr_i.regularsize_me()
             self.main_layout.insertWidget(len(self.main_layout) - 1, attr_i)
 
+        self.widgets_changed.emit()
         try:
             self.attrs[0].supersize_me()
         except IndexError:
@@ -128,8 +130,9 @@ class Attributes(WizardWidget):  #
 
     def clear_children(self):
         for attribute in self.attrs:
-            attribute.deleteLater()
+            self.discard_widget(attribute)
         self.attrs = []
+        self.widgets_changed.emit()
 
     def minimize_children(self):
         for attr_widget in self.attrs:
@@ -181,6 +184,7 @@ class Attributes(WizardWidget):  #
                     self.attrs.append(attr_widget)
                     self.main_layout.insertWidget(len(self.main_layout) - 1, attr_widget)
 
+                self.widgets_changed.emit()
                 self.minimize_children()
                 self.attrs[0].supersize_me()
             else:
@@ -39,7 +39,6 @@ responsibility is assumed by the USGS in connection therewith.
 ------------------------------------------------------------------------------
 """
 import sys
-import json
 
 from PyQt5.QtGui import QPainter, QFont, QPalette, QBrush, QColor, QPixmap
 from PyQt5.QtWidgets import QMainWindow, QApplication
@@ -88,7 +87,8 @@ class MapProj(WizardWidget):
         while layout.count():
             child = layout.takeAt(0)
             if child.widget():
-                child.widget().deleteLater()
+                self.discard_widget(child.widget())
+        self.widgets_changed.emit()
 
     def load_projection(self, shortname):
 
@@ -96,13 +96,7 @@ class MapProj(WizardWidget):
         self.shortname = shortname
         self.projection = spatial_utils.lookup_shortname(shortname)
 
-        annotation_lookup_fname = utils.get_resource_path('fgdc/bdp_lookup')
-        try:
-            with open(annotation_lookup_fname, encoding='utf-8') as data_file:
-                annotation_lookup = json.loads(data_file.read())
-        except TypeError:
-            with open(annotation_lookup_fname) as data_file:
-                annotation_lookup = json.loads(data_file.read())
+        annotation_lookup = dict(utils.get_annotation_lookup())
 
         annotation_lookup['stdparll_2'] = {'long_name':'Standard Parallel',
                                       'annotation':annotation_lookup['stdparll']['annotation']}
@@ -126,6 +120,8 @@ class MapProj(WizardWidget):
             lineedit.setToolTip(annotation)
             layout.addRow(label, lineedit)
 
+        self.widgets_changed.emit()
+
     def _to_xml(self):
         if self.shortname:
             proj_root = xml_utils.xml_node(self.shortname)
@@ -47,6 +47,7 @@ from PyQt5.QtWidgets import QWidget, QLineEdit, QSizePolicy, QComboBox, QTableVi
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QPlainTextEdit
 from PyQt5.QtWidgets import QStyleOptionHeader, QHeaderView, QStyle
 from PyQt5.QtCore import QAbstractItemModel, QModelIndex, QSize, QRect, QPoint
+from PyQt5.QtCore import pyqtSignal
 
 
 
@@ -62,6 +63,9 @@ from pymdwizard.gui.repeating_element import RepeatingElement
 
 class PlaceList(WizardWidget): #
 
+    # emitted whenever thesaurus tabs are added or removed
+    widgets_changed = pyqtSignal()
+
     drag_label = "Place Keywords <keywords>"
     acceptable_tags = ['keywords', 'place']
 
@@ -104,6 +108,7 @@ class PlaceList(WizardWidget): #
                 self.thesauri.append(theme_widget)
         else:
             self.ui.place_contents.hide()
+        self.widgets_changed.emit()
 
     def add_another(self, click=False, tab_label='', locked=False):
 
@@ -119,6 +124,7 @@ class PlaceList(WizardWidget): #
             self.ui.theme_tabs.setCurrentIndex(self.ui.theme_tabs.count()-1)
 
             self.thesauri.append(theme_widget)
+            self.widgets_changed.emit()
         return theme_widget
 
     def changed_thesaurus(self, s):
@@ -132,6 +138,7 @@ class PlaceList(WizardWidget): #
     def remove_tab(self, index):
         self.ui.theme_tabs.removeTab(index)
         del self.thesauri[index-1]
+        self.widgets_changed.emit()
 
     def get_children(self, widget):
         children = []
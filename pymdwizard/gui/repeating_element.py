@@ -49,6 +49,7 @@ from PyQt5.QtWidgets import QWidget, QLineEdit, QSizePolicy, QComboBox, QTableVi
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QLabel, QScrollArea, QListWidgetItem
 from PyQt5.QtWidgets import QStyleOptionHeader, QHeaderView, QStyle
 from PyQt5.QtCore import QAbstractItemModel, QModelIndex, QSize, QRect, QPoint, Qt
+from PyQt5.QtCore import pyqtSignal
 from PyQt5 import QtCore
 
 from pymdwizard.core import utils
@@ -96,6 +97,9 @@ class DefaultWidget(QWidget):
 
 class RepeatingElement(QWidget):
 
+    # emitted whenever widgets are added or removed
+    widgets_changed = pyqtSignal()
+
     default_params = {'Title': 'insert title here',
                        'Italic Text': 'add notes here',
                        'Add text': 'button add me',
@@ -186,6 +190,8 @@ class RepeatingElement(QWidget):
             self.ui.tab_widget.setCurrentIndex(self.ui.tab_widget.count()-1)
         else:
             self.content_layout.insertWidget(len(self.widgets)-1, widget)
+
+        self.widgets_changed.emit()
         return widget
 
     def pop_off(self):
@@ -198,6 +204,7 @@ class RepeatingElement(QWidget):
             else:
                 last_added = self.widgets.pop()
                 last_added.deleteLater()
+            self.widgets_changed.emit()
         elif len(self.widgets) == 1:
             self.clear_widgets()
 
@@ -212,6 +219,8 @@ class RepeatingElement(QWidget):
 
         if add_another:
             self.add_another()
+        else:
+            self.widgets_changed.emit()
 
 
 
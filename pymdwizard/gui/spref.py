@@ -39,7 +39,6 @@ responsibility is assumed by the USGS in connection therewith.
 ------------------------------------------------------------------------------
 """
 import sys
-import json
 
 from PyQt5.QtGui import QPainter, QFont, QPalette, QBrush, QColor, QPixmap
 from PyQt5.QtWidgets import QMainWindow, QApplication
@@ -167,20 +166,14 @@ class SpRef(WizardWidget):
         gridsys_name = self.ui.fgdc_gridsysn.currentText()
         projection = spatial_utils.GRIDSYS_LOOKUP[gridsys_name]
 
-        annotation_lookup_fname = utils.get_resource_path('fgdc/bdp_lookup')
-        try:
-            with open(annotation_lookup_fname, encoding='utf-8') as data_file:
-                annotation_lookup = json.loads(data_file.read())
-        except TypeError:
-            with open(annotation_lookup_fname) as data_file:
-                annotation_lookup = json.loads(data_file.read())
+        annotation_lookup = utils.get_annotation_lookup()
 
 
         layout = self.ui.gridsys_contents.layout()
         while layout.count():
             child = layout.takeAt(0)
             if child.widget():
-                child.widget().deleteLater()
+                self.discard_widget(child.widget())
 
         for param in projection['elements']:
             try:
@@ -198,6 +191,8 @@ class SpRef(WizardWidget):
             lineedit.setToolTip(annotation)
             layout.addRow(label, lineedit)
 
+        self.widgets_changed.emit()
+
         gridsys_proj = spatial_utils.PROJECTION_LOOKUP[projection['projection']]
         self.grid_mapproj.load_projection(gridsys_proj['shortname'])
 
@@ -47,6 +47,7 @@ from PyQt5.QtWidgets import QWidget, QLineEdit, QSizePolicy, QComboBox, QTableVi
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QPlainTextEdit
 from PyQt5.QtWidgets import QStyleOptionHeader, QHeaderView, QStyle
 from PyQt5.QtCore import QAbstractItemModel, QModelIndex, QSize, QRect, QPoint
+from PyQt5.QtCore import pyqtSignal
 
 
 
@@ -63,6 +64,9 @@ from pymdwizard.gui.repeating_element import RepeatingElement
 
 class ThemeList(WizardWidget): #
 
+    # emitted whenever thesaurus tabs are added or removed
+    widgets_changed = pyqtSignal()
+
     drag_label = "Theme Keywords <keywords>"
     acceptable_tags = ['keywords']
 
@@ -115,6 +119,7 @@ class ThemeList(WizardWidget): #
             self.ui.theme_tabs.setCurrentIndex(self.ui.theme_tabs.count()-1)
 
             self.thesauri.append(theme_widget)
+            self.widgets_changed.emit()
 
         return theme_widget
 
@@ -129,14 +134,17 @@ class ThemeList(WizardWidget): #
         else:
             self.ui.theme_tabs.removeTab(current_index)
             del self.thesauri[current_index-1]
+            self.widgets_changed.emit()
 
     def remove_iso(self):
         self.ui.theme_tabs.setTabEnabled(0, False)
         self.ui.fgdc_theme.hide()
+        self.widgets_changed.emit()
 
     def add_iso(self):
         self.ui.theme_tabs.setTabEnabled(0, True)
         self.ui.fgdc_theme.show()
+        self.widgets_changed.emit()
 
         self.ui.theme_tabs.setCurrentIndex(0)
         self.repaint()
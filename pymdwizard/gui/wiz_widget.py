@@ -34,6 +34,9 @@ responsibility is assumed by the USGS in connection therewith.
 ------------------------------------------------------------------------------
 """
 import sys
+import collections
+import functools
+
 from lxml import etree
 
 from PyQt5.QtWidgets import QMainWindow, QApplication, QMenu, QMessageBox, QLayout
@@ -42,6 +45,9 @@ from PyQt5.QtWidgets import QSpacerItem, QToolButton, QGroupBox, QPlainTextEdit
 from PyQt5.QtGui import QFont, QFontMetrics, QPalette, QBrush, QCursor
 from PyQt5.QtGui import QColor, QPixmap, QDrag, QPainter, QIcon, QGuiApplication
 from PyQt5.QtCore import Qt, QMimeData, QObject, QByteArray, QRegExp, QEvent
+from PyQt5.QtCore import pyqtSignal
+
+import sip
 
 from pymdwizard.core import utils
 from pymdwizard.core import xml_utils
@@ -62,6 +68,10 @@ class WizardWidget(QWidget):
                    The original xml node contents before any changes were made.
                    Note: This is not currently implemented
     """
+    # emitted by subclasses whenever they add or remove fgdc_ widgets,
+    # so that a WidgetIndex containing them is brought up to date
+    widgets_changed = pyqtSignal()
+
     # Preferred widget size constants
     # if widget doesn't collapse use -1 for COLLAPSED_HEIGHT
     WIDGET_WIDTH = 805
@@ -159,6 +169,35 @@ class WizardWidget(QWidget):
             else:
                 self.make_tree(child_widget)
 
+    def discard_widget(self, widget):
+        """
+        Remove a child widget that is being replaced.  deleteLater on its
+        own leaves the widget in the widget tree until the event loop runs,
+        where make_tree or a WidgetIndex would still find it.
+
+        Parameters
+        ----------
+        widget : QWidget
+
+        Returns
+        -------
+        None
+        """
+        widget.setParent(None)
+        widget.deleteLater()
+
+    def make_index(self):
+        """
+        Build an xpath -> widget index of the fgdc widgets contained in
+        this widget.  Unlike make_tree the index keeps itself up to date
+        as repeating elements add and remove widgets.
+
+        Returns
+        -------
+            WidgetIndex
+        """
+        return WidgetIndex(self)
+
     def get_children(self, widget):
         try:
             widget_children = widget.children()
@@ -345,15 +384,7 @@ class WizardWidget(QWidget):
         self.set_stylesheet()
 
     def populate_tooltips(self):
-        import json
-        annotation_lookup_fname = utils.get_resource_path('FGDC/bdp_lookup')
-        try:
-            with open(annotation_lookup_fname, encoding='utf-8') as data_file:
-                annotation_lookup = json.loads(data_file.read())
-        except TypeError:
-            with open(annotation_lookup_fname) as data_file:
-                annotation_lookup = json.loads(data_file.read())
-
+        annotation_lookup = utils.get_annotation_lookup()
 
         if self.objectName().startswith('fgdc_'):
             self.populate_tooltip(self, annotation_lookup)
@@ -510,6 +541,248 @@ class WizardWidget(QWidget):
 
         return super(WizardWidget, self).eventFilter(obj, event)
 
+class _IndexNode(object):
+    """
+    A single fgdc widget in a WidgetIndex
+    """
+    __slots__ = ('tag', 'widget', 'children')
+
+    def __init__(self, tag, widget):
+        self.tag = tag
+        self.widget = widget
+        # tag -> list of child _IndexNodes in document order
+        self.children = collections.OrderedDict()
+
+
+class WidgetIndex(object):
+    """
+    Index of the fgdc_ widgets in a form, organized the same way as the
+    xml they produce, so that the widget for an xpath (for instance one
+    reported by validation) can be looked up one xpath segment at a time.
+
+    Widgets are walked with the same rules as WizardWidget.make_tree.
+    Repeating elements encountered during the walk are watched, and when
+    they add or remove widgets only the part of the index below their
+    closest fgdc_ ancestor is rebuilt, the next time the index is used.
+
+    Parameters
+    ----------
+    root_widget : WizardWidget
+                  The widget (usually MetadataRoot) to index
+    """
+    def __init__(self, root_widget):
+        self.root_widget = root_widget
+        self.root = None
+        # widget -> _IndexNode
+        self._nodes = {}
+        # widgets whose fgdc_ widgets have changed
+        self._stale = []
+        # (node, tag) lookups that found nothing since the last change
+        self._misses = set()
+        self._built = False
+
+    def invalidate(self, widget=None):
+        """
+        Mark part of the index as out of date
+
+        Parameters
+        ----------
+        widget : QWidget (optional)
+                 The widget whose contents changed, only the index below
+                 its closest fgdc_ ancestor will be rebuilt.
+                 If not specified the whole index is rebuilt.
+
+        Returns
+        -------
+        None
+        """
+        self._misses.clear()
+        if widget is None:
+            self._built = False
+        else:
+            self._stale.append(widget)
+
+    def _build(self):
+        self._nodes = {}
+        self._stale = []
+        self._misses.clear()
+        self.root = None
+        self._built = True
+
+        root_widget = self._find_root(self.root_widget)
+        if root_widget is not None:
+            self.root = self._index_widget(root_widget)
+
+    def _find_root(self, widget):
+        for child_widget in widget.children():
+            if child_widget.objectName().startswith('fgdc_'):
+                return child_widget
+            found = self._find_root(child_widget)
+            if found is not None:
+                return found
+        return None
+
+    def _index_widget(self, widget):
+        node = _IndexNode(widget.objectName().replace('fgdc_', ''), widget)
+        self._nodes[widget] = node
+        self._add_children(widget, node)
+        return node
+
+    def _add_children(self, widget, parent_node):
+        if hasattr(widget, 'widgets_changed') and \
+                getattr(widget, 'watching_index', None) is not self:
+            widget.widgets_changed.connect(functools.partial(self.invalidate,
+                                                             widget))
+            widget.watching_index = self
+
+        if isinstance(widget, WizardWidget):
+            widget_children = widget.get_children(widget)
+        else:
+            widget_children = self.root_widget.get_children(widget)
+
+        for child_widget in widget_children:
+            try:
+                widget_name = child_widget.objectName()
+            except AttributeError:
+                widget_name = 'Unknown'
+
+            if widget_name.startswith('fgdc_'):
+                child_node = self._index_widget(child_widget)
+                parent_node.children.setdefault(child_node.tag,
+                                                []).append(child_node)
+            else:
+                self._add_children(child_widget, parent_node)
+
+    def _refresh(self):
+        """
+        Bring the index up to date before it is used
+        """
+        if not self._built:
+            self._build()
+            return
+
+        stale, self._stale = self._stale, []
+        for widget in stale:
+            if sip.isdeleted(widget):
+                continue
+
+            # find the closest indexed ancestor of the changed widget
+            ancestor = widget
+            while ancestor is not None and ancestor not in self._nodes:
+                ancestor = ancestor.parent()
+
+            node = None
+            if ancestor is not None:
+                node = self._nodes[ancestor]
+            if node is None or _is_removed(node.widget):
+                self._build()
+                return
+
+            self._reindex(node)
+
+    def _reindex(self, node):
+        self._forget(node)
+        node.children = collections.OrderedDict()
+        self._add_children(node.widget, node)
+
+    def _forget(self, node):
+        for children in node.children.values():
+            for child_node in children:
+                self._nodes.pop(child_node.widget, None)
+                self._forget(child_node)
+
+    def search(self, xpath):
+        """
+        Returns the widgets that correspond to an xpath.
+        Segments without an index ([n]) match all the widgets with that
+        tag, the same as XMLNode.search_xpath
+
+        Parameters
+        ----------
+        xpath : str
+                for example 'metadata/idinfo/keywords/theme[2]/themekey'
+
+        Returns
+        -------
+            list of QWidgets
+        """
+        self._refresh()
+        if self.root is None or not xpath:
+            return []
+
+        items = xpath.split('/')
+        tag, index = xml_utils.split_tag(items[0])
+        if tag != self.root.tag:
+            return []
+
+        nodes = [self.root]
+        for item in items[1:]:
+            tag, index = xml_utils.split_tag(item)
+            matches = []
+            for node in nodes:
+                children = self._children(node, tag)
+                if '[' in item:
+                    if index < len(children):
+                        matches.append(children[index])
+                else:
+                    matches.extend(children)
+            nodes = matches
+            if not nodes:
+                return []
+
+        return [node.widget for node in nodes]
+
+    def _children(self, node, tag):
+        """
+        The child nodes of node with a given tag.  The node is re-indexed
+        first if any of its children have been removed since it was indexed,
+        or if it has no child with this tag, in case widgets were replaced
+        without widgets_changed being emitted.  Tags that are still missing
+        are not looked for again until the index is invalidated.
+        """
+        if any(_is_removed(child.widget)
+               for children in node.children.values() for child in children):
+            self._reindex(node)
+            self._misses.clear()
+        elif tag not in node.children and (node, tag) not in self._misses:
+            self._reindex(node)
+
+        children = node.children.get(tag, [])
+        if not children:
+            self._misses.add((node, tag))
+        return children
+
+    def xpath_march(self, xpath):
+        """
+        for a given xpath, return the widgets of the most distant match.
+        Removes the last segment of the xpath until a match is found.
+
+        Parameters
+        ----------
+        xpath : str
+
+        Returns
+        -------
+            list of QWidgets
+        """
+        xpath_items = xpath.split('/')
+
+        while xpath_items:
+            widgets = self.search('/'.join(xpath_items))
+            if widgets:
+                return widgets
+            xpath_items.pop()
+
+        return []
+
+
+def _is_removed(widget):
+    """
+    True if a widget has been destroyed or taken out of the widget tree
+    """
+    return sip.isdeleted(widget) or widget.parent() is None
+
+
 NORMAL_STYLE = """
 QGroupBox{
     background-color: transparent;
@@ -0,0 +1,21 @@
+import pytest
+
+from pymdwizard.core import cache_utils, fgdc_utils, taxonomy
+
+
+@pytest.fixture(autouse=True)
+def cache_dname(tmpdir_factory, monkeypatch):
+    """
+    Keep the cache files written by the tests (validation results, ITIS
+    responses and rank names) out of the user's cache directory
+    """
+    dname = tmpdir_factory.mktemp('cache')
+    monkeypatch.setattr(cache_utils, 'get_cache_dname', lambda: str(dname))
+    # caches opened by earlier tests would still be in the old directory
+    monkeypatch.setattr(fgdc_utils, '_validation_cache', None)
+    monkeypatch.setattr(taxonomy, '_response_cache', None)
+    yield dname
+
+    for cache in [fgdc_utils._validation_cache, taxonomy._response_cache]:
+        if cache is not None and cache is not False:
+            cache.close()
@@ -0,0 +1,109 @@
+"""Unittests for core.batch_edit"""
+
+
+import os
+import json
+import shutil
+
+import pytest
+from lxml import etree
+
+from pymdwizard.core import batch_edit
+
+RECORD_FNAME = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+
+PATCHES = [{'xpath': 'idinfo/citation/citeinfo/pubdate',
+            'action': 'set_text', 'text': '20260101'},
+           {'xpath': 'idinfo/citation/citeinfo/origin', 'action': 'set_text',
+            'old': 'nobody', 'text': 'not used'},
+           {'xpath': 'idinfo/native', 'action': 'delete'},
+           {'xpath': 'idinfo/citation/citeinfo', 'action': 'append',
+            'xml': '<onlink>https://www.usgs.gov</onlink>'},
+           {'xpath': 'metainfo/metd', 'action': 'replace',
+            'xml': '<metd>20260102</metd>'},
+           {'xpath': 'idinfo/citation/citeinfo/edition',
+            'action': 'set_text', 'text': '2', 'create': True}]
+
+
+def copy_records(tmpdir, count):
+    fnames = []
+    for i in range(count):
+        fname = str(tmpdir.join('record_{}.xml'.format(i)))
+        shutil.copy(RECORD_FNAME, fname)
+        fnames.append(fname)
+    return fnames
+
+
+def test_edit_records(tmpdir):
+    fnames = copy_records(tmpdir, 3)
+    results = list(batch_edit.edit_records(str(tmpdir), PATCHES, workers=2))
+    assert sorted(result[0] for result in results) == fnames
+    assert all(error is None for fname, changes, diff, error in results)
+    # no temporary files left behind
+    assert sorted(os.listdir(str(tmpdir))) == \
+           sorted(os.path.basename(fname) for fname in fnames)
+
+    record = etree.parse(fnames[0])
+    citeinfo = record.find('idinfo/citation/citeinfo')
+    assert citeinfo.findtext('pubdate') == '20260101'
+    assert [onlink.text for onlink in citeinfo.findall('onlink')] == \
+           ['https://www.usgs.gov']
+    assert record.findtext('metainfo/metd') == '20260102'
+    assert record.find('idinfo/native') is None
+    assert citeinfo.findtext('edition') == '2'
+
+    # applying the same patches again doesn't change anything
+    mtime = os.path.getmtime(fnames[0])
+    fname, changes, diff, error = batch_edit.edit_record(
+        fnames[0], PATCHES[:1])
+    assert changes == 0
+    assert os.path.getmtime(fnames[0]) == mtime
+
+
+def test_dry_run(tmpdir):
+    fname = copy_records(tmpdir, 1)[0]
+    with open(fname) as xml_file:
+        original = xml_file.read()
+
+    fname, changes, diff, error = batch_edit.edit_record(fname, PATCHES,
+                                                         dry_run=True)
+    assert changes == 5
+    assert '+        <pubdate>20260101</pubdate>' in diff
+    assert '-    <native>' in diff
+    with open(fname) as xml_file:
+        assert xml_file.read() == original
+
+
+def test_bad_patches(tmpdir):
+    with pytest.raises(ValueError):
+        list(batch_edit.edit_records(RECORD_FNAME, [{'xpath': 'idinfo',
+                                                     'action': 'rename'}]))
+    patch_fname = str(tmpdir.join('patches.json'))
+    with open(patch_fname, 'w') as patch_file:
+        json.dump(PATCHES, patch_file)
+    assert batch_edit.load_patches(patch_fname) == PATCHES
+
+    bad_fname = str(tmpdir.join('bad.xml'))
+    with open(bad_fname, 'w') as f:
+        f.write('<bad')
+    fname, changes, diff, error = batch_edit.edit_record(bad_fname, PATCHES)
+    assert error.startswith('could not open file')
+
+
+@pytest.mark.parametrize('xpath', ['x:idinfo', '$v', 'count(idinfo)',
+                                   'string(idinfo)'])
+def test_unevaluable_xpath(tmpdir, xpath):
+    fnames = copy_records(tmpdir, 3)
+    with open(fnames[0]) as xml_file:
+        original = xml_file.read()
+
+    patches = [PATCHES[0], {'xpath': xpath, 'action': 'delete'}]
+    with pytest.raises(ValueError):
+        list(batch_edit.edit_records(str(tmpdir), patches, workers=1))
+    # every record is reported, none of them is half edited
+    results = [batch_edit.edit_record(fname, patches) for fname in fnames]
+    assert all(changes == 0 and error for fname, changes, diff, error
+               in results)
+    for fname in fnames:
+        with open(fname) as xml_file:
+            assert xml_file.read() == original
@@ -0,0 +1,68 @@
+"""Unittests for core.batch_validation"""
+
+
+import os
+
+import pytest
+
+from pymdwizard.core import batch_validation
+
+
+def test_validate_records(tmpdir, cache_dname):
+    from pymdwizard.core import fgdc_utils
+
+    fname = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+    results = list(batch_validation.validate_records([fname, fname],
+                                                     schema='bdp', workers=2))
+    assert len(results) == 2
+    # the validation cache is only opened when it's used
+    assert fgdc_utils._validation_cache is None
+    assert cache_dname.listdir() == []
+    fname, title, abstract, errors = results[0]
+    assert title.startswith('Catalogue of Polar Bear')
+    assert errors[0][0] == 'metadata/idinfo/ptcontac/cntinfo/cntorgp/cntorg'
+
+    bad_fname = str(tmpdir.join('bad.xml'))
+    with open(bad_fname, 'w') as f:
+        f.write('<bad')
+    results = list(batch_validation.validate_records(str(tmpdir)))
+    assert results[0][3] == "<<<could not open file>>>"
+
+
+def test_report_resume(tmpdir):
+    fnames = ["tests/data/USGS_ASC_PolarBears_FGDC.xml",
+              "tests/data/GenericFGDCTemplate_FGDCtemp.xml"]
+
+    for report_fname in [str(tmpdir.join('report.csv')),
+                         str(tmpdir.join('report.jsonl'))]:
+        results = batch_validation.validate_records(fnames[:1], workers=1)
+        assert batch_validation.write_report(results, report_fname) == 1
+
+        done = batch_validation.read_report(report_fname)
+        assert done == set(fnames[:1])
+
+        results = batch_validation.validate_records(fnames, workers=1,
+                                                    skip=done)
+        assert batch_validation.write_report(results, report_fname,
+                                             append=True) == 1
+        assert batch_validation.read_report(report_fname) == set(fnames)
+
+
+def test_main_clear_cache_workers(tmpdir, monkeypatch):
+    from pymdwizard.core import cache_utils
+    from pymdwizard.core import fgdc_utils
+
+    cache = cache_utils.SQLiteCache(str(tmpdir.join('validation.sqlite')))
+    cache.set('stale', b'value')
+    monkeypatch.setattr(fgdc_utils, '_validation_cache', cache)
+
+    fnames = ["tests/data/USGS_ASC_PolarBears_FGDC.xml",
+              "tests/data/GenericFGDCTemplate_FGDCtemp.xml"]
+    report_fname = str(tmpdir.join('report.csv'))
+    batch_validation.main(fnames + ['-o', report_fname, '--clear-cache',
+                                    '--cache', '-w', '2', '-c', '1'])
+
+    # the workers wrote through their own connections
+    assert 'stale' not in cache
+    assert len(cache) == 2
+    assert batch_validation.read_report(report_fname) == set(fnames)
@@ -0,0 +1,195 @@
+"""Unittests for core.cache_utils"""
+
+
+import os
+import sys
+import time
+import multiprocessing
+
+import pytest
+from lxml import etree
+
+from pymdwizard.core import cache_utils
+from pymdwizard.core import fgdc_utils
+
+
+def test_sqlite_cache(tmpdir):
+    cache = cache_utils.SQLiteCache(str(tmpdir.join('test.sqlite')),
+                                    max_entries=3)
+    for i in range(3):
+        cache.set(str(i), b'value')
+    assert len(cache) == 3
+
+    # touch '0' so that '1' is the least recently used
+    assert cache.get('0') == b'value'
+    cache.set('3', b'value')
+    assert len(cache) == 3
+    assert '1' not in cache
+    assert '0' in cache
+    assert cache.get('1') is None
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_max_bytes(tmpdir):
+    cache = cache_utils.SQLiteCache(str(tmpdir.join('test.sqlite')),
+                                    max_bytes=10)
+    cache.set('a', b'12345')
+    cache.set('b', b'12345')
+    cache.set('c', b'12345')
+    assert 'a' not in cache
+    assert cache.get('c') == b'12345'
+
+
+def test_sqlite_cache_max_age(tmpdir, monkeypatch):
+    cache = cache_utils.SQLiteCache(str(tmpdir.join('test.sqlite')))
+    cache.set('a', b'value')
+    assert cache.get('a', max_age=60) == b'value'
+
+    now = time.time()
+    monkeypatch.setattr(cache_utils.time, 'time', lambda: now + 120)
+    assert cache.get('a', max_age=60) is None
+    assert cache.get('a') == b'value'
+
+
+def test_sqlite_cache_access_batch(tmpdir):
+    cache = cache_utils.SQLiteCache(str(tmpdir.join('test.sqlite')),
+                                    max_entries=3)
+    cache.access_batch_size = 3
+    for key in ['a', 'b', 'c']:
+        cache.set(key, b'value')
+
+    def accessed(key):
+        return cache._connect().execute(
+            'SELECT accessed FROM cache WHERE key=?', (key,)).fetchone()[0]
+
+    before = accessed('a')
+    cache.get('a')
+    cache.get('b')
+    # reads don't write to the file until there are enough of them
+    assert accessed('a') == before
+    cache.get('a')
+    cache.get('c')
+    assert accessed('a') > before
+    assert cache._accessed == {}
+
+    # pending reads count when choosing what to evict
+    cache.get('a')
+    cache.set('d', b'value')
+    assert 'a' in cache
+    assert 'b' not in cache
+
+
+def test_directory_cache(tmpdir, monkeypatch):
+    cache = cache_utils.DirectoryCache(str(tmpdir.join('cache')),
+                                       max_entries=3)
+    for i in range(3):
+        cache.set(str(i), b'value')
+    assert len(cache) == 3
+
+    # make '1' the least recently used
+    for i, key in enumerate(['1', '2', '0']):
+        fname = cache._fname(key)
+        os.utime(fname, (1000 + i, os.path.getmtime(fname)))
+    cache.set('3', b'value')
+    assert len(cache) == 3
+    assert '1' not in cache
+    assert cache.get('0') == b'value'
+
+    now = time.time()
+    monkeypatch.setattr(cache_utils.time, 'time', lambda: now + 120)
+    assert cache.get('0', max_age=60) is None
+    assert cache.get('0') == b'value'
+
+    cache.delete('0')
+    assert '0' not in cache
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_directory_cache_scans(tmpdir, monkeypatch):
+    cache = cache_utils.DirectoryCache(str(tmpdir.join('cache')),
+                                       max_entries=10)
+    cache.evict_interval = 4
+    scans = []
+    entries = cache._entries
+
+    def counted_entries():
+        scans.append(len(scans))
+        return entries()
+
+    monkeypatch.setattr(cache, '_entries', counted_entries)
+    for i in range(8):
+        cache.set(str(i), b'value')
+    # the first write and then every evict_interval writes
+    assert len(scans) == 2
+
+    # writes that could go over the limits scan right away
+    for i in range(8, 12):
+        cache.set(str(i), b'value')
+    assert len(os.listdir(cache.dname)) == 10
+
+
+_forked_cache = None
+
+
+def _set_in_child(key):
+    _forked_cache.set(key, b'value')
+    return _forked_cache._pid, os.getpid()
+
+
+def test_sqlite_cache_fork(tmpdir, monkeypatch):
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        pytest.skip('fork is not available')
+
+    cache = cache_utils.SQLiteCache(str(tmpdir.join('test.sqlite')))
+    cache.set('parent', b'value')
+    parent_connection = cache._connection
+    monkeypatch.setattr(sys.modules[__name__], '_forked_cache', cache)
+
+    pool = multiprocessing.get_context('fork').Pool(2)
+    try:
+        results = pool.map(_set_in_child, ['a', 'b', 'c', 'd'], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    # each worker opened its own connection
+    for connection_pid, pid in results:
+        assert connection_pid == pid != os.getpid()
+    assert cache._connection is parent_connection
+    assert len(cache) == 5
+
+
+def test_validation_cache(tmpdir, monkeypatch):
+    cache = cache_utils.SQLiteCache(str(tmpdir.join('validation.sqlite')))
+    monkeypatch.setattr(fgdc_utils, '_validation_cache', cache)
+
+    fname = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+    errors = fgdc_utils.validate_xml(fname, 'bdp', use_cache=True)
+    assert len(cache) == 1
+    assert fgdc_utils.validate_xml(fname, 'bdp', use_cache=True) == errors
+    assert fgdc_utils.validate_xml(fname, 'bdp') == errors
+
+    fgdc_utils.validate_xml(fname, 'fgdc', use_cache=True)
+    assert len(cache) == 2
+
+    # the same record indented differently uses the cached results, with
+    # the lines of its own elements
+    record = etree.parse(fname)
+    etree.indent(record, space='\t\t')
+    record.getroot().insert(0, etree.Comment('\n\n\n'))
+    indented_fname = str(tmpdir.join('indented.xml'))
+    record.write(indented_fname)
+    indented_errors = fgdc_utils.validate_xml(indented_fname, 'bdp',
+                                              use_cache=True)
+    assert len(cache) == 2
+    assert [error[:2] for error in indented_errors] == \
+           [error[:2] for error in errors]
+    assert [error[2] for error in indented_errors] != \
+           [error[2] for error in errors]
+    assert fgdc_utils.validate_xml(indented_fname, 'bdp') == indented_errors
+
+    fgdc_utils.clear_validation_cache()
+    assert len(cache) == 0
@@ -0,0 +1,84 @@
+"""Unittests for core.fgdc_utils"""
+
+
+import pytest
+
+from pymdwizard.core import fgdc_utils
+
+
+def test_load_schema_cached():
+    schema = fgdc_utils.load_schema('fgdc')
+    assert fgdc_utils.load_schema('FGDC') is schema
+
+    fname = fgdc_utils.get_schema_fname('fgdc')
+    assert fgdc_utils.load_schema(fname) is schema
+
+    assert fgdc_utils.load_schema('bdp') is not schema
+
+
+def test_invalidate_schema():
+    fgdc_utils.preload_schemas()
+    schema = fgdc_utils.load_schema('fgdc')
+    bdp_schema = fgdc_utils.load_schema('bdp')
+
+    fgdc_utils.invalidate_schema('fgdc')
+    assert fgdc_utils.load_schema('fgdc') is not schema
+    assert fgdc_utils.load_schema('bdp') is bdp_schema
+
+    fgdc_utils.invalidate_schema()
+    assert fgdc_utils.load_schema('bdp') is not bdp_schema
+
+
+def test_validate_xml():
+    fname = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+    errors = fgdc_utils.validate_xml(fname, xsl_fname='fgdc')
+    assert [e[0] for e in errors] == ['metadata/idinfo/spdom/descgeog',
+                                      'metadata/idinfo/taxonomy',
+                                      'metadata/dataqual/lineage/method[1]']
+
+    errors = fgdc_utils.validate_xml(fname, xsl_fname='bdp')
+    assert len(errors) == 1
+    xpath, message, line = errors[0]
+    assert xpath == 'metadata/idinfo/ptcontac/cntinfo/cntorgp/cntorg'
+    assert message == "The value for 'cntorg' cannot be empty"
+    # line numbers refer to the original document
+    assert line == 110
+
+
+def test_validate_xml_in_memory():
+    from lxml import etree
+    record = etree.parse("tests/data/USGS_ASC_PolarBears_FGDC.xml")
+    metadata = etree.Element('metadata')
+    for section in record.getroot():
+        metadata.append(section)
+
+    errors = fgdc_utils.validate_xml(metadata, xsl_fname='bdp')
+    assert [e[0] for e in errors] == \
+           ['metadata/idinfo/ptcontac/cntinfo/cntorgp/cntorg']
+
+
+def test_section_validator():
+    from lxml import etree
+    fname = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+    record = etree.parse(fname)
+
+    validator = fgdc_utils.SectionValidator('bdp')
+    errors = validator.validate(record)
+    assert errors == fgdc_utils.validate_xml(fname, 'bdp')
+
+    # fix the only error, idinfo is the only section revalidated
+    record.xpath('idinfo/ptcontac/cntinfo/cntorgp/cntorg')[0].text = 'USGS'
+    calls = []
+    validate_section = validator._validate_section
+    def counting_validate_section(xmlschema, section, xpath):
+        calls.append(xpath)
+        return validate_section(xmlschema, section, xpath)
+    validator._validate_section = counting_validate_section
+
+    assert validator.validate(record) == []
+    assert calls == ['idinfo']
+
+    # records that don't follow the metadata layout are validated in full
+    record.getroot().append(etree.Element('junk'))
+    errors = validator.validate(record)
+    assert errors[0][0] == 'metadata/junk'
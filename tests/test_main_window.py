@@ -0,0 +1,117 @@
+from __future__ import print_function
+
+import sys
+sys.path.append(r"../..")
+
+import pytest
+from pytestqt import qtbot
+from PyQt5.QtCore import QSettings
+from PyQt5.QtWidgets import QApplication, QMessageBox, QLineEdit
+
+from pymdwizard.gui import MainWindow
+
+RECORD_FNAME = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+
+
+@pytest.fixture
+def main_form(qtbot, monkeypatch, tmpdir):
+    # keep options changed by the tests out of the user's settings
+    for settings_format in [QSettings.NativeFormat, QSettings.IniFormat]:
+        QSettings.setPath(settings_format, QSettings.UserScope, str(tmpdir))
+    for name in ['warning', 'information']:
+        monkeypatch.setattr(QMessageBox, name,
+                            staticmethod(lambda *args, **kwargs: None))
+    monkeypatch.setattr(QMessageBox, 'question',
+                        staticmethod(lambda *args, **kwargs: QMessageBox.No))
+    form = MainWindow.PyMdWizardMainForm()
+    qtbot.addWidget(form)
+    yield form
+    form.stop_validation_worker()
+
+
+def validate(qtbot, form):
+    form.validate()
+    qtbot.waitUntil(
+        lambda: form.statusBar().currentMessage() != "Validating...",
+        timeout=60000)
+    return sorted(action.data() for action in form.ui.menuErrors.actions())
+
+
+def test_validate_twice(qtbot, main_form):
+    main_form.load_file(RECORD_FNAME)
+    errors = validate(qtbot, main_form)
+    assert errors
+    error_widgets = len(main_form.error_widgets)
+
+    # building the sections with errors doesn't change what is reported
+    # for the unchanged record
+    assert validate(qtbot, main_form) == errors
+    assert len(main_form.error_widgets) == error_widgets
+
+
+def test_superseded_results_dropped(qtbot, main_form):
+    xpath = 'metadata/idinfo/citation/citeinfo/title'
+    errors = [(xpath, 'a stale error', 1)]
+
+    results = []
+    worker = main_form.validation_worker
+    worker.finished.connect(lambda run, errors: results.append(run))
+    worker.latest_run = 2
+    # only called directly here, the worker's thread isn't involved
+    worker.validate(1, '<metadata/>', 'fgdc')
+    assert results == []
+
+    main_form.validation_run = 2
+    main_form.validation_finished(1, errors)
+    assert main_form.ui.menuErrors.actions() == []
+    assert main_form.error_widgets == []
+
+    main_form.validation_finished(2, errors)
+    assert [action.data() for action in
+            main_form.ui.menuErrors.actions()] == [xpath]
+    assert main_form.error_widgets
+
+
+def focus(widget):
+    QApplication.instance().focusChanged.emit(None, widget)
+
+
+def test_validate_as_you_type(qtbot, main_form):
+    timer = main_form.validation_timer
+    main_form.actionValidate_as_you_type.setChecked(True)
+    title = main_form.metadata_root.findChild(QLineEdit, 'fgdc_title')
+    focus(title)
+
+    title.setText('a new title')
+    assert timer.isActive()
+    qtbot.wait(300)
+    remaining = timer.remainingTime()
+    # each edit restarts the delay
+    title.setText('a newer title')
+    assert timer.remainingTime() > remaining
+
+    main_form.actionValidate_as_you_type.setChecked(False)
+    assert not timer.isActive()
+    title.setText('the newest title')
+    assert not timer.isActive()
+
+
+def test_validate_as_you_type_rebuilt_widgets(qtbot, main_form):
+    timer = main_form.validation_timer
+    main_form.actionValidate_as_you_type.setChecked(True)
+    spref = main_form.metadata_root.spatial_tab.spref
+    # Gnomonic
+    spref.ui.fgdc_mapprojn.setCurrentIndex(5)
+    feast = spref.findChild(QLineEdit, 'fgdc_feast')
+    focus(feast)
+    assert feast.restarts_validation
+
+    # Orthographic, which replaces the projection parameter widgets
+    spref.ui.fgdc_mapprojn.setCurrentIndex(10)
+    timer.stop()
+    new_feast = spref.findChild(QLineEdit, 'fgdc_feast')
+    assert new_feast is not feast
+    assert not getattr(new_feast, 'restarts_validation', False)
+    focus(new_feast)
+    new_feast.setText('500000')
+    assert timer.isActive()
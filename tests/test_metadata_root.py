@@ -0,0 +1,99 @@
+from __future__ import print_function
+
+import sys
+sys.path.append(r"../..")
+
+from pytestqt import qtbot
+from lxml import etree
+
+from pymdwizard.gui.MetadataRoot import MetadataRoot
+
+
+def test_lazy_sections(qtbot):
+    widget = MetadataRoot()
+    qtbot.addWidget(widget)
+
+    assert widget.is_built('idinfo')
+    assert widget.is_built('metainfo')
+    for section in widget.lazy_sections:
+        assert not widget.is_built(section)
+
+    test_record_fname = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+    test_record = etree.parse(test_record_fname)
+    widget._from_xml(test_record)
+
+    for section in widget.lazy_sections:
+        assert not widget.is_built(section)
+
+    # sections that haven't been built are written out unchanged
+    record = widget._to_xml()
+    for tag in ['dataqual', 'spdoinfo', 'spref', 'eainfo', 'distinfo']:
+        if test_record.find(tag) is None:
+            assert record.find(tag) is None
+            continue
+        assert etree.tostring(record.find(tag), method='c14n') == \
+               etree.tostring(test_record.find(tag), method='c14n')
+    assert etree.tostring(record.find('idinfo/spdom'), method='c14n') == \
+           etree.tostring(test_record.find('idinfo/spdom'), method='c14n')
+
+    built = []
+    widget.section_built.connect(built.append)
+    eainfo = widget.eainfo
+    assert built == ['eainfo']
+    assert widget.is_built('eainfo')
+    assert eainfo.has_content()
+    assert 'eainfo' not in widget.pending_xml
+
+
+def test_reload_sections(qtbot):
+    from pymdwizard.core import xml_utils
+
+    widget = MetadataRoot()
+    qtbot.addWidget(widget)
+
+    test_record_fname = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+    widget._from_xml(etree.parse(test_record_fname))
+    widget.build_section('distinfo')
+    before = widget._to_xml()
+
+    new_record = etree.parse(test_record_fname)
+    new_record.find('idinfo/citation/citeinfo/pubdate').text = '20260101'
+    new_record.find('distinfo/distliab').text = 'changed'
+    patches = xml_utils.diff_nodes(before, new_record)
+    sections = xml_utils.patch_sections(patches)
+    assert 'distinfo' in sections
+    assert 'eainfo' not in sections
+
+    widget.reload_sections(new_record, sections)
+    after = widget._to_xml()
+    assert after.findtext('idinfo/citation/citeinfo/pubdate') == '20260101'
+    assert after.findtext('distinfo/distliab') == 'changed'
+    assert not widget.is_built('eainfo')
+
+
+def test_reload_deleted_section(qtbot):
+    from pymdwizard.core import xml_utils
+
+    widget = MetadataRoot()
+    qtbot.addWidget(widget)
+
+    test_record_fname = "tests/data/USGS_ASC_PolarBears_FGDC.xml"
+    widget._from_xml(etree.parse(test_record_fname))
+    widget.build_section('eainfo')
+    before = widget._to_xml()
+
+    # eainfo removed and distinfo moved, which changes the order of the
+    # sections so they are all deleted and added again
+    new_record = etree.parse(test_record_fname)
+    root = new_record.getroot()
+    root.remove(root.find('eainfo'))
+    root.insert(0, root.find('distinfo'))
+    patches = xml_utils.diff_nodes(before, new_record)
+    sections = xml_utils.patch_sections(patches)
+    assert 'eainfo' in sections
+
+    widget.reload_sections(new_record, sections)
+    after = widget._to_xml()
+    assert after.find('eainfo') is None
+    assert after.findtext('distinfo/distliab') == \
+           new_record.findtext('distinfo/distliab')
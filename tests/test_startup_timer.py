@@ -0,0 +1,35 @@
+"""Unittests for core.startup_timer"""
+
+from pymdwizard.core import startup_timer
+
+
+def test_timer_report():
+    imports = [[0, 'pandas', 0.5], [1, 'numpy', 0.1], [2, 'tiny', 0.001]]
+    timer = startup_timer.StartupTimer(start_time=0, imports=imports)
+    timer.record('section', 'idinfo', 0.25)
+    timer.record('milestone', 'first paint', 1.5)
+
+    report = timer.report()
+    assert 'pandas' in report
+    assert 'numpy' in report
+    assert 'tiny' not in report
+    assert '   0.250  idinfo' in report
+    assert '   1.500  first paint' in report
+
+
+def test_module_timer():
+    assert startup_timer.get_timer() is None
+    with startup_timer.timed('section', 'not recorded'):
+        pass
+
+    timer = startup_timer.start()
+    try:
+        with startup_timer.timed('section', 'idinfo'):
+            pass
+        startup_timer.record('milestone', 'shown')
+    finally:
+        assert startup_timer.stop() is timer
+
+    assert startup_timer.get_timer() is None
+    assert [t[:2] for t in timer.timings] == [('section', 'idinfo'),
+                                              ('milestone', 'shown')]
@@ -93,5 +93,256 @@ def test_gen_fgdc_taxonomy():
     assert fgdc_taxonomy.tag == 'taxonomy'
 
 
-
-
+def test_rank_lookup(cache_dname, monkeypatch):
+    monkeypatch.setattr(taxonomy, '_rank_lookup', None)
+
+    def offline(**kwargs):
+        raise taxonomy.requests.exceptions.ConnectionError()
+
+    # offline and nothing cached uses the bundled snapshot
+    monkeypatch.setattr(taxonomy, 'get_rank_names', offline)
+    lookup = taxonomy.get_rank_lookup()
+    assert lookup['Genus'] == 180
+    assert lookup['Domain'] == 5
+    assert taxonomy.get_rank_lookup() is lookup
+
+    calls = []
+
+    def online(**kwargs):
+        calls.append(kwargs)
+        return [{'kingdomName': 'Animalia', 'rankId': '180',
+                 'rankName': 'Genus'},
+                {'kingdomName': 'Animalia', 'rankId': '220',
+                 'rankName': 'Species'}]
+
+    monkeypatch.setattr(taxonomy, 'get_rank_names', online)
+    lookup = taxonomy.get_rank_lookup(refresh=True)
+    assert lookup == {'Genus': 180, 'Species': 220, 'Life': 1, 'Domain': 5}
+    assert cache_dname.join(taxonomy.RANK_NAMES_FNAME).check()
+
+    # the next process reads the cache file without asking ITIS
+    monkeypatch.setattr(taxonomy, '_rank_lookup', None)
+    assert taxonomy.get_rank_lookup() == lookup
+    for rank in ['Life', 'Domain', 'Genus', 'Species']:
+        taxonomy.Taxon(taxon_name=rank, taxon_value='test')
+    assert len(calls) == 1
+
+    species = taxonomy.Taxon(taxon_name='Species', taxon_value='test')
+    assert species.indent == '  ' * 22
+
+
+def test_response_cache(tmpdir, monkeypatch):
+    from pymdwizard.core import cache_utils
+
+    class Response(object):
+        content = b'<rankNames><rankName>Genus</rankName></rankNames>'
+
+        def raise_for_status(self):
+            pass
+
+    class Session(object):
+        calls = 0
+
+        def get(self, url, params=None, timeout=None):
+            if self.calls < 0:
+                raise taxonomy.requests.exceptions.ConnectionError()
+            self.calls += 1
+            return Response()
+
+    session = Session()
+    monkeypatch.setattr(taxonomy, '_session', session)
+    monkeypatch.setattr(taxonomy, '_offline', False)
+    monkeypatch.setattr(taxonomy, '_response_cache', None)
+    monkeypatch.setattr(taxonomy, '_cache_ttl', taxonomy.ITIS_CACHE_TTL)
+
+    taxonomy.set_response_cache(
+        cache_utils.DirectoryCache(str(tmpdir.join('itis'))), ttl=60)
+    url = taxonomy.ITIS_BASE_URL + 'getRankNames'
+    first = taxonomy._get_xml(url, {'tsn': 1})
+    assert first.xpath('rankName')[0].text == 'Genus'
+    taxonomy._get_xml(url, {'tsn': 1})
+    assert session.calls == 1
+    taxonomy._get_xml(url, {'tsn': 2})
+    assert session.calls == 2
+
+    # expired entries are fetched again, or used if ITIS can't be reached
+    taxonomy.set_response_cache(taxonomy.get_response_cache(), ttl=-1)
+    taxonomy._get_xml(url, {'tsn': 1})
+    assert session.calls == 3
+    session.calls = -1
+    assert taxonomy._get_xml(url, {'tsn': 1}).tag == 'rankNames'
+
+    taxonomy.set_offline()
+    session.calls = 0
+    assert taxonomy._get_xml(url, {'tsn': 2}).tag == 'rankNames'
+    with pytest.raises(taxonomy.requests.exceptions.ConnectionError):
+        taxonomy._get_xml(url, {'tsn': 3})
+    assert session.calls == 0
+
+    taxonomy.set_offline(False)
+    taxonomy.set_response_cache(None)
+    assert taxonomy.get_response_cache() is None
+    taxonomy._get_xml(url, {'tsn': 1})
+    taxonomy._get_xml(url, {'tsn': 1})
+    assert session.calls == 2
+
+
+def test_get_full_hierarchies(monkeypatch):
+    import threading
+    import time
+
+    lock = threading.Lock()
+    running = [0, 0]
+    calls = []
+
+    def get_hierarchy(tsn, **kwargs):
+        with lock:
+            calls.append(tsn)
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05 if tsn == 1 else 0.01)
+        with lock:
+            running[0] -= 1
+        return 'hierarchy {}'.format(tsn)
+
+    monkeypatch.setattr(taxonomy, 'get_full_hierarchy_from_tsn',
+                        get_hierarchy)
+    tsns = [1, 2, 3, 2, 4, 5, 6]
+    results = taxonomy.get_full_hierarchies(tsns, max_workers=3)
+    assert results == ['hierarchy {}'.format(tsn) for tsn in tsns]
+    assert sorted(calls) == [1, 2, 3, 4, 5, 6]
+    assert 1 < running[1] <= 3
+    assert taxonomy.get_full_hierarchies([]) == []
+
+
+def test_request_retries(monkeypatch):
+    exceptions = taxonomy.requests.exceptions
+
+    class Response(object):
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise exceptions.HTTPError(response=self)
+
+    class Session(object):
+        def __init__(self, responses):
+            self.responses = responses
+
+        def get(self, url, params=None, timeout=None):
+            assert timeout == taxonomy.ITIS_TIMEOUT
+            response = self.responses.pop(0)
+            if response is None:
+                raise exceptions.ConnectionError()
+            if response == 'timeout':
+                raise exceptions.ReadTimeout()
+            return response
+
+    sleeps = []
+    monkeypatch.setattr(taxonomy.time, 'sleep', sleeps.append)
+
+    session = Session([None, Response(503), 'timeout', Response(200)])
+    monkeypatch.setattr(taxonomy, '_session', session)
+    assert taxonomy._request('url', {}).status_code == 200
+    assert sleeps == [taxonomy.ITIS_BACKOFF, taxonomy.ITIS_BACKOFF * 2,
+                      taxonomy.ITIS_BACKOFF * 4]
+
+    # not found is not retried
+    session.responses = [Response(404), Response(200)]
+    with pytest.raises(exceptions.HTTPError):
+        taxonomy._request('url', {})
+    assert len(session.responses) == 1
+
+    session.responses = [None] * (taxonomy.ITIS_RETRIES + 1)
+    with pytest.raises(exceptions.ConnectionError):
+        taxonomy._request('url', {})
+    assert session.responses == []
+
+
+def test_merge_hierarchies():
+    columns = ['tsn', 'parentTsn', 'rankName', 'taxonName']
+    bears = [('202423', '', 'Kingdom', 'Animalia'),
+             ('180540', '202423', 'Family', 'Ursidae'),
+             ('180541', '180540', 'Genus', 'Ursus')]
+    brown_bear = bears + [('180543', '180541', 'Species', 'Ursus arctos')]
+    polar_bear = bears + [('180542', '180541', 'Species',
+                           'Ursus maritimus')]
+    hierarchies = [[dict(zip(columns, row)) for row in brown_bear],
+                   pd.DataFrame(polar_bear, columns=columns)]
+
+    root = taxonomy.merge_hierarchies(hierarchies)
+    assert root.taxon_value == 'Animalia'
+    genus = root.find_child_by_tsn(180541)
+    assert genus.taxon_value == 'Ursus'
+    assert [c.taxon_value for c in genus.children] == ['Ursus arctos',
+                                                       'Ursus maritimus']
+    assert genus.find_child_by_tsn('180542').parent is genus
+    assert genus.find_child_by_tsn('180540') is None
+    assert root.find_child_by_tsn('1') is None
+
+    # taxons added below an existing subtree are indexed at the root
+    subspecies = taxonomy.Taxon('Subspecies', 'Ursus arctos horribilis',
+                                tsn=180544)
+    root.find_child_by_tsn(180543).add_child(subspecies)
+    assert root.find_child_by_tsn(180544) is subspecies
+    assert genus.find_child_by_tsn(180544) is subspecies
+    assert [t.tsn for t in genus.walk()] == ['180541', '180543', 180544,
+                                             '180542']
+
+
+def test_taxon_constructor_children():
+    species = taxonomy.Taxon('Species', 'Ursus arctos', tsn=180543)
+    genus = taxonomy.Taxon('Genus', 'Ursus', tsn=180541, children=[species])
+    assert species.parent is genus
+
+    subspecies = taxonomy.Taxon('Subspecies', 'Ursus arctos horribilis',
+                                tsn=180544)
+    species.add_child(subspecies)
+    assert genus.find_child_by_tsn(180544) is subspecies
+    assert species.find_child_by_tsn(180544) is subspecies
+    # only descendants are found
+    assert subspecies.find_child_by_tsn(180543) is None
+    assert species.find_child_by_tsn(180541) is None
+
+    # a subtree built on its own is indexed once added
+    family = taxonomy.Taxon('Family', 'Ursidae', tsn=180540)
+    family.add_child(genus)
+    assert family.find_child_by_tsn(180544) is subspecies
+    assert genus.find_child_by_tsn(180540) is None
+
+
+def test_common_names(monkeypatch):
+    names = {'180541': [{'commonName': 'brown bears', 'language': 'English',
+                         'tsn': '180541'},
+                        {'commonName': 'ours', 'language': 'French',
+                         'tsn': '180541'}],
+             '180543': [{'commonNames': None}]}
+    calls = []
+
+    def get_common_names_tsn(tsn, as_dataframe=True, **kwargs):
+        calls.append(tsn)
+        if tsn == '180540':
+            raise ValueError()
+        return names.get(tsn, [])
+
+    monkeypatch.setattr(taxonomy, 'get_common_names_tsn',
+                        get_common_names_tsn)
+    assert taxonomy.get_common_names([180541, '180541', 180543, 180540]) == \
+        {'180541': ['brown bears'], '180543': [], '180540': []}
+    assert sorted(calls) == ['180540', '180541', '180543']
+
+    columns = ['tsn', 'parentTsn', 'rankName', 'taxonName']
+    rows = [('202423', '', 'Kingdom', 'Animalia'),
+            ('180540', '202423', 'Family', 'Ursidae'),
+            ('180541', '180540', 'Genus', 'Ursus'),
+            ('180543', '180541', 'Species', 'Ursus arctos')]
+    root = taxonomy.merge_hierarchies([[dict(zip(columns, row))
+                                        for row in rows]])
+    del calls[:]
+    taxoncl = taxonomy._gen_fgdc_taxonomy_section(
+        root, include_common_names=True, include_tsns=['180543'])
+    assert sorted(calls) == ['180540', '180541', '180543', '202423']
+    assert taxoncl.xpath('taxoncl/taxoncl/common/text()') == ['brown bears']
+    assert taxoncl.xpath('taxoncl/taxoncl/taxoncl/common/text()') == \
+        ['TSN: 180543']
@@ -0,0 +1,100 @@
+from __future__ import print_function
+
+import sys
+sys.path.append(r"../..")
+
+from pytestqt import qtbot
+from PyQt5.QtCore import QEvent
+from PyQt5.QtWidgets import QApplication, QWidget
+
+from pymdwizard.gui import citeinfo
+
+
+def test_widget_index_search(qtbot):
+    widget = citeinfo.Citeinfo()
+    qtbot.addWidget(widget)
+    index = widget.make_index()
+
+    origins = index.search('citeinfo/origin')
+    assert len(origins) == 1
+    assert origins[0].objectName() == 'fgdc_origin'
+    assert index.search('citeinfo/title')[0].objectName() == 'fgdc_title'
+    assert index.search('citeinfo/notatag') == []
+
+
+def test_widget_index_repeating(qtbot):
+    widget = citeinfo.Citeinfo()
+    qtbot.addWidget(widget)
+    index = widget.make_index()
+    assert len(index.search('citeinfo/origin')) == 1
+
+    widget.fgdc_origin.add_another()
+    widget.fgdc_origin.add_another()
+    origins = index.search('citeinfo/origin')
+    assert len(origins) == 3
+    assert index.search('citeinfo/origin[3]') == [origins[2]]
+
+    widget.fgdc_origin.pop_off()
+    QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    assert len(index.search('citeinfo/origin')) == 2
+
+
+def test_widget_index_xpath_march(qtbot):
+    widget = citeinfo.Citeinfo()
+    qtbot.addWidget(widget)
+    index = widget.make_index()
+
+    title = index.search('citeinfo/title')
+    assert index.xpath_march('citeinfo/title/notatag/other') == title
+    assert index.xpath_march('notatag') == []
+
+
+def test_annotation_lookup(qtbot):
+    from pymdwizard.core import utils
+    annotation_lookup = utils.get_annotation_lookup()
+    assert utils.get_annotation_lookup() is annotation_lookup
+
+    widget = citeinfo.Citeinfo()
+    qtbot.addWidget(widget)
+    title = widget.findChild(QWidget, 'fgdc_title')
+    assert title.toolTip() == annotation_lookup['title']['long_name']
+
+
+def test_widget_index_rebuilt_widgets(qtbot):
+    from pymdwizard.gui import spref
+
+    widget = spref.SpRef()
+    qtbot.addWidget(widget)
+    index = widget.make_index()
+
+    def names(xpath):
+        return [w.objectName() for w in index.xpath_march(xpath)]
+
+    assert names('horizsys/planar/mapproj/stdparll') == ['fgdc_stdparll']
+
+    # Gnomonic has no standard parallels but a longpc
+    widget.ui.fgdc_mapprojn.setCurrentIndex(5)
+    assert names('horizsys/planar/mapproj/longpc') == ['fgdc_longpc']
+    assert names('horizsys/planar/mapproj/stdparll') == ['fgdc_mapproj']
+    assert index.search('horizsys/planar/mapproj/longpc') == \
+        widget.make_index().search('horizsys/planar/mapproj/longpc')
+
+    widget.ui.fgdc_gridsysn.setCurrentIndex(
+        widget.ui.fgdc_gridsysn.findText('Universal Polar Stereographic'))
+    assert names('horizsys/planar/gridsys/upszone') == ['fgdc_upszone']
+    assert names('horizsys/planar/gridsys/utmzone') == ['fgdc_gridsys']
+
+
+def test_widget_index_attr_domain(qtbot):
+    from pymdwizard.gui import attr
+
+    widget = attr.Attr()
+    qtbot.addWidget(widget)
+    index = widget.make_index()
+    assert index.search('attr/attrdomv/udom')
+
+    # Range
+    widget.ui.comboBox.setCurrentIndex(1)
+    assert index.search('attr/attrdomv/udom') == []
+    assert [w.objectName() for w in
+            index.search('attr/attrdomv/rdom/rdommin')] == ['fgdc_rdommin']
@@ -29,4 +29,275 @@ element = etree.fromstring(xml_str, parser=parser)
 
 def test_node_to_dict():
     result = pymdwizard.core.xml_utils.node_to_dict(element)
-    assert result['fgdc_cntperp']['fgdc_cntper'] == 'Colin Talbert'
\ No newline at end of file
+    assert result['fgdc_cntperp']['fgdc_cntper'] == 'Colin Talbert'
+
+def test_node_to_dict_flat():
+    from pymdwizard.core.xml_utils import node_to_dict, xml_node
+
+    flat = node_to_dict(element, flat=True)
+    assert flat['fgdc_cntperp/fgdc_cntper'] == 'Colin Talbert'
+
+    attr = xml_node('attr')
+    xml_node('attrlabl', 'code', parent_node=attr)
+    for code in ('a', 'b'):
+        edom = xml_node('edom', parent_node=xml_node('attrdomv',
+                                                       parent_node=attr))
+        xml_node('edomv', code, parent_node=edom)
+    flat = node_to_dict(attr, add_fgdc=False, flat=True)
+    assert list(flat.items()) == [('attrlabl', 'code'),
+                                  ('attrdomv[1]/edom/edomv', 'a'),
+                                  ('attrdomv[2]/edom/edomv', 'b')]
+
+    # the nested form keeps the last repeated sibling
+    nested = node_to_dict(attr, add_fgdc=False)
+    assert nested['attrdomv']['edom']['edomv'] == 'b'
+
+def test_xmlnode_add_child():
+    from pymdwizard.core.xml_utils import XMLNode
+
+    metainfo = XMLNode(tag='metainfo')
+    metd = XMLNode(tag='metd', text='20170101')
+    assert metainfo.add_child(metd) is metd
+    assert metainfo.metd is metd
+    assert metainfo.children[0] is metd
+
+    # lxml elements are converted
+    metc = metainfo.add_child(element)
+    assert metainfo.cntinfo is metc
+    assert metc.cntperp.cntper.text == 'Colin Talbert'
+
+    copied = metainfo.add_child(metd, deep_copy=True)
+    assert copied is not metd
+    copied.text = '20180101'
+    assert metd.text == '20170101'
+
+    result = metainfo.to_xml()
+    assert [child.tag for child in result] == ['metd', 'cntinfo', 'metd']
+    assert result.xpath('cntinfo/cntperp/cntper')[0].text == 'Colin Talbert'
+    assert result.xpath('metd')[1].text == '20180101'
+
+
+def test_xmlnode_copy():
+    from pymdwizard.core.xml_utils import XMLNode
+
+    node = XMLNode(element)
+    node_copy = node.copy()
+    assert node_copy == node
+    assert node_copy.cntinfo is node_copy
+
+    node_copy.cntperp.cntper.text = 'changed'
+    assert node.cntperp.cntper.text == 'Colin Talbert'
+    assert node_copy.children[0].children[0].text == 'changed'
+
+
+def test_compact_xmlnode():
+    import pickle
+    from pymdwizard.core.xml_utils import XMLNode, CompactXMLNode
+
+    node = XMLNode(element)
+    compact = CompactXMLNode(element)
+    assert compact.cntinfo is compact
+    assert compact.cntperp.cntper.text == 'Colin Talbert'
+    assert compact.xpath('cntaddr/city', as_text=True) == \
+           node.xpath('cntaddr/city', as_text=True)
+    assert compact.to_str() == node.to_str()
+    assert etree.tostring(compact.to_xml()) == etree.tostring(node.to_xml())
+
+    try:
+        compact.widget = None
+        assert False, 'CompactXMLNode should not accept new attributes'
+    except AttributeError:
+        pass
+
+    compact.cntaddr.clear_children('state')
+    compact.cntaddr.add_child(XMLNode(tag='address', text='Room 1'), index=2)
+    assert compact.cntaddr.xpath('address', as_text=True) == \
+           ['2150 Centre Avenue Bldg C', 'Room 1']
+    assert not hasattr(compact.cntaddr, 'state')
+
+    compact_copy = compact.copy()
+    assert compact_copy == compact
+    compact_copy.cntpos.text = 'changed'
+    assert compact.cntpos.text == 'Ecologist'
+
+    assert pickle.loads(pickle.dumps(compact)) == compact
+    assert CompactXMLNode.from_node(node).to_str() == node.to_str()
+
+
+def test_compact_xmlnode_tag_index():
+    from pymdwizard.core.xml_utils import CompactXMLNode
+
+    attr = CompactXMLNode(tag='attr')
+    assert attr._tags is None
+    first = attr.add_child(CompactXMLNode(tag='attrdomv'))
+    assert attr.attrdomv is first
+    # the index is kept up to date once built
+    assert attr._tags is not None
+    last = attr.add_child(CompactXMLNode(tag='attrdomv'))
+    assert attr.attrdomv == [first, last]
+
+    middle = attr.add_child(CompactXMLNode(tag='attrdomv', text='middle'),
+                            index=1)
+    label = attr.add_child(CompactXMLNode(tag='attrlabl'), index=0)
+    assert attr.attrdomv == [first, middle, last]
+    assert attr.attrlabl is label
+
+    attr.clear_children('attrdomv')
+    assert not hasattr(attr, 'attrdomv')
+    assert attr.attrlabl is label
+    attr.clear_children()
+    assert not hasattr(attr, 'attrlabl')
+    assert attr.attr is attr
+
+    # nodes that are only iterated never build an index
+    compact = CompactXMLNode(element)
+    for child in compact.children:
+        assert child._tags is None
+
+
+def test_write_node():
+    import io
+    from pymdwizard.core.xml_utils import XMLNode, write_node
+
+    node = XMLNode(element)
+    node.cntpos.text = 'Ecologist & <Modeler> \r café'
+    node.add_child(XMLNode(tag='cntvoice'))
+
+    stream = io.StringIO()
+    write_node(node, stream)
+    result = stream.getvalue()
+    assert result == str(node)
+    assert '  <cntpos>Ecologist &amp; &lt;Modeler&gt; &#13; caf&#233;' \
+           '</cntpos>' in result
+    assert result.endswith('  <cntvoice>\n\n  </cntvoice>\n</cntinfo>')
+    assert etree.fromstring(result).xpath('cntpos')[0].text == \
+           'Ecologist & <Modeler> \r café'
+
+    # deep trees don't hit the recursion limit
+    root = XMLNode(tag='root')
+    cur_node = root
+    for i in range(2000):
+        cur_node = cur_node.add_child(XMLNode(tag='child'))
+    cur_node.text = 'deep'
+    assert str(root).count('<child>') == 2000
+
+
+def test_lazy_xmlrecord(tmpdir):
+    import os
+    from pymdwizard.core.xml_utils import XMLRecord, XMLNode
+
+    fname = os.path.join(os.path.dirname(__file__), 'data',
+                         'USGS_ASC_PolarBears_FGDC.xml')
+    record = XMLRecord(fname)
+    lazy_record = XMLRecord(fname, lazy=True)
+    assert str(lazy_record) == str(record)
+    assert str(lazy_record.metadata.xpath('idinfo/keywords/theme/themekey')) \
+           == str(record.metadata.xpath('idinfo/keywords/theme/themekey'))
+
+    citeinfo = lazy_record.metadata.idinfo.citation.citeinfo
+    citeinfo.pubdate.text = '20260101'
+    citeinfo.clear_children('origin')
+    citeinfo.add_child(XMLNode(tag='origin', text='Colin Talbert'), index=0)
+    # changes are made to the parsed tree
+    assert lazy_record.record.xpath(
+        'idinfo/citation/citeinfo/pubdate')[0].text == '20260101'
+    assert citeinfo.children[0].text == 'Colin Talbert'
+
+    out_fname = str(tmpdir.join('lazy.xml'))
+    lazy_record.save(out_fname)
+    saved = XMLRecord(out_fname)
+    assert saved.metadata.idinfo.citation.citeinfo.pubdate.text == '20260101'
+    assert saved.metadata.xpath('idinfo/citation/citeinfo/origin',
+                                as_text=True) == ['Colin Talbert']
+
+
+def test_compile_xpath():
+    from pymdwizard.core.xml_utils import compile_xpath
+
+    compiled = compile_xpath('cntaddr/city')
+    assert compile_xpath('cntaddr/city') is compiled
+    assert compiled(element)[0].text == 'Fort Collins'
+    assert pymdwizard.core.xml_utils.get_text_content(
+        element, 'cntperp/cntper') == 'Colin Talbert'
+    assert pymdwizard.core.xml_utils.search_xpath(element, 'nothere') is None
+
+
+def test_iter_elements():
+    import os
+    from pymdwizard.core import xml_utils
+
+    fname = os.path.join(os.path.dirname(__file__), 'data',
+                         'USGS_ASC_PolarBears_FGDC.xml')
+    record = etree.parse(fname)
+
+    sections = [section.tag for section in xml_utils.iter_sections(fname)]
+    assert sections == [section.tag for section in record.getroot()]
+
+    attr_counts = [len(detailed.findall('attr'))
+                   for detailed in xml_utils.iter_detailed(fname)]
+    assert attr_counts == [len(detailed.findall('attr')) for detailed
+                           in record.findall('eainfo/detailed')]
+
+    origins = [origin.text for origin in xml_utils.iter_elements(
+        fname, 'metadata/idinfo/citation/citeinfo/origin')]
+    assert origins == [origin.text for origin in
+                       record.findall('idinfo/citation/citeinfo/origin')]
+    assert list(xml_utils.iter_elements(fname, 'other/idinfo')) == []
+
+
+def test_diff_nodes():
+    import copy
+    from pymdwizard.core import xml_utils
+
+    new = copy.deepcopy(element)
+    new.find('cntpos').text = 'Hydrologist'
+    new.find('cntaddr').remove(new.find('cntaddr/state'))
+    xml_utils.xml_node('address', 'Room 1', parent_node=new.find('cntaddr'),
+                       index=2)
+    xml_utils.xml_node('cntemail', 'someone@usgs.gov', parent_node=new)
+
+    patches = xml_utils.diff_nodes(element, new)
+    assert {'xpath': 'cntpos', 'action': 'set_text',
+            'text': 'Hydrologist'} in patches
+    assert {'xpath': 'cntaddr/state', 'action': 'delete'} in patches
+    assert xml_utils.patch_sections(patches) == ['cntpos', 'cntaddr',
+                                                 'cntemail']
+
+    patched = copy.deepcopy(element)
+    xml_utils.apply_patches(patched, patches)
+    assert xml_utils.diff_nodes(patched, new) == []
+    assert [child.tag for child in patched.find('cntaddr')] == \
+           ['addrtype', 'address', 'address', 'city', 'postal']
+
+    # moving top level children rewrites them all, with named steps
+    new = copy.deepcopy(element)
+    new.insert(0, new.find('cntaddr'))
+    patches = xml_utils.diff_nodes(element, new)
+    assert not any(patch['xpath'].startswith('*') for patch in patches)
+    assert 'cntaddr' in xml_utils.patch_sections(patches)
+    patched = copy.deepcopy(element)
+    xml_utils.apply_patches(patched, patches)
+    assert xml_utils.diff_nodes(patched, new) == []
+
+
+def test_content_hash():
+    import os
+    from pymdwizard.core import xml_utils
+
+    fname = os.path.join(os.path.dirname(__file__), 'data',
+                         'USGS_ASC_PolarBears_FGDC.xml')
+    record = etree.parse(fname)
+    record_hash = xml_utils.content_hash(fname)
+    assert xml_utils.content_hash(record) == record_hash
+
+    # formatting, comments and whitespace around text don't matter
+    compact = etree.tostring(record.getroot()).decode()
+    compact = compact.replace('<title>', '<!-- a comment --><title>\n   ')
+    assert xml_utils.content_hash(compact) == record_hash
+    assert xml_utils.canonicalize('<a>\n  <b> x\r\n</b>\n  <c/>\n</a>') == \
+           b'<a><b>x</b><c></c></a>'
+    assert xml_utils.canonicalize('<a y="2" x="1 > 0"> <b> x </b></a>') == \
+           b'<a x="1 > 0" y="2"><b>x</b></a>'
+
+    record.find('idinfo/citation/citeinfo/pubdate').text = '20260101'
+    assert xml_utils.content_hash(record) != record_hash